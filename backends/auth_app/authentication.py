@@ -0,0 +1,53 @@
+# auth_app/authentication.py
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import ClaimsUser
+from .tokens import TOKEN_VERSION_CLAIM, get_token_version
+
+
+def user_from_claims(validated_token):
+    """
+    Dựng ClaimsUser từ token đã xác minh mà không query bảng user.
+    Trả về None nếu token được cấp trước khi có các claim cần thiết.
+    """
+    try:
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError as e:
+        raise InvalidToken("Token contained no recognizable user identification") from e
+    # SimpleJWT ghi user id dạng chuỗi; phải đổi về kiểu của pk để so sánh với các FK *_id
+    user_id = ClaimsUser._meta.pk.to_python(user_id)
+
+    if TOKEN_VERSION_CLAIM not in validated_token or 'username' not in validated_token:
+        return None
+
+    if not validated_token.get('is_active', False):
+        raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+    # Tắt (mặc định khi không có cache dùng chung): token thu hồi hết hiệu lực khi access token hết hạn
+    revocation_check = getattr(settings, 'TOKEN_REVOCATION_CHECK', False)
+    if revocation_check and validated_token[TOKEN_VERSION_CLAIM] != get_token_version(user_id):
+        raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+
+    return ClaimsUser.from_db(
+        DEFAULT_DB_ALIAS,
+        ['id', 'username', 'is_active'],
+        [user_id, validated_token['username'], True],
+    )
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Giống JWTAuthentication nhưng không load User từ DB mỗi request.
+    request.user là ClaimsUser; row đầy đủ chỉ được load khi view cần tới
+    một field không có trong token. Token cũ (thiếu claim) dùng cách cũ.
+    """
+
+    def get_user(self, validated_token):
+        user = user_from_claims(validated_token)
+        if user is None:
+            return super().get_user(validated_token)
+        return user
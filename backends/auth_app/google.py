@@ -0,0 +1,143 @@
+# auth_app/google.py
+import logging
+import re
+import threading
+import time
+
+import jwt
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+DEFAULT_JWKS_URL = 'https://www.googleapis.com/oauth2/v3/certs'
+
+
+class GoogleTokenError(Exception):
+    """ID token không hợp lệ, hết hạn hoặc không xác minh được chữ ký"""
+
+
+def _fetch_jwks(url, timeout):
+    resp = requests.get(url, timeout=timeout)
+    resp.raise_for_status()
+    max_age = None
+    match = re.search(r'max-age=(\d+)', resp.headers.get('Cache-Control', ''))
+    if match:
+        max_age = int(match.group(1))
+    return resp.json(), max_age
+
+
+class GoogleIdTokenVerifier:
+    """
+    Xác minh Google ID token (RS256) ngay trong process bằng bộ khóa JWKS được cache.
+
+    - Khóa được cache theo Cache-Control max-age của Google.
+    - Token có `kid` lạ (Google vừa xoay khóa) sẽ kích hoạt tải lại JWKS,
+      nhưng không quá một lần mỗi `min_refresh_interval` giây.
+    - Nếu tải lại thất bại, khóa cũ vẫn được dùng tiếp.
+
+    - Bắt buộc có `audience` (GOOGLE_CLIENT_ID): thiếu thì từ chối mọi token, vì token
+      Google cấp cho OAuth client khác cũng có chữ ký hợp lệ.
+    - Chỉ chấp nhận token có `email_verified` đúng.
+
+    `fetch` có thể thay bằng một JWKS giả lập cục bộ khi test.
+    """
+
+    def __init__(self, jwks_url=DEFAULT_JWKS_URL, audience=None, timeout=3,
+                 default_max_age=3600, min_refresh_interval=60, leeway=30, fetch=_fetch_jwks):
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.timeout = timeout
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self.leeway = leeway
+        self.fetch = fetch
+        self._keys = {}
+        self._expires_at = 0
+        self._last_fetch = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._keys and now < self._expires_at:
+                return
+            if self._keys and now - self._last_fetch < self.min_refresh_interval:
+                return
+            self._last_fetch = now
+            try:
+                jwks, max_age = self.fetch(self.jwks_url, self.timeout)
+            except (requests.RequestException, ValueError) as e:
+                logger.warning("Failed to refresh Google JWKS: %s", e)
+                if not self._keys:
+                    raise GoogleTokenError('Unable to fetch Google signing keys.') from e
+                return
+
+            keys = {}
+            for jwk in jwks.get('keys', []):
+                try:
+                    keys[jwk['kid']] = jwt.PyJWK(jwk).key
+                except (KeyError, jwt.PyJWKError):
+                    continue
+            if keys:
+                self._keys = keys
+            self._expires_at = now + (max_age if max_age is not None else self.default_max_age)
+
+    def _get_key(self, kid):
+        self._refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            # Google đã xoay khóa: tải lại ngay (có giới hạn tần suất)
+            self._refresh(force=True)
+            key = self._keys.get(kid)
+        if key is None:
+            raise GoogleTokenError('Unknown signing key.')
+        return key
+
+    def verify(self, token):
+        """Trả về claims của token nếu hợp lệ, ngược lại raise GoogleTokenError"""
+        if not self.audience:
+            raise GoogleTokenError('GOOGLE_CLIENT_ID is not configured.')
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise GoogleTokenError('Malformed token.') from e
+
+        key = self._get_key(header.get('kid'))
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=['RS256'],
+                audience=self.audience,
+                issuer=GOOGLE_ISSUERS,
+                leeway=self.leeway,
+                options={'require': ['exp', 'iat', 'iss', 'aud']},
+            )
+        except jwt.PyJWTError as e:
+            raise GoogleTokenError(str(e)) from e
+        # Google từng gửi email_verified dạng chuỗi "true"
+        if claims.get('email_verified') not in (True, 'true'):
+            raise GoogleTokenError('Email is not verified.')
+        return claims
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_google_verifier():
+    global _verifier
+    with _verifier_lock:
+        if _verifier is None:
+            _verifier = GoogleIdTokenVerifier(
+                jwks_url=getattr(settings, 'GOOGLE_JWKS_URL', DEFAULT_JWKS_URL),
+                audience=getattr(settings, 'GOOGLE_CLIENT_ID', None) or None,
+                timeout=getattr(settings, 'GOOGLE_JWKS_TIMEOUT', 3),
+            )
+        return _verifier
+
+
+def verify_google_id_token(token):
+    return get_google_verifier().verify(token)
@@ -0,0 +1,85 @@
+# auth_app/management/commands/bench_avatar.py
+import io
+import multiprocessing
+import resource
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from auth_app.utils import AVATAR_FORMATS, AVATAR_SIZES, make_square_crop, render_avatar_variants
+
+
+def _make_jpeg(width, height):
+    noise = Image.effect_noise((width, height), 48)
+    image = Image.merge('RGB', (noise, noise.rotate(180), noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    out = io.BytesIO()
+    image.save(out, format='JPEG', quality=90)
+    return out.getvalue()
+
+
+def _full_decode(data):
+    """Cách cũ: decode toàn bộ ảnh rồi mới thu nhỏ, mỗi kích thước một lần"""
+    results = {}
+    for size in AVATAR_SIZES:
+        image = make_square_crop(Image.open(io.BytesIO(data)).convert('RGB'))
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for key, fmt in AVATAR_FORMATS.items():
+            out = io.BytesIO()
+            image.save(out, format=fmt['format'], **fmt['options'])
+            results[(size, key)] = out.getvalue()
+    return results
+
+
+def _pipeline(data):
+    return render_avatar_variants(io.BytesIO(data))
+
+
+CASES = {'full-decode': _full_decode, 'draft-pipeline': _pipeline}
+
+
+def _measure(case, data, queue):
+    # ru_maxrss tính bằng KB trên Linux
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    CASES[case](data)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, max(peak - before, 0)))
+
+
+class Command(BaseCommand):
+    help = "Đo thời gian và bộ nhớ đỉnh khi xử lý avatar lớn (mặc định 12MP)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=4000)
+        parser.add_argument('--height', type=int, default=3000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            ctx = multiprocessing.get_context('fork')
+        except ValueError:
+            raise CommandError("bench_avatar cần multiprocessing 'fork' (Linux/macOS).")
+
+        data = _make_jpeg(options['width'], options['height'])
+        self.stdout.write(
+            f"Input: {options['width']}x{options['height']} JPEG, {len(data) / 1024 / 1024:.1f} MB, "
+            f"sizes={list(AVATAR_SIZES)}, formats={list(AVATAR_FORMATS)}"
+        )
+
+        for case in CASES:
+            timings, peaks = [], []
+            for _ in range(options['repeat']):
+                # Mỗi lần đo chạy trong process riêng để peak RSS không bị cộng dồn
+                queue = ctx.Queue()
+                proc = ctx.Process(target=_measure, args=(case, data, queue))
+                proc.start()
+                elapsed, peak_kb = queue.get()
+                proc.join()
+                timings.append(elapsed)
+                peaks.append(peak_kb)
+            self.stdout.write(
+                f"{case:>15}: best {min(timings) * 1000:8.1f} ms  "
+                f"peak +{max(peaks) / 1024:7.1f} MB"
+            )
@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-19 18:40
+
+from django.conf import settings
+from django.db import migrations
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Chỉ PostgreSQL: index GIN pg_trgm phục vụ icontains/istartswith của UserSearchView.
+    # SQLite dùng prefix trie trong process (auth_app.search).
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in ('username', 'email'):
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "user_search_{column}_trgm" '
+            f'ON "{table}" USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in ('username', 'email'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS "user_search_{column}_trgm"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0003_profile_token_version_claimsuser'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -1,10 +1,9 @@
 # auth_app/models.py
 from django.db import models
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
 import uuid
-from PIL import Image
-import io
-from django.core.files.base import ContentFile
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,12 +12,12 @@ def avatar_upload_to(instance, filename):
     # Sử dụng UUID để tránh conflict và cache-busting
     ext = filename.split('.')[-1].lower()
     new_filename = f'{uuid.uuid4()}.{ext}'
-    return f'avatars/user_{instance.user.id}/{new_filename}'
+    return f'avatars/user_{instance.user_id}/{new_filename}'
 
 def banner_upload_to(instance, filename):
     ext = filename.split('.')[-1].lower()
     new_filename = f'{uuid.uuid4()}.{ext}'
-    return f'banners/user_{instance.user.id}/{new_filename}'
+    return f'banners/user_{instance.user_id}/{new_filename}'
 
 class Profile(models.Model):
     user = models.OneToOneField(
@@ -40,6 +39,8 @@ class Profile(models.Model):
         null=True,
         help_text="Smaller version for cards and lists (40x40)"
     )
+    # {"<size>": {"jpeg": <path>, "webp": <path>}} - sinh bởi auth_app.utils.create_avatar_variants
+    avatar_variants = models.JSONField(default=dict, blank=True)
     
     # Banner field (để sau này dùng)
     banner = models.ImageField(
@@ -57,6 +58,9 @@ class Profile(models.Model):
     is_discoverable = models.BooleanField(default=True)
     show_boards_on_profile = models.BooleanField(default=False)
     
+    # Tăng lên để thu hồi mọi JWT đã cấp cho user (auth_app.tokens)
+    token_version = models.PositiveIntegerField(default=0)
+
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -103,87 +107,47 @@ class Profile(models.Model):
         else:
             return "U"  # Ultimate fallback
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Ghi nhớ avatar lúc load để save() so sánh mà không cần SELECT lại
+        instance._loaded_avatar = instance.__dict__.get('avatar')
+        return instance
+
+    def avatar_has_changed(self):
+        """So sánh avatar hiện tại với giá trị đã load từ DB"""
+        loaded = getattr(self, '_loaded_avatar', None)
+        current = self.avatar.name if self.avatar else None
+        return (loaded or None) != (current or None)
+
     def save(self, *args, **kwargs):
-        # Check if avatar has changed
-        avatar_changed = False
-        if self.pk:
-            try:
-                old_instance = Profile.objects.get(pk=self.pk)
-                avatar_changed = old_instance.avatar != self.avatar
-            except Profile.DoesNotExist:
-                avatar_changed = True
-        else:
-            # New instance
-            avatar_changed = bool(self.avatar)
-        
+        avatar_changed = self.avatar_has_changed()
+
         # Save first to ensure avatar file is properly stored
         super().save(*args, **kwargs)
-        
-        # Create thumbnail only if avatar changed
+        self._loaded_avatar = self.avatar.name if self.avatar else None
+
+        # Các kích thước avatar được tạo bởi background worker, sau khi transaction commit
         if avatar_changed and self.avatar:
-            self._create_thumbnail()
-    
-    def _create_thumbnail(self):
-        """Create thumbnail version of avatar - called after main save"""
-        try:
-            # Use avatar.open() to handle cloud storage properly
-            with self.avatar.open('rb') as avatar_file:
-                image = Image.open(avatar_file)
-                
-                # Convert to RGB for JPEG output
-                if image.mode in ('RGBA', 'LA', 'P'):
-                    # For transparent images, use white background
-                    rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-                    if image.mode == 'P':
-                        image = image.convert('RGBA')
-                    if image.mode == 'RGBA':
-                        rgb_image.paste(image, mask=image.split()[-1])
-                    else:
-                        rgb_image.paste(image)
-                    image = rgb_image
-                
-                # Create square thumbnail (40x40 for cards)
-                image = self._make_square_crop(image)
-                thumbnail_size = (40, 40)
-                image.thumbnail(thumbnail_size, Image.Resampling.LANCZOS)
-                
-                # Save as JPEG with proper filename
-                thumb_io = io.BytesIO()
-                image.save(thumb_io, format='JPEG', quality=85, optimize=True)
-                thumb_io.seek(0)
-                
-                # Generate proper filename with .jpg extension
-                thumb_filename = f"thumb_{uuid.uuid4()}.jpg"
-                
-                # Save thumbnail with save=False to avoid recursion
-                self.avatar_thumbnail.save(
-                    thumb_filename,
-                    ContentFile(thumb_io.read()),
-                    save=False
-                )
-                
-                # Update only the thumbnail field to avoid triggering save() again
-                Profile.objects.filter(pk=self.pk).update(
-                    avatar_thumbnail=self.avatar_thumbnail.name
-                )
-                
-        except Exception as e:
-            logger.error(f"Thumbnail creation failed for user {self.user_id}: {e}")
-            # In development, you might want to print for debugging
-            print(f"Error creating thumbnail: {e}")
-    
-    def _make_square_crop(self, image):
-        """Crop image to square from center"""
-        width, height = image.size
-        
-        if width == height:
-            return image
-        
-        # Crop to square from center
-        size = min(width, height)
-        left = (width - size) // 2
-        top = (height - size) // 2
-        right = left + size
-        bottom = top + size
-        
-        return image.crop((left, top, right, bottom))
\ No newline at end of file
+            from .tasks import enqueue_avatar_processing
+            profile_id, avatar_name = self.pk, self.avatar.name
+            transaction.on_commit(
+                lambda: enqueue_avatar_processing(profile_id, avatar_name)
+            )
+
+
+class ClaimsUser(get_user_model()):
+    """
+    User dựng từ claims của access token (auth_app.authentication).
+    Chỉ có id, username, is_active; các field khác được defer và chỉ được
+    load (một lần, toàn bộ row) khi view thực sự truy cập tới.
+    """
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
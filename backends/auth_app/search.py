@@ -0,0 +1,154 @@
+# auth_app/search.py
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, Value, When
+
+User = get_user_model()
+
+_TOKEN_SPLIT = re.compile(r'[^0-9a-z]+')
+
+# Số ứng viên tối đa lấy từ UserPrefixIndex; nhiều hơn thì lọc bằng icontains trong DB
+MAX_INDEX_CANDIDATES = 500
+
+
+def _tokens(*values):
+    """username/email → các token dùng để tìm theo prefix (toàn chuỗi + từng phần)"""
+    tokens = set()
+    for value in values:
+        value = (value or '').lower()
+        if not value:
+            continue
+        tokens.add(value)
+        tokens.update(t for t in _TOKEN_SPLIT.split(value) if t)
+    return tokens
+
+
+class PrefixTrie:
+    """Trie token → user id, dùng thay index khi DB không có pg_trgm (SQLite)"""
+
+    def __init__(self):
+        self.root = ({}, set())
+
+    def add(self, token, user_id):
+        node = self.root
+        for ch in token:
+            node = node[0].setdefault(ch, ({}, set()))
+        node[1].add(user_id)
+
+    def search(self, prefix, limit):
+        """Mọi user id có token bắt đầu bằng `prefix`; quá `limit` id thì trả về None"""
+        node = self.root
+        for ch in prefix:
+            node = node[0].get(ch)
+            if node is None:
+                return set()
+        found, stack = set(), [node]
+        while stack:
+            children, ids = stack.pop()
+            found.update(ids)
+            if len(found) > limit:
+                return None
+            stack.extend(children.values())
+        return found
+
+
+class UserPrefixIndex:
+    """
+    Index trong process cho fallback SQLite. Được build lazy, đánh dấu cũ khi
+    user thay đổi (signals) và tự build lại sau `ttl` giây để nhận thay đổi
+    từ các process khác.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._trie = None
+        self._built_at = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._trie = None
+
+    def _get_trie(self):
+        trie = self._trie
+        if trie is not None and time.monotonic() - self._built_at < self.ttl:
+            return trie
+        with self._lock:
+            if self._trie is None or time.monotonic() - self._built_at >= self.ttl:
+                trie = PrefixTrie()
+                for user_id, username, email in User.objects.values_list('id', 'username', 'email').iterator():
+                    for token in _tokens(username, email):
+                        trie.add(token, user_id)
+                self._trie, self._built_at = trie, time.monotonic()
+            return self._trie
+
+    def search(self, prefix, limit=MAX_INDEX_CANDIDATES):
+        return self._get_trie().search(prefix.lower(), limit)
+
+
+user_prefix_index = UserPrefixIndex(ttl=getattr(settings, 'USER_SEARCH_INDEX_TTL', 300))
+
+
+def _co_member_filter(user):
+    """Q chọn các user có chung ít nhất một board với `user`"""
+    from boards.models import Board, BoardMembership
+    from boards.sharding import sharding_enabled
+    from config.db_router import fan_out
+
+    if sharding_enabled():
+        # Board nằm ở các shard khác nhau: không dùng subquery được, lấy id user từ từng shard
+        def co_members():
+            my_boards = Board.objects.filter(Q(created_by=user) | Q(members=user)).values('id')
+            return (set(BoardMembership.objects.filter(board_id__in=my_boards).values_list('user_id', flat=True))
+                    | set(Board.objects.filter(id__in=my_boards).values_list('created_by_id', flat=True)))
+        return Q(pk__in=set().union(*fan_out(co_members)))
+
+    my_boards = Board.objects.filter(Q(created_by=user) | Q(members=user)).values('id')
+    return Q(Exists(BoardMembership.objects.filter(board_id__in=my_boards, user_id=OuterRef('pk')))) | \
+        Q(Exists(Board.objects.filter(id__in=my_boards, created_by_id=OuterRef('pk'))))
+
+
+def _rank_expression(query, user):
+    return (
+        Case(
+            When(Q(username__iexact=query) | Q(email__iexact=query), then=Value(30)),
+            When(Q(username__istartswith=query) | Q(email__istartswith=query), then=Value(20)),
+            default=Value(10),
+            output_field=IntegerField(),
+        )
+        + Case(When(_co_member_filter(user), then=Value(15)), default=Value(0), output_field=IntegerField())
+    )
+
+
+def search_users(query, user, limit=10):
+    """
+    Tìm user theo username/email, xếp hạng: khớp chính xác > khớp đầu chuỗi > chứa,
+    cộng điểm cho người đã cùng board với `user`.
+
+    PostgreSQL: icontains được phục vụ bởi index GIN pg_trgm (migration 0004).
+    DB khác: ứng viên là các user có token (username, email hoặc từng phần của chúng)
+    bắt đầu bằng `query`, lấy từ UserPrefixIndex để tránh quét toàn bảng. Không có
+    ứng viên nào (vd. "gmail.com" nằm giữa email) hoặc quá nhiều ứng viên thì lọc
+    icontains như PostgreSQL. Xếp hạng luôn chạy trên toàn bộ ứng viên rồi mới cắt `limit`.
+    """
+    qs = User.objects.select_related('profile')
+    contains = Q(username__icontains=query) | Q(email__icontains=query)
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        qs = (qs.filter(contains)
+                .annotate(rank=_rank_expression(query, user),
+                          similarity=TrigramSimilarity('username', query))
+                .order_by('-rank', '-similarity', 'username'))
+        return list(qs[:limit])
+
+    candidate_ids = user_prefix_index.search(query)
+    qs = (qs.filter(Q(id__in=candidate_ids) if candidate_ids else contains)
+            .annotate(rank=_rank_expression(query, user))
+            .order_by('-rank', 'username'))
+    return list(qs[:limit])
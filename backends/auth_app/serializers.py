@@ -1,7 +1,11 @@
 # auth_app/serializers.py
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import get_user_model, authenticate
 from .models import Profile
+from .tokens import TOKEN_VERSION_CLAIM, get_token_version
 
 User = get_user_model()
 
@@ -14,10 +18,11 @@ class UserAvatarSerializer(serializers.ModelSerializer):
     initials = serializers.SerializerMethodField()
     avatar_url = serializers.SerializerMethodField()
     avatar_thumbnail_url = serializers.SerializerMethodField()
+    avatar_sizes = serializers.SerializerMethodField()
     
     class Meta:
         model = Profile
-        fields = ['id', 'email', 'display_name', 'initials', 'avatar_url', 'avatar_thumbnail_url']
+        fields = ['id', 'email', 'display_name', 'initials', 'avatar_url', 'avatar_thumbnail_url', 'avatar_sizes']
     
     def get_display_name(self, profile):
         return profile.get_display_name()
@@ -37,6 +42,17 @@ class UserAvatarSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(profile.avatar_thumbnail.url)
         return None
 
+    def get_avatar_sizes(self, profile):
+        """{"24": {"jpeg": url, "webp": url}, "40": {...}, ...}"""
+        request = self.context.get('request')
+        if not profile.avatar_variants or not request:
+            return {}
+        storage = profile.avatar.storage
+        return {
+            size: {fmt: request.build_absolute_uri(storage.url(name)) for fmt, name in formats.items()}
+            for size, formats in profile.avatar_variants.items()
+        }
+
 # Updated ProfileSerializer for settings page
 class ProfileSerializer(serializers.ModelSerializer):
     """Full profile serializer cho settings page"""
@@ -188,4 +204,15 @@ class GoogleLoginSerializer(serializers.Serializer):
     """
     Serializer để validate token từ Google.
     """
-    token = serializers.CharField(write_only=True, required=True)
\ No newline at end of file
+    token = serializers.CharField(write_only=True, required=True)
+
+
+class VersionedTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh token cấp trước lần tăng token_version gần nhất (đổi mật khẩu, khoá tài khoản) bị từ chối"""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        version = refresh.get(TOKEN_VERSION_CLAIM)
+        if version is not None and version != get_token_version(refresh[api_settings.USER_ID_CLAIM]):
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+        return super().validate(attrs)
@@ -1,8 +1,10 @@
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from .models import Profile
+from .search import user_prefix_index
+from .tokens import bump_token_version
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,3 +22,29 @@ def ensure_user_profile(sender, instance, created, **kwargs):
     else:
         # Nếu vì lý do nào đó user cũ chưa có profile, bổ sung
         Profile.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=User, dispatch_uid="auth_app_revoke_tokens_on_credential_change")
+def revoke_tokens_on_credential_change(sender, instance, update_fields=None, **kwargs):
+    """
+    Thu hồi các JWT đã cấp khi user đổi mật khẩu hoặc bị vô hiệu hoá
+    (access token không còn được đối chiếu với row user ở mỗi request).
+    """
+    if not instance.pk:
+        return
+    if update_fields is not None and not {'password', 'is_active'} & set(update_fields):
+        return
+    old = User.objects.filter(pk=instance.pk).values('password', 'is_active').first()
+    if old is None:
+        return
+    if old['password'] != instance.password or (old['is_active'] and not instance.is_active):
+        bump_token_version(instance.pk)
+
+
+@receiver(post_save, sender=User, dispatch_uid="auth_app_invalidate_user_search_on_save")
+@receiver(post_delete, sender=User, dispatch_uid="auth_app_invalidate_user_search_on_delete")
+def invalidate_user_search_index(sender, instance, update_fields=None, **kwargs):
+    """Username/email thay đổi → build lại index tìm kiếm ở lần search tiếp theo"""
+    if update_fields is not None and not {'username', 'email'} & set(update_fields):
+        return
+    user_prefix_index.invalidate()
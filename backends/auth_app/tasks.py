@@ -0,0 +1,111 @@
+# auth_app/tasks.py
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = {}  # key -> (func, args) của task đang chờ xử lý
+_pending_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'AVATAR_WORKER_THREADS', 2),
+                thread_name_prefix='avatar-worker',
+            )
+        return _executor
+
+
+def process_avatar(profile_id, avatar_name):
+    """
+    Xử lý avatar cho một profile. Bỏ qua nếu avatar đã bị thay đổi
+    kể từ lúc task được đưa vào hàng đợi.
+    """
+    from .models import Profile
+    from .utils import create_avatar_variants
+
+    try:
+        profile = Profile.objects.select_related('user').get(pk=profile_id)
+    except Profile.DoesNotExist:
+        return False
+    if not profile.avatar or profile.avatar.name != avatar_name:
+        return False
+    return create_avatar_variants(profile)
+
+
+def fetch_google_avatar(profile_id, picture_url):
+    """
+    Tải ảnh đại diện Google cho profile chưa có avatar.
+    Profile.save sẽ tiếp tục đưa avatar mới vào pipeline tạo các kích thước.
+    """
+    import requests
+    from django.core.files.base import ContentFile
+    from .models import Profile
+
+    try:
+        profile = Profile.objects.get(pk=profile_id)
+    except Profile.DoesNotExist:
+        return False
+    if profile.avatar:
+        return False
+
+    resp = requests.get(picture_url, timeout=getattr(settings, 'GOOGLE_AVATAR_TIMEOUT', 5))
+    resp.raise_for_status()
+    profile.avatar.save(f'user_{profile.user_id}.jpg', ContentFile(resp.content), save=True)
+    return True
+
+
+def _run(key):
+    with _pending_lock:
+        func, args = _pending.pop(key, (None, None))
+    if func is None:
+        return
+    close_old_connections()
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background task %s failed", key)
+    finally:
+        close_old_connections()
+
+
+def _submit(key, func, *args):
+    """
+    Đưa task vào pool background (giới hạn số thread và số task chờ).
+    Task trùng `key` đang chờ sẽ được gộp lại, chỉ giữ tham số mới nhất.
+    Trả về False nếu hàng đợi đã đầy.
+    """
+    if getattr(settings, 'AVATAR_TASKS_EAGER', False):
+        func(*args)
+        return True
+
+    with _pending_lock:
+        if key in _pending:
+            _pending[key] = (func, args)
+            return True
+        if len(_pending) >= getattr(settings, 'AVATAR_WORKER_MAX_PENDING', 64):
+            logger.warning("Background queue full, skipping task %s", key)
+            return False
+        _pending[key] = (func, args)
+
+    _get_executor().submit(_run, key)
+    return True
+
+
+def enqueue_avatar_processing(profile_id, avatar_name):
+    """Tạo các kích thước avatar ở background sau khi avatar thay đổi"""
+    return _submit(('avatar', profile_id), process_avatar, profile_id, avatar_name)
+
+
+def enqueue_google_avatar(profile_id, picture_url):
+    """Tải ảnh Google ở background để không chặn request đăng nhập"""
+    return _submit(('google_avatar', profile_id), fetch_google_avatar, profile_id, picture_url)
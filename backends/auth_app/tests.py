@@ -0,0 +1,157 @@
+import json
+import time
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from boards.models import Board, BoardMembership, Workspace
+
+from .google import GoogleIdTokenVerifier, GoogleTokenError
+from .models import Profile
+from .search import PrefixTrie, search_users, user_prefix_index
+from .tokens import bump_token_version, get_token_version, get_tokens_for_user
+
+CLIENT_ID = 'test-client.apps.googleusercontent.com'
+
+
+class GoogleIdTokenVerifierTests(SimpleTestCase):
+    """Xác minh ID token với JWKS giả lập: khóa RSA sinh tại chỗ, `fetch` không gọi mạng"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(cls.private_key.public_key()))
+        jwk.update(kid='test-key', alg='RS256', use='sig')
+        cls.jwks = {'keys': [jwk]}
+
+    def setUp(self):
+        self.fetches = 0
+
+        def fetch(url, timeout):
+            self.fetches += 1
+            return self.jwks, 3600
+
+        self.verifier = GoogleIdTokenVerifier(audience=CLIENT_ID, fetch=fetch)
+
+    def make_token(self, kid='test-key', **overrides):
+        now = int(time.time())
+        claims = {
+            'iss': 'https://accounts.google.com',
+            'aud': CLIENT_ID,
+            'sub': '1234567890',
+            'email': 'user@example.com',
+            'email_verified': True,
+            'iat': now,
+            'exp': now + 3600,
+        }
+        claims.update(overrides)
+        return jwt.encode(claims, self.private_key, algorithm='RS256', headers={'kid': kid})
+
+    def test_valid_token(self):
+        claims = self.verifier.verify(self.make_token())
+        self.assertEqual(claims['email'], 'user@example.com')
+        # Token thứ hai dùng khóa đã cache
+        self.verifier.verify(self.make_token())
+        self.assertEqual(self.fetches, 1)
+
+    def test_wrong_audience(self):
+        with self.assertRaises(GoogleTokenError):
+            self.verifier.verify(self.make_token(aud='other-client.apps.googleusercontent.com'))
+
+    def test_expired_token(self):
+        now = int(time.time())
+        with self.assertRaises(GoogleTokenError):
+            self.verifier.verify(self.make_token(iat=now - 7200, exp=now - 3600))
+
+    def test_unknown_kid(self):
+        with self.assertRaises(GoogleTokenError):
+            self.verifier.verify(self.make_token(kid='rotated-key'))
+
+    def test_unverified_email(self):
+        with self.assertRaises(GoogleTokenError):
+            self.verifier.verify(self.make_token(email_verified=False))
+
+    def test_missing_client_id(self):
+        verifier = GoogleIdTokenVerifier(audience=None, fetch=lambda url, timeout: (self.jwks, 3600))
+        with self.assertRaises(GoogleTokenError):
+            verifier.verify(self.make_token())
+
+
+class PrefixTrieTests(SimpleTestCase):
+    def test_search_returns_all_matches_or_none_when_over_limit(self):
+        trie = PrefixTrie()
+        for user_id, token in enumerate(['ann', 'anna', 'annie', 'bob']):
+            trie.add(token, user_id)
+        self.assertEqual(trie.search('ann', limit=3), {0, 1, 2})
+        self.assertIsNone(trie.search('ann', limit=2))
+        self.assertEqual(trie.search('x', limit=3), set())
+
+
+class UserSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.me = User.objects.create_user('me', 'me@example.com')
+        cls.exact = User.objects.create_user('ann', 'ann@gmail.com')
+        # Nhiều user cùng prefix "ann" để ứng viên vượt `limit` của kết quả
+        for i in range(30):
+            User.objects.create_user(f'ann{i:02d}', f'ann{i:02d}@example.com')
+        cls.teammate = User.objects.create_user('annz', 'annz@example.com')
+        board = Board.objects.create(name='b', workspace=Workspace.objects.create(name='w', owner=cls.me),
+                                     created_by=cls.me)
+        BoardMembership.objects.create(board=board, user=cls.teammate)
+
+    def setUp(self):
+        user_prefix_index.invalidate()
+
+    def test_exact_and_co_member_matches_rank_first(self):
+        results = search_users('ann', self.me, limit=5)
+        # Người cùng board (khớp đầu chuỗi) > khớp chính xác > các user còn lại
+        self.assertEqual(results[:2], [self.teammate, self.exact])
+        self.assertEqual(len(results), 5)
+
+    def test_substring_fallback(self):
+        self.assertEqual(search_users('gmail.com', self.me), [self.exact])
+        self.assertEqual(search_users('NN0', self.me)[0].username, 'ann00')
+
+
+class TokenVersionTests(TestCase):
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'token_versions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    })
+    def test_process_local_cache_is_bypassed(self):
+        user = get_user_model().objects.create_user('revoked', 'revoked@example.com')
+        version = get_token_version(user.pk)
+        # Đổi mật khẩu ở process khác: chỉ DB thay đổi, cache của process này không được xoá
+        Profile.objects.filter(user=user).update(token_version=version + 1)
+        self.assertEqual(get_token_version(user.pk), version + 1)
+
+    def get_workspaces(self, tokens):
+        return self.client.get('/api/workspaces/', HTTP_AUTHORIZATION=f"Bearer {tokens['access']}").status_code
+
+    def test_access_token_check_is_opt_in(self):
+        user = get_user_model().objects.create_user('opt_in', 'opt_in@example.com')
+        tokens = get_tokens_for_user(user)
+        bump_token_version(user.pk)
+        # Mặc định (không có cache dùng chung): access token còn hạn vẫn được chấp nhận, không query Profile
+        with override_settings(TOKEN_REVOCATION_CHECK=False), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_workspaces(tokens), 200)
+        self.assertFalse([q for q in queries.captured_queries if 'auth_app_profile' in q['sql']])
+        with override_settings(TOKEN_REVOCATION_CHECK=True):
+            self.assertEqual(self.get_workspaces(tokens), 401)
+
+    def test_revoked_refresh_token_is_rejected(self):
+        user = get_user_model().objects.create_user('refresh', 'refresh@example.com')
+        tokens = get_tokens_for_user(user)
+        response = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+
+        bump_token_version(user.pk)
+        response = self.client.post('/api/token/refresh/', {'refresh': response.json()['refresh']})
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,62 @@
+# auth_app/tokens.py
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import F
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Profile
+
+TOKEN_VERSION_CLAIM = 'ver'
+TOKEN_VERSION_CACHE_ALIAS = 'token_versions'
+
+
+def _version_cache():
+    """
+    Cache của token_version, None nếu cache chỉ nằm trong process (LocMemCache): thu hồi
+    token phải có hiệu lực ngay ở mọi worker nên khi đó luôn đọc DB.
+    """
+    backend = caches[TOKEN_VERSION_CACHE_ALIAS]
+    return None if isinstance(backend, LocMemCache) else backend
+
+
+def _version_cache_key(user_id):
+    return f'auth:token_version:{user_id}'
+
+
+def get_token_version(user_id):
+    """Phiên bản token hiện tại của user (đọc từ cache dùng chung, fallback DB)"""
+    cache = _version_cache()
+    key = _version_cache_key(user_id)
+    version = cache.get(key) if cache is not None else None
+    if version is None:
+        version = (Profile.objects
+                   .filter(user_id=user_id)
+                   .values_list('token_version', flat=True)
+                   .first()) or 0
+        if cache is not None:
+            cache.set(key, version, getattr(settings, 'TOKEN_VERSION_CACHE_TIMEOUT', 60))
+    return version
+
+
+def bump_token_version(user_id):
+    """Thu hồi mọi token đã cấp cho user bằng cách tăng token_version"""
+    Profile.objects.filter(user_id=user_id).update(token_version=F('token_version') + 1)
+    cache = _version_cache()
+    if cache is not None:
+        cache.delete(_version_cache_key(user_id))
+
+
+def get_tokens_for_user(user):
+    """
+    Cấp cặp refresh/access token. Các claim username, is_active, ver được
+    copy sang access token để StatelessJWTAuthentication không phải query user.
+    """
+    refresh = RefreshToken.for_user(user)
+    refresh['username'] = user.get_username()
+    refresh['is_active'] = user.is_active
+    refresh[TOKEN_VERSION_CLAIM] = get_token_version(user.pk)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
@@ -1,85 +1,158 @@
 # auth_app/utils.py
-from PIL import Image
+from PIL import Image, ImageOps
 import io
 from django.core.files.base import ContentFile
-import uuid
 import logging
 
 logger = logging.getLogger(__name__)
 
-def create_avatar_thumbnail(profile_instance):
+# Các kích thước avatar (px, hình vuông) được sinh ra từ một lần decode
+AVATAR_SIZES = (256, 96, 40, 24)
+THUMBNAIL_SIZE = 40
+
+AVATAR_FORMATS = {
+    'jpeg': {'format': 'JPEG', 'ext': 'jpg', 'options': {'quality': 85, 'optimize': True}},
+    'webp': {'format': 'WEBP', 'ext': 'webp', 'options': {'quality': 80, 'method': 4}},
+}
+
+
+def load_avatar_image(fileobj, max_size=max(AVATAR_SIZES)):
+    """
+    Decode ảnh avatar ở độ phân giải nhỏ nhất đủ dùng.
+    Với JPEG, draft() cho phép libjpeg scale 1/2, 1/4, 1/8 ngay khi decode,
+    nên ảnh 12MP không bao giờ được giải nén đầy đủ vào bộ nhớ.
+    """
+    image = Image.open(fileobj)
+
+    if image.format == 'JPEG':
+        width, height = image.size
+        scale = min(width, height) / max_size
+        if scale > 1:
+            image.draft('RGB', (int(width / scale) + 1, int(height / scale) + 1))
+
+    image = ImageOps.exif_transpose(image)
+
+    # Convert to RGB for consistent JPEG output
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # Create white background for transparency
+        rgb_image = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+
+        # Paste with proper alpha handling
+        if image.mode in ('RGBA', 'LA'):
+            rgb_image.paste(image, mask=image.split()[-1])
+        else:
+            rgb_image.paste(image)
+        image = rgb_image
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    return image
+
+
+def render_avatar_variants(fileobj, sizes=AVATAR_SIZES, formats=AVATAR_FORMATS):
     """
-    Create thumbnail for avatar - can be called asynchronously
+    Sinh tất cả kích thước/định dạng avatar từ một lần decode.
+    Trả về dict {(size, format_key): bytes}.
+    """
+    image = make_square_crop(load_avatar_image(fileobj, max(sizes)))
+
+    variants = {}
+    # Resize từ lớn đến nhỏ, mỗi bước dùng kết quả của bước trước
+    for size in sorted(sizes, reverse=True):
+        if image.width > size:
+            image = image.resize((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for key, fmt in formats.items():
+            out = io.BytesIO()
+            image.save(out, format=fmt['format'], **fmt['options'])
+            variants[(size, key)] = out.getvalue()
+    return variants
+
+
+def create_avatar_variants(profile_instance):
+    """
+    Create every avatar size for a profile - called by the background worker (auth_app.tasks)
     Returns True if successful, False otherwise
     """
     if not profile_instance.avatar:
         return False
-        
+
+    from .models import Profile, avatar_upload_to
+
+    storage = profile_instance.avatar.storage
+    saved_names = []
     try:
         with profile_instance.avatar.open('rb') as avatar_file:
-            image = Image.open(avatar_file)
-            
-            # Convert to RGB for consistent JPEG output
-            if image.mode in ('RGBA', 'LA', 'P'):
-                # Create white background for transparency
-                rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'P':
-                    image = image.convert('RGBA')
-                
-                # Paste with proper alpha handling
-                if image.mode == 'RGBA':
-                    rgb_image.paste(image, mask=image.split()[-1])
-                else:
-                    rgb_image.paste(image)
-                image = rgb_image
-            
-            # Make square crop from center
-            image = make_square_crop(image)
-            
-            # Create thumbnail
-            thumbnail_size = (40, 40)
-            image.thumbnail(thumbnail_size, Image.Resampling.LANCZOS)
-            
-            # Save as JPEG
-            thumb_io = io.BytesIO()
-            image.save(thumb_io, format='JPEG', quality=85, optimize=True)
-            thumb_io.seek(0)
-            
-            # Generate unique filename
-            thumb_filename = f"thumb_{uuid.uuid4()}.jpg"
-            
-            # Save thumbnail (without triggering save)
-            profile_instance.avatar_thumbnail.save(
-                thumb_filename,
-                ContentFile(thumb_io.read()),
-                save=False
-            )
-            
-            # Update only thumbnail field in DB to avoid recursion
-            from .models import Profile
-            Profile.objects.filter(pk=profile_instance.pk).update(
-                avatar_thumbnail=profile_instance.avatar_thumbnail.name
+            rendered = render_avatar_variants(avatar_file)
+
+        variants = {}
+        for (size, key), content in rendered.items():
+            ext = AVATAR_FORMATS[key]['ext']
+            name = storage.save(
+                avatar_upload_to(profile_instance, f'avatar_{size}.{ext}'),
+                ContentFile(content),
             )
-            
-            return True
-            
+            saved_names.append(name)
+            variants.setdefault(str(size), {})[key] = name
+
+        # Update only variant fields in DB to avoid recursion.
+        # Chỉ ghi nếu avatar chưa bị thay đổi trong lúc đang xử lý
+        updated = Profile.objects.filter(
+            pk=profile_instance.pk,
+            avatar=profile_instance.avatar.name,
+        ).update(
+            avatar_thumbnail=variants[str(THUMBNAIL_SIZE)]['jpeg'],
+            avatar_variants=variants,
+        )
+        if not updated:
+            _delete_files(storage, saved_names)
+            return False
+
+        # update() không phát signal: avatar mới phải làm mới ETag của các board user tham gia
+        from boards.versioning import bump_board_versions_for_user
+        bump_board_versions_for_user(profile_instance.user_id)
+
+        old_names = _variant_names(profile_instance.avatar_variants)
+        if profile_instance.avatar_thumbnail:
+            old_names.append(profile_instance.avatar_thumbnail.name)
+        _delete_files(storage, [n for n in old_names if n not in saved_names])
+
+        profile_instance.avatar_variants = variants
+        profile_instance.avatar_thumbnail.name = variants[str(THUMBNAIL_SIZE)]['jpeg']
+        return True
+
     except Exception as e:
-        logger.error(f"Thumbnail creation failed for user {profile_instance.user_id}: {e}")
+        logger.error(f"Avatar processing failed for user {profile_instance.user_id}: {e}")
+        _delete_files(storage, saved_names)
         return False
 
+
+def _variant_names(variants):
+    return [name for formats in (variants or {}).values() for name in formats.values()]
+
+
+def _delete_files(storage, names):
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception:
+            # Không chặn luồng chính nếu lỗi xóa file vật lý
+            pass
+
+
 def make_square_crop(image):
     """Crop image to square from center"""
     width, height = image.size
-    
+
     if width == height:
         return image
-    
+
     # Calculate crop box for center square
     size = min(width, height)
     left = (width - size) // 2
     top = (height - size) // 2
     right = left + size
     bottom = top + size
-    
-    return image.crop((left, top, right, bottom))
 
+    return image.crop((left, top, right, bottom))
@@ -5,14 +5,15 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
-import requests
 from boards.models import Workspace
-from django.core.files.base import ContentFile
+import logging
 import traceback
-from django.db.models import Q
 
 from .models import Profile
+from .google import GoogleTokenError, verify_google_id_token
+from .search import search_users
+from .tasks import enqueue_google_avatar
+from .tokens import get_tokens_for_user
 
 from .serializers import (
     RegisterSerializer,
@@ -24,13 +25,7 @@ from .serializers import (
 )
 
 User = get_user_model()
-
-def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
-    return {
-        'refresh': str(refresh),
-        'access': str(refresh.access_token),
-    }
+logger = logging.getLogger(__name__)
 
 # ... Giữ nguyên các views khác ...
 
@@ -146,11 +141,13 @@ class GoogleLoginView(APIView):
         token = input_serializer.validated_data['token']
 
         try:
-            verify_url = f"https://www.googleapis.com/oauth2/v3/tokeninfo?id_token={token}"
-            google_res = requests.get(verify_url)
-            google_res.raise_for_status()
+            # Xác minh chữ ký ID token tại chỗ bằng JWKS đã cache, không gọi tokeninfo
+            data = verify_google_id_token(token)
+        except GoogleTokenError as e:
+            logger.warning("Invalid Google ID token: %s", e)
+            return Response({'error': 'Invalid or expired Google token.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            data = google_res.json()
+        try:
             email = data.get('email')
 
             if not email:
@@ -168,15 +165,10 @@ class GoogleLoginView(APIView):
             login(request, user)
             tokens = get_tokens_for_user(user)
 
+            # Ảnh đại diện được tải ở background, không chặn đăng nhập
             picture = data.get('picture')
             if picture and (created or not profile.avatar):
-                try:
-                    resp_img = requests.get(picture, timeout=5)
-                    resp_img.raise_for_status()
-                    fname = f'user_{user.id}.jpg'
-                    profile.avatar.save(fname, ContentFile(resp_img.content), save=True)
-                except Exception as e:
-                    print(f"Failed to fetch Google avatar for {email}: {e}")
+                enqueue_google_avatar(profile.pk, picture)
 
             user_data = UserSerializer(user, context={'request': request}).data
             if not Workspace.objects.filter(owner=user).exists():
@@ -188,9 +180,6 @@ class GoogleLoginView(APIView):
                 'refresh': tokens['refresh'],
             })
 
-        except requests.exceptions.HTTPError as e:
-            print('[GoogleLogin] HTTP Error:', str(e))
-            return Response({'error': 'Invalid or expired Google token.'}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             print('[GoogleLogin] General Exception:', str(e))
             traceback.print_exc()
@@ -204,9 +193,8 @@ class UserSearchView(APIView):
         if len(query) < 2:
             return Response([], status=status.HTTP_200_OK)
 
-        users = User.objects.filter(
-            Q(username__icontains=query) | Q(email__icontains=query)
-        )[:10]
+        # Index trigram (PostgreSQL) hoặc prefix trie (SQLite), đã select_related('profile')
+        users = search_users(query, request.user, limit=10)
 
         # Use UserAvatarSerializer for search results
         serializer = UserAvatarSerializer([u.profile for u in users], many=True, context={'request': request})
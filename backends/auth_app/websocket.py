@@ -0,0 +1,43 @@
+# auth_app/websocket.py
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .authentication import StatelessJWTAuthentication
+
+
+def _raw_token(scope):
+    """Token lấy từ header Authorization: Bearer <token>, hoặc ?token=<token> (trình duyệt không gửi được header)"""
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.split()
+            if len(parts) == 2 and parts[0].lower() == b'bearer':
+                return parts[1]
+    values = parse_qs(scope.get('query_string', b'').decode()).get('token')
+    return values[0].encode() if values else None
+
+
+@database_sync_to_async
+def get_user_from_token(raw_token):
+    authentication = StatelessJWTAuthentication()
+    try:
+        validated = authentication.get_validated_token(raw_token)
+        return authentication.get_user(validated)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Xác thực WebSocket bằng cùng access token JWT với API (thay cho AuthMiddlewareStack dùng session).
+    scope['user'] là ClaimsUser nếu token hợp lệ, ngược lại AnonymousUser.
+    """
+
+    async def __call__(self, scope, receive, send):
+        raw_token = _raw_token(scope)
+        scope = dict(scope, user=await get_user_from_token(raw_token) if raw_token else AnonymousUser())
+        return await super().__call__(scope, receive, send)
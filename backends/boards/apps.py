@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class BoardsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'boards'
+
+    def ready(self):
+        # version của board được tăng qua signals (boards.versioning)
+        import boards.signals  # noqa: F401
+        # Cấp id, đặt workspace vào shard, chép user/workspace sang các shard
+        import boards.sharding  # noqa: F401
+        # Kiểm tra cấu hình realtime (manage.py check / runserver / migrate)
+        import boards.checks  # noqa: F401
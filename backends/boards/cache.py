@@ -0,0 +1,84 @@
+# boards/cache.py
+"""
+Cache dùng chung cho response của các endpoint đọc theo board.
+
+Key gồm (endpoint, board_id, board.version, nhóm quyền, tham số của request),
+nên không cần xoá cache khi ghi: mọi thay đổi đã tăng version của board
+(boards.versioning) và entry cũ tự hết hạn theo TTL / bị đẩy ra theo LRU.
+Quyền vẫn được kiểm tra ở mỗi request trước khi đọc cache (decorators.require_board_viewer).
+"""
+import hashlib
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from config.metrics import board_cache_lookups
+
+BOARD_RESPONSE_CACHE_ALIAS = 'board_responses'
+
+# Nhóm quyền: các role trong cùng nhóm nhận cùng một response
+ROLE_CLASSES = {
+    'owner': 'admin',
+    'admin': 'admin',
+    'editor': 'editor',
+    'viewer': 'viewer',
+}
+
+
+class BoardResponseCache:
+    def __init__(self, alias=BOARD_RESPONSE_CACHE_ALIAS):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._hits = defaultdict(int)
+        self._misses = defaultdict(int)
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def make_key(self, endpoint, board, role, request, view_kwargs):
+        params = '&'.join(f'{k}={view_kwargs[k]}' for k in sorted(view_kwargs))
+        # Host ảnh hưởng tới URL tuyệt đối (avatar, attachment) trong payload
+        variant = hashlib.md5(
+            f'{params}?{request.META.get("QUERY_STRING", "")}@{request.get_host()}'.encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        role_class = ROLE_CLASSES.get(role, role)
+        return f'board:{endpoint}:{board.pk}:v{board.version}:{role_class}:{variant}'
+
+    def get(self, key, endpoint):
+        data = self.backend.get(key)
+        with self._lock:
+            if data is None:
+                self._misses[endpoint] += 1
+            else:
+                self._hits[endpoint] += 1
+        board_cache_lookups.labels(endpoint, 'miss' if data is None else 'hit').inc()
+        return data
+
+    def set(self, key, data):
+        self.backend.set(key, data, getattr(settings, 'BOARD_CACHE_TTL', 300))
+
+    def stats(self):
+        """{endpoint: {'hits', 'misses', 'hit_ratio'}} của process hiện tại"""
+        with self._lock:
+            endpoints = set(self._hits) | set(self._misses)
+            result = {}
+            for endpoint in sorted(endpoints):
+                hits, misses = self._hits[endpoint], self._misses[endpoint]
+                result[endpoint] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+                }
+            return result
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits.clear()
+            self._misses.clear()
+
+
+board_response_cache = BoardResponseCache()
@@ -0,0 +1,107 @@
+# boards/changes.py
+"""
+Change feed cho đồng bộ tăng dần: GET /api/boards/<id>/changes/?since=<cursor>
+
+Cursor là thời điểm server (micro giây epoch) lúc trả response trước đó. Các
+object có updated_at sau cursor được trả lại nguyên bản, object bị xoá hoặc
+chuyển ra khỏi board được trả dưới dạng tombstone (bảng Tombstone).
+
+Client áp dụng `deleted` trước rồi upsert các object còn lại theo id: một
+object có thể xuất hiện ở cả hai nếu vừa bị chuyển đi rồi chuyển lại.
+Query dùng một khoảng chồng lấn (CHANGE_FEED_OVERLAP_SECONDS) để không bỏ sót
+các transaction commit chậm, nên cùng một object có thể được trả lại hai lần.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Attachment, Card, Checklist, Comment, Label, List, Tombstone
+from .readers import read_cards, read_lists
+from .serializers import AttachmentSerializer, ChecklistSerializer, CommentSerializer, LabelSerializer
+
+KINDS = ('lists', 'cards', 'labels', 'comments', 'checklists', 'attachments')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorExpired(Exception):
+    """Cursor cũ hơn thời gian lưu tombstone: client phải tải lại toàn bộ board"""
+
+
+def encode_cursor(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_cursor(cursor):
+    try:
+        micros = int(cursor)
+    except (TypeError, ValueError):
+        raise InvalidCursor('Invalid cursor.')
+    if micros < 0:
+        raise InvalidCursor('Invalid cursor.')
+    return datetime(1970, 1, 1, tzinfo=dt_timezone.utc) + timedelta(microseconds=micros)
+
+
+def record_tombstones(board_id, kind, object_ids):
+    """kind là một trong KINDS"""
+    if board_id is not None and object_ids:
+        Tombstone.objects.bulk_create([
+            Tombstone(board_id=board_id, kind=kind, object_id=object_id) for object_id in object_ids
+        ])
+
+
+def _changed(queryset, since):
+    return queryset if since is None else queryset.filter(updated_at__gte=since)
+
+
+def build_change_feed(board, cursor=None, request=None):
+    """
+    Dict gồm cursor mới, các object thay đổi theo loại và id đã xoá theo loại.
+    cursor=None: trả toàn bộ board (lần đồng bộ đầu tiên).
+    """
+    now = timezone.now()
+    since = None
+    if cursor is not None:
+        since = decode_cursor(cursor)
+        retention = timedelta(days=getattr(settings, 'CHANGE_FEED_RETENTION_DAYS', 30))
+        if since < now - retention:
+            raise CursorExpired
+        since -= timedelta(seconds=getattr(settings, 'CHANGE_FEED_OVERLAP_SECONDS', 5))
+
+    context = {'request': request}
+    board_cards = Card.objects.filter(list__board=board)
+
+    attachments = list(_changed(Attachment.objects.filter(card__in=board_cards), since)
+                       .select_related('uploaded_by__profile'))
+    attachments_data = AttachmentSerializer(attachments, many=True, context=context).data
+    for obj, data in zip(attachments, attachments_data):
+        data['card'] = obj.card_id
+
+    feed = {
+        'cursor': encode_cursor(now),
+        'lists': read_lists(_changed(List.objects.filter(board=board), since).order_by('position')),
+        'cards': read_cards(_changed(board_cards, since).order_by('list_id', 'position'), context),
+        'labels': LabelSerializer(_changed(Label.objects.filter(board=board), since), many=True).data,
+        'comments': CommentSerializer(
+            _changed(Comment.objects.filter(card__in=board_cards), since).select_related('author__profile'),
+            many=True, context=context,
+        ).data,
+        'checklists': ChecklistSerializer(
+            _changed(Checklist.objects.filter(card__in=board_cards), since).prefetch_related('items'),
+            many=True, context=context,
+        ).data,
+        'attachments': attachments_data,
+        'deleted': {kind: [] for kind in KINDS},
+    }
+
+    if since is not None:
+        tombstones = (Tombstone.objects
+                      .filter(board=board, deleted_at__gte=since)
+                      .order_by('deleted_at')
+                      .values_list('kind', 'object_id'))
+        for kind, object_id in tombstones:
+            feed['deleted'].setdefault(kind, []).append(object_id)
+    return feed
@@ -0,0 +1,15 @@
+# boards/checks.py
+from django.conf import settings
+from django.core import checks
+
+
+@checks.register()
+def check_realtime_event_log(app_configs, **kwargs):
+    """seq của sự kiện realtime chỉ đúng khi mọi process dùng chung một event log (boards.realtime)"""
+    if settings.CHANNEL_LAYER != 'local' and not settings.REALTIME_EVENT_LOG_URL:
+        return [checks.Error(
+            "REALTIME_EVENT_LOG_URL is empty but CHANNEL_LAYER is %r." % settings.CHANNEL_LAYER,
+            hint="Point REALTIME_EVENT_LOG_URL at Redis, or use CHANNEL_LAYER='local' for a single process.",
+            id='boards.E001',
+        )]
+    return []
@@ -1,24 +1,216 @@
-import json
+import asyncio
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-from .models import Card, List
+from config.db_router import use_shard
+from config.metrics import (
+    channel_group_sends, websocket_connections, websocket_frame_size, websocket_queue_depth,
+    websocket_queue_overflows,
+)
+from config.renderers import dumps, loads
+from django.conf import settings
+
+from .models import Board, Card, List
+from .permissions import get_user_role_on_board
+from .presence import get_presence
+from .realtime import board_group_name, get_event_log
+from .sharding import shard_for
 from .serializers import CardSerializer, ListSerializer
 
+# Số seq gần nhất được nhớ để bỏ sự kiện trùng giữa phát lại (resume) và broadcast trực tiếp
+DELIVERED_WINDOW = 1000
+
+# Close code gửi cho client
+CLOSE_UNAUTHENTICATED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_BOARD_DELETED = 4404
+
+
+@database_sync_to_async
+def get_board_role(board_id, user):
+    with use_shard(shard_for(Board, pk=board_id)):
+        board = Board.objects.filter(pk=board_id).only('id', 'created_by_id').first()
+        return get_user_role_on_board(board, user) if board else None
+
+
 class BoardConsumer(AsyncWebsocketConsumer):
+    """
+    Sự kiện gửi tới client: {"seq": n, "type": "card.updated", "data": {...}}.
+    Client nhớ seq lớn nhất đã nhận; khi kết nối lại thì gửi
+    {"type": "resume", "last_seq": n} (hoặc mở ws/boards/<id>/?last_seq=n) để nhận
+    lại các sự kiện bị lỡ. Nếu buffer không còn đủ → {"type": "resync_required"}.
+    Sự kiện có thể đến không theo thứ tự seq khi nhiều worker cùng publish.
+
+    Xác thực bằng JWT (auth_app.websocket.JWTAuthMiddleware). Quyền xem board
+    được kiểm tra một lần khi kết nối và giữ trong suốt kết nối; khi user bị xoá
+    khỏi board, kết nối nhận `access_revoked` rồi bị đóng. Client gửi
+    {"type": "heartbeat"} định kỳ (< PRESENCE_TTL) để còn trong danh sách đang xem.
+
+    Sự kiện được gom trong REALTIME_COALESCE_WINDOW giây rồi gửi thành một frame
+    {"type": "batch", "events": [...]} (một sự kiện thì gửi nguyên). Nếu client đọc
+    chậm và số sự kiện chờ gửi vượt REALTIME_SEND_QUEUE_LIMIT, các sự kiện chờ bị
+    bỏ và client nhận `resync_required` thay vì để hàng đợi tăng không giới hạn.
+    """
+
     async def connect(self):
-        self.board_id = self.scope['url_route']['kwargs']['board_id']
-        self.group_name = f'board_{self.board_id}'
+        self.board_id = int(self.scope['url_route']['kwargs']['board_id'])
+        self.group_name = board_group_name(self.board_id)
+        self.delivered = OrderedDict()
+        self.joined = False
+        self.pending = []
+        self.overflowed = False
+        self.wakeup = asyncio.Event()
+        self.sender = None
 
-        # Tham gia nhóm WebSocket
-        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        user = self.scope.get('user')
         await self.accept()
+        if user is None or not user.is_authenticated:
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+        self.user_id = user.pk
+        self.role = await get_board_role(self.board_id, user)
+        if self.role is None:
+            await self.close(code=CLOSE_FORBIDDEN)
+            return
+
+        # Tham gia nhóm WebSocket trước khi đọc buffer để không lỡ sự kiện ở giữa
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        self.joined = True
+        websocket_connections.inc()
+        self.sender = asyncio.ensure_future(self._send_pending())
+        await self._update_presence(leave=False)
+
+        last_seq = self._parse_seq(self._query_param('last_seq'))
+        if last_seq is not None:
+            await self.resume(last_seq)
+        else:
+            seq = await sync_to_async(get_event_log().last_seq)(self.board_id)
+            await self.send(text_data=dumps({'type': 'hello', 'seq': seq, 'role': self.role}).decode())
 
     async def disconnect(self, close_code):
+        if not self.joined:
+            return
+        self.joined = False
+        websocket_connections.dec()
+        self.sender.cancel()
         # Rời nhóm
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        await self._update_presence(leave=True)
+
+    async def _update_presence(self, leave):
+        presence = get_presence()
+        before = await sync_to_async(presence.viewers)(self.board_id)
+        if leave:
+            await sync_to_async(presence.leave)(self.board_id, self.user_id, self.channel_name)
+        else:
+            await sync_to_async(presence.touch)(self.board_id, self.user_id, self.channel_name)
+        viewers = await sync_to_async(presence.viewers)(self.board_id)
+        if viewers != before:
+            channel_group_sends.labels('presence.changed').inc()
+            await self.channel_layer.group_send(self.group_name, {'type': 'presence.changed', 'viewers': viewers})
+        elif not leave:
+            # Người mới vào vẫn cần biết ai đang xem
+            await self.send(text_data=dumps({'type': 'presence', 'viewers': viewers}).decode())
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            message = loads(text_data or bytes_data or b'')
+        except ValueError:
+            return
+        if not isinstance(message, dict):
+            return
+        if not self.joined:
+            return
+        if message.get('type') == 'heartbeat':
+            await self._update_presence(leave=False)
+        elif message.get('type') == 'resume':
+            last_seq = self._parse_seq(message.get('last_seq'))
+            if last_seq is not None:
+                await self.resume(last_seq)
+
+    async def resume(self, last_seq):
+        log = get_event_log()
+        events = await sync_to_async(log.since)(self.board_id, last_seq)
+        if events is None:
+            seq = await sync_to_async(log.last_seq)(self.board_id)
+            await self.send(text_data=dumps({'type': 'resync_required', 'seq': seq}).decode())
+            return
+        for event in events:
+            await self._deliver(event)
+
+    async def board_events(self, message):
+        for event in message['events']:
+            await self._deliver(event)
+
+    async def presence_changed(self, message):
+        await self.send(text_data=dumps({'type': 'presence', 'viewers': message['viewers']}).decode())
+
+    async def membership_changed(self, message):
+        if message['user_id'] != self.user_id:
+            return
+        if message['role'] is not None:
+            self.role = message['role']
+            return
+        await self.send(text_data=dumps({'type': 'access_revoked'}).decode())
+        await self.close(code=CLOSE_FORBIDDEN)
+        await self.disconnect(CLOSE_FORBIDDEN)
+
+    async def board_deleted(self, message):
+        await self.close(code=CLOSE_BOARD_DELETED)
+        await self.disconnect(CLOSE_BOARD_DELETED)
+
+    async def _deliver(self, event):
+        seq = event['seq']
+        if seq in self.delivered or self.overflowed:
+            return
+        self.delivered[seq] = None
+        if len(self.delivered) > DELIVERED_WINDOW:
+            self.delivered.popitem(last=False)
+        self.pending.append(event)
+        if len(self.pending) > getattr(settings, 'REALTIME_SEND_QUEUE_LIMIT', 500):
+            # Client không theo kịp: bỏ các sự kiện chờ (và cho phép resume nhận lại chúng)
+            for dropped in self.pending:
+                self.delivered.pop(dropped['seq'], None)
+            self.pending = []
+            self.overflowed = True
+            websocket_queue_overflows.inc()
+        self.wakeup.set()
+
+    async def _send_pending(self):
+        """Task gửi duy nhất của kết nối; send() chậm chỉ làm `pending` dài ra chứ không chặn việc nhận sự kiện"""
+        window = getattr(settings, 'REALTIME_COALESCE_WINDOW', 0.05)
+        while True:
+            await self.wakeup.wait()
+            if window:
+                await asyncio.sleep(window)
+            self.wakeup.clear()
+            if self.overflowed:
+                seq = await sync_to_async(get_event_log().last_seq)(self.board_id)
+                self.overflowed = False
+                await self.send(text_data=dumps({'type': 'resync_required', 'seq': seq}).decode())
+                continue
+            events, self.pending = self.pending, []
+            if not events:
+                continue
+            websocket_queue_depth.observe(len(events))
+            payload = dumps(events[0] if len(events) == 1 else {'type': 'batch', 'events': events})
+            websocket_frame_size.observe(len(payload))
+            await self.send(text_data=payload.decode())
+
+    def _query_param(self, name):
+        values = parse_qs(self.scope.get('query_string', b'').decode()).get(name)
+        return values[0] if values else None
 
-    async def receive(self, text_data):
-        # Không xử lý dữ liệu từ client trong trường hợp này
-        pass
+    @staticmethod
+    def _parse_seq(value):
+        try:
+            seq = int(value)
+        except (TypeError, ValueError):
+            return None
+        return seq if seq >= 0 else None
 
     async def card_update(self, event):
         # Gửi thông báo cập nhật thẻ tới client
@@ -31,8 +223,8 @@ class BoardConsumer(AsyncWebsocketConsumer):
             list_data['cards'] = CardSerializer(cards_in_list, many=True).data
             lists_data.append(list_data)
 
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=dumps({
             'type': 'card_update',
             'cards': CardSerializer(cards, many=True).data,
             'lists': lists_data
-        }))
\ No newline at end of file
+        }).decode())
@@ -1,19 +1,75 @@
 # backends/boards/decorators.py
 from functools import wraps
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+from config.db_router import pick_replica, read_from
+
 from .permissions import (
     check_board_view_permission,
     check_card_edit_permission,
     check_board_edit_permission,
     check_board_admin_permission,
 )
+from .cache import board_response_cache
+from .versioning import board_etag, etag_matches
 
-def require_board_viewer(board_getter):
+def read_from_replica(view_method):
+    """
+    View chỉ đọc: mọi truy vấn đọc trong view chạy trên một replica (config.db_router).
+    Đặt ngoài cùng (trên require_board_viewer...) để kiểm tra quyền đọc cùng database với
+    dữ liệu trả về. Client vừa ghi (cookie pin) hoặc không có replica → đọc từ primary.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        alias = pick_replica(request)
+        if alias is None:
+            return view_method(self, request, *args, **kwargs)
+        with read_from(alias):
+            return view_method(self, request, *args, **kwargs)
+    return wrapper
+
+def require_board_viewer(board_getter, etag=False, cache=None):
+    """
+    etag=True: response có ETag theo version của board (boards.versioning).
+    If-None-Match khớp → trả 304 ngay sau khi kiểm tra quyền, view không được gọi.
+
+    cache='<endpoint>': dữ liệu response 200 được cache dùng chung giữa các user
+    cùng nhóm quyền (boards.cache), key theo version của board.
+    """
     def decorator(view_method):
         @wraps(view_method)
         def wrapper(self, request, *args, **kwargs):
             board = board_getter(self, request, *args, **kwargs)
-            check_board_view_permission(board, request.user)
-            return view_method(self, request, *args, **kwargs)
+            role = check_board_view_permission(board, request.user)
+            if not etag and not cache:
+                return view_method(self, request, *args, **kwargs)
+
+            board_tag = board_etag(board)
+            if etag and etag_matches(request, board_tag):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            elif cache:
+                key = board_response_cache.make_key(cache, board, role, request, kwargs)
+                data = board_response_cache.get(key, cache)
+                if data is not None:
+                    response = Response(data)
+                else:
+                    response = view_method(self, request, *args, **kwargs)
+                    if response.status_code != status.HTTP_200_OK:
+                        return response
+                    board_response_cache.set(key, response.data)
+            else:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+            if etag:
+                response['ETag'] = board_tag
+                # Nội dung phụ thuộc user đăng nhập; client phải hỏi lại server mỗi lần dùng
+                patch_cache_control(response, private=True, no_cache=True)
+                patch_vary_headers(response, ('Authorization',))
+            return response
         return wrapper
     return decorator
 
@@ -0,0 +1,101 @@
+# boards/management/commands/bench_channel_layers.py
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from config.channel_layers import ChannelBroker
+
+
+class Command(BaseCommand):
+    help = ("Đo throughput fan-out group_send của các channel layer trong CHANNEL_LAYER_BACKENDS: "
+            "--groups board, mỗi board --subscribers kết nối, gửi --messages message mỗi board và "
+            "đợi mọi kết nối nhận đủ. Layer 'unix' dùng broker chạy tạm trong process, gửi từ một "
+            "worker và nhận ở worker khác như khi deploy.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', nargs='+', default=list(settings.CHANNEL_LAYER_BACKENDS))
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--subscribers', type=int, default=20)
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument('--payload-bytes', type=int, default=1024)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['groups']} groups x {options['subscribers']} subscribers, "
+            f"{options['messages']} messages/group, {options['payload_bytes']} B payload"
+        )
+        for name in options['backends']:
+            config = settings.CHANNEL_LAYER_BACKENDS[name]
+            try:
+                result = self._run_backend(name, config, options)
+            except Exception as e:
+                self.stdout.write(f"{name:>8}: skipped ({type(e).__name__}: {e})")
+                continue
+            elapsed, delivered, expected = result
+            self.stdout.write(
+                f"{name:>8}: {elapsed * 1000:8.1f} ms  {delivered / elapsed:12,.0f} deliveries/s  "
+                f"({delivered}/{expected} delivered)"
+            )
+
+    def _run_backend(self, name, config, options):
+        layer_class = import_string(config['BACKEND'])
+        layer_config = dict(config.get('CONFIG', {}), capacity=options['messages'] + 10)
+        if name == 'local':
+            # Một process: bên gửi và bên nhận dùng chung layer
+            layer = layer_class(**layer_config)
+            return asyncio.run(self._measure(layer, layer, options))
+        if name != 'unix':
+            return asyncio.run(self._measure(layer_class(**layer_config), layer_class(**layer_config), options))
+
+        path = os.path.join(tempfile.mkdtemp(), 'bench.sock')
+        layer_config['path'] = path
+        broker_loop = asyncio.new_event_loop()
+        threading.Thread(target=broker_loop.run_forever, daemon=True).start()
+        broker = asyncio.run_coroutine_threadsafe(ChannelBroker(path).serve(), broker_loop)
+        while not os.path.exists(path):
+            time.sleep(0.01)
+        try:
+            return asyncio.run(self._measure(layer_class(**layer_config), layer_class(**layer_config), options))
+        finally:
+            broker.cancel()
+
+    async def _measure(self, sender, receiver, options):
+        groups, per_group, count = options['groups'], options['subscribers'], options['messages']
+        message = {'type': 'board.events', 'events': [{'seq': 1, 'type': 'card.updated',
+                                                       'data': {'name': 'x' * options['payload_bytes']}}]}
+        channels = []
+        for group in range(groups):
+            for _ in range(per_group):
+                channel = await receiver.new_channel()
+                await receiver.group_add(f'bench_{group}', channel)
+                channels.append(channel)
+        # Layer qua mạng/broker đăng ký group bất đồng bộ
+        await asyncio.sleep(0.2)
+
+        async def drain(channel):
+            received = 0
+            try:
+                while received < count:
+                    await receiver.receive(channel)
+                    received += 1
+            except asyncio.CancelledError:
+                pass
+            return received
+
+        tasks = [asyncio.ensure_future(drain(channel)) for channel in channels]
+        started = time.perf_counter()
+        for _ in range(count):
+            for group in range(groups):
+                await sender.group_send(f'bench_{group}', message)
+        done, pending = await asyncio.wait(tasks, timeout=60)
+        elapsed = time.perf_counter() - started
+        for task in pending:
+            task.cancel()
+        delivered = sum(task.result() for task in done) + sum([await task for task in pending])
+        return elapsed, delivered, len(channels) * count
@@ -0,0 +1,421 @@
+# boards/management/commands/bench_endpoints.py
+import json
+import random
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, reset_queries, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from auth_app import urls as auth_urls
+from auth_app.models import Profile
+from auth_app.tokens import get_tokens_for_user
+from boards import urls as board_urls
+from boards.cache import BOARD_RESPONSE_CACHE_ALIAS
+from boards.management.commands.loadtest_websockets import percentile
+from boards.models import (
+    Attachment, Board, BoardInviteLink, BoardMembership, Card, CardActivity, CardMembership,
+    Checklist, ChecklistItem, Comment, Label, List, Workspace,
+)
+from boards.sharding import assign_ids, copy_reference_rows
+from config.db_router import REPLICA_PIN_COOKIE, shard_aliases, use_shard
+
+User = get_user_model()
+
+BENCH_PASSWORD = 'bench-password'
+HTTP_METHODS = ('get', 'post', 'put', 'patch', 'delete')
+
+# Tiền tố của từng urls.py trong config/urls.py
+URLCONFS = [('api/auth/', auth_urls), ('api/', board_urls)]
+
+
+class _Rollback(Exception):
+    pass
+
+
+def case(method, route, body=None, *, name=None, user='owner', query='', kwargs=None, budget_factor=1):
+    """
+    Một request của benchmark. `route` viết y như trong urls.py (kèm tiền tố); tham số URL
+    lấy từ dữ liệu seed cùng tên, hoặc theo `kwargs` (tham số → khoá trong dữ liệu seed).
+    `body` là dict/list, hoặc hàm nhận dữ liệu seed.
+    """
+    return {
+        'name': name or f'{method.upper()} {route}',
+        'method': method, 'route': route, 'body': body, 'user': user, 'query': query,
+        'kwargs': kwargs or {}, 'budget_factor': budget_factor,
+    }
+
+
+# Login/register băm mật khẩu (PBKDF2) nên chậm hơn hẳn các endpoint khác
+PASSWORD_HASH_BUDGET = 10
+
+CASES = [
+    # auth_app/urls.py
+    case('post', 'api/auth/register/', {'email': 'bench_new@example.com', 'password': BENCH_PASSWORD},
+         user=None, budget_factor=PASSWORD_HASH_BUDGET),
+    case('post', 'api/auth/login/', lambda f: {'email': f['owner_email'], 'password': BENCH_PASSWORD},
+         user=None, budget_factor=PASSWORD_HASH_BUDGET),
+    case('post', 'api/auth/logout/'),
+    case('get', 'api/auth/me/'),
+    case('get', 'api/auth/users/search/', query='q=bench'),
+    case('get', 'api/auth/me/profile/'),
+    case('patch', 'api/auth/me/profile/', {'bio': 'bench'}),
+
+    # boards/urls.py
+    case('get', 'api/workspaces/'),
+    case('post', 'api/workspaces/', {'name': 'bench'}),
+    case('get', 'api/workspaces/<int:workspace_id>/boards/'),
+    case('post', 'api/workspaces/<int:workspace_id>/boards/', {'name': 'bench'}),
+    case('get', 'api/boards/<int:board_id>/lists/'),
+    case('post', 'api/boards/<int:board_id>/lists/', lambda f: {'name': 'bench', 'board': f['board_id']}),
+    case('get', 'api/lists/<int:list_id>/cards/'),
+    case('post', 'api/lists/<int:list_id>/cards/', lambda f: {'name': 'bench', 'list': f['list_id']}),
+    case('get', 'api/workspaces/<int:workspace_id>/boards/<int:board_id>/'),
+    case('patch', 'api/workspaces/<int:workspace_id>/boards/<int:board_id>/', {'is_closed': False}),
+    case('delete', 'api/workspaces/<int:workspace_id>/boards/<int:board_id>/'),
+    case('get', 'api/boards/<int:board_id>/changes/'),
+    case('patch', 'api/cards/<int:card_id>/', {'name': 'renamed'}),
+    case('patch', 'api/cards/<int:card_id>/', lambda f: {'list': f['other_list_id'], 'position': 0},
+         name='PATCH api/cards/<int:card_id>/ (move)'),
+    case('delete', 'api/cards/<int:card_id>/'),
+    case('patch', 'api/lists/<int:list_id>/', {'name': 'renamed'}),
+    case('delete', 'api/lists/<int:list_id>/'),
+    case('get', 'api/cards/'),
+    case('post', 'api/cards/', {'name': 'bench inbox'}),
+    case('get', 'api/boards/<int:board_id>/labels/'),
+    case('post', 'api/boards/<int:board_id>/labels/', {'name': 'bench', 'color': '#61bd4f'}),
+    case('get', 'api/boards/<int:board_id>/members/'),
+    case('post', 'api/boards/<int:board_id>/members/', lambda f: {'user_id': f['outsider_id'], 'role': 'viewer'}),
+    case('patch', 'api/boards/<int:board_id>/members/', lambda f: {'user_id': f['board_member_id'], 'role': 'editor'}),
+    case('delete', 'api/boards/<int:board_id>/members/', lambda f: {'user_id': f['board_member_id']}),
+    case('patch', 'api/labels/<int:label_id>/', {'name': 'renamed'}),
+    case('delete', 'api/labels/<int:label_id>/'),
+    case('patch', 'api/cards/batch-update/',
+         lambda f: [{'id': card_id, 'position': i} for i, card_id in enumerate(reversed(f['batch_card_ids']))]),
+    case('get', 'api/boards/closed/'),
+    case('get', 'api/boards/<int:board_id>/share-link/'),
+    case('post', 'api/boards/<int:board_id>/share-link/', {'role': 'member'}),
+    case('delete', 'api/boards/<int:board_id>/share-link/'),
+    case('post', 'api/boards/join/<uuid:token>/', user='outsider'),
+    case('get', 'api/cards/<int:card_id>/comments/'),
+    case('post', 'api/cards/<int:card_id>/comments/', {'content': 'bench'}),
+    case('patch', 'api/comments/<int:comment_id>/', {'content': 'edited'}),
+    case('delete', 'api/comments/<int:comment_id>/'),
+    case('get', 'api/cards/<int:card_id>/memberships/'),
+    case('post', 'api/cards/<int:card_id>/memberships/', lambda f: {'user_id': f['board_member_id']}),
+    case('patch', 'api/cards/<int:card_id>/memberships/<int:user_id>/', {'role': 'reviewer'},
+         kwargs={'user_id': 'card_member_id'}),
+    case('delete', 'api/cards/<int:card_id>/memberships/<int:user_id>/', kwargs={'user_id': 'card_member_id'}),
+    case('get', 'api/cards/<int:card_id>/watchers/'),
+    case('post', 'api/cards/<int:card_id>/watchers/', {'action': 'add'}),
+    case('get', 'api/cards/<int:card_id>/activities/'),
+    case('get', 'api/cards/<int:card_id>/checklists/'),
+    case('post', 'api/cards/<int:card_id>/checklists/', {'title': 'bench'}),
+    case('get', 'api/checklists/<int:pk>/', kwargs={'pk': 'checklist_id'}),
+    case('put', 'api/checklists/<int:pk>/', {'title': 'renamed'}, kwargs={'pk': 'checklist_id'}),
+    case('patch', 'api/checklists/<int:pk>/', {'title': 'renamed'}, kwargs={'pk': 'checklist_id'}),
+    case('delete', 'api/checklists/<int:pk>/', kwargs={'pk': 'checklist_id'}),
+    case('get', 'api/checklists/<int:checklist_id>/items/'),
+    case('post', 'api/checklists/<int:checklist_id>/items/', {'text': 'bench'}),
+    case('get', 'api/checklist-items/<int:pk>/', kwargs={'pk': 'item_id'}),
+    case('put', 'api/checklist-items/<int:pk>/', {'text': 'renamed'}, kwargs={'pk': 'item_id'}),
+    case('patch', 'api/checklist-items/<int:pk>/', {'completed': True}, kwargs={'pk': 'item_id'}),
+    case('delete', 'api/checklist-items/<int:pk>/', kwargs={'pk': 'item_id'}),
+    case('patch', 'api/checklists/<int:pk>/reorder-items/', lambda f: {'item_ids': f['item_ids'][::-1]},
+         kwargs={'pk': 'checklist_id'}),
+    case('post', 'api/checklist-items/<int:pk>/convert-to-card/', kwargs={'pk': 'item_id'}),
+    case('get', 'api/cards/<int:card_id>/attachments/'),
+    case('post', 'api/cards/<int:card_id>/attachments/',
+         {'attachment_type': 'link', 'url': 'https://example.com/bench'}),
+    case('get', 'api/attachments/<int:attachment_id>/'),
+    case('patch', 'api/attachments/<int:attachment_id>/', {'name': 'renamed'}),
+    case('delete', 'api/attachments/<int:attachment_id>/'),
+]
+
+# (method, route) không chạy được trong benchmark, kèm lý do
+SKIPPED = {
+    ('post', 'api/auth/google-login/'): "gọi API của Google để xác minh id token",
+}
+
+
+def api_routes():
+    """(method, route) của mọi view trong auth_app/urls.py và boards/urls.py"""
+    routes = []
+    for prefix, urlconf in URLCONFS:
+        for pattern in urlconf.urlpatterns:
+            view_class = pattern.callback.view_class
+            route = prefix + str(pattern.pattern)
+            routes += [(method, route) for method in HTTP_METHODS if hasattr(view_class, method)]
+    return routes
+
+
+def seed_endpoint_data(n_lists, n_cards, n_members, seed=0):
+    """
+    Workspace với board chính (n_lists list, n_cards card chia đều, n_members thành viên),
+    vài board phụ, card ở Inbox và dữ liệu con (comment, checklist, attachment...) cho card đầu tiên.
+    Trả về dict id dùng để dựng URL/body của CASES.
+    """
+    rng = random.Random(seed)
+    users = [
+        User(username=f'bench_endpoint_{i}', email=f'bench_endpoint_{i}@example.com',
+             first_name=rng.choice(['', 'An', 'Binh', 'Chi']), last_name=rng.choice(['', 'Nguyen', 'Tran']))
+        for i in range(n_members + 1)
+    ]
+    users[0].set_password(BENCH_PASSWORD)
+    users = User.objects.bulk_create(users)
+    Profile.objects.bulk_create([Profile(user=u) for u in users])
+    owner, members, outsider = users[0], users[1:n_members], users[n_members]
+
+    workspace = Workspace.objects.create(name='bench', owner=owner)
+    alias = workspace.shard
+    if alias != 'default':
+        # bulk_create không phát signal chép user/profile sang shard (boards.sharding)
+        copy_reference_rows(alias, user_ids=[u.pk for u in users], workspace_ids=[workspace.pk])
+
+    with use_shard(alias):
+        board = Board.objects.create(name='bench', workspace=workspace, created_by=owner)
+        for i in range(4):
+            Board.objects.create(name=f'bench {i}', workspace=workspace, created_by=owner, is_closed=i == 0)
+        roles = ['admin', 'editor', 'viewer']
+        BoardMembership.objects.bulk_create([
+            BoardMembership(board=board, user=user, role='admin' if i == 0 else rng.choice(roles))
+            for i, user in enumerate(members)
+        ])
+        BoardInviteLink.objects.create(board=board, created_by=owner)
+        labels = Label.objects.bulk_create(assign_ids([
+            Label(name=f'L{i}', color='#61bd4f', board=board) for i in range(6)
+        ]))
+        lists = List.objects.bulk_create(assign_ids([
+            List(name=f'List {i}', board=board, position=i) for i in range(n_lists)
+        ]), batch_size=1000)
+        cards = Card.objects.bulk_create(assign_ids([
+            Card(name=f'Card {i}', list=lists[i % n_lists], created_by=owner, position=i // n_lists,
+                 description='x' * rng.randint(0, 200), due_date=timezone.now() if i % 3 == 0 else None)
+            for i in range(n_cards)
+        ]), batch_size=1000)
+        Card.objects.bulk_create(assign_ids([
+            Card(name=f'Inbox {i}', list=None, created_by=owner) for i in range(20)
+        ]))
+        Card.labels.through.objects.bulk_create([
+            Card.labels.through(card=card, label=label)
+            for card in cards
+            for label in rng.sample(labels, rng.randint(0, 2))
+        ], batch_size=1000)
+        CardMembership.objects.bulk_create([
+            CardMembership(card=card, user=user, assigned_by=owner)
+            for card in cards
+            for user in rng.sample(members, rng.randint(0, 2))
+        ], batch_size=1000)
+
+        card = cards[0]
+        card_member = next(m for m in members[1:] if not CardMembership.objects.filter(card=card, user=m).exists())
+        CardMembership.objects.create(card=card, user=card_member, assigned_by=owner)
+        CardMembership.objects.filter(card=card, user=members[0]).delete()
+        card.watchers.add(*members[:5])
+        comments = Comment.objects.bulk_create(assign_ids([
+            Comment(card=card, author=rng.choice(members), content=f'Comment {i}') for i in range(20)
+        ]))
+        CardActivity.objects.bulk_create([
+            CardActivity(card=card, user=owner, activity_type='comment_added', description=f'Activity {i}')
+            for i in range(20)
+        ])
+        checklists = Checklist.objects.bulk_create(assign_ids([
+            Checklist(card=card, title=f'Checklist {i}', position=i, created_by=owner) for i in range(3)
+        ]))
+        items = ChecklistItem.objects.bulk_create(assign_ids([
+            ChecklistItem(checklist=checklists[0], text=f'Item {i}', position=i) for i in range(10)
+        ]))
+        attachments = Attachment.objects.bulk_create(assign_ids([
+            Attachment(card=card, name=f'Link {i}', attachment_type='link', url=f'https://example.com/{i}',
+                       uploaded_by=owner)
+            for i in range(5)
+        ]))
+
+    return {
+        'users': {'owner': owner, 'outsider': outsider},
+        'owner_email': owner.email,
+        'workspace_id': workspace.pk,
+        'board_id': board.pk,
+        'list_id': lists[0].pk,
+        'other_list_id': lists[1 % n_lists].pk,
+        'card_id': card.pk,
+        'batch_card_ids': [c.pk for c in cards[:50]],
+        'label_id': labels[0].pk,
+        'board_member_id': members[0].pk,
+        'card_member_id': card_member.pk,
+        'outsider_id': outsider.pk,
+        'token': board.invite_link.token,
+        'comment_id': comments[0].pk,
+        'checklist_id': checklists[0].pk,
+        'item_id': items[0].pk,
+        'item_ids': [i.pk for i in items],
+        'attachment_id': attachments[0].pk,
+    }
+
+
+def build_path(item, fixtures):
+    def value(match):
+        name = match.group(1)
+        return str(fixtures[item['kwargs'].get(name, name)])
+    path = '/' + re.sub(r'<(?:\w+:)?(\w+)>', value, item['route'])
+    return f"{path}?{item['query']}" if item['query'] else path
+
+
+class Command(BaseCommand):
+    help = ("Benchmark mọi endpoint trong auth_app/urls.py và boards/urls.py ở nhiều quy mô dữ liệu "
+            "(--scales số list của board, --cards card, --members thành viên): đo số truy vấn SQL, "
+            "p50/p95 độ trễ và kích thước response. Mỗi request (và dữ liệu seed) được rollback. "
+            "Lỗi nếu có request thất bại, số truy vấn tăng so với --baseline hoặc p95 vượt --budget-ms.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='10,100,1000', help="Số list của board, cách nhau bởi dấu phẩy")
+        parser.add_argument('--cards', type=int, default=10000)
+        parser.add_argument('--members', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--only', default=None, help="Regex lọc theo tên case, vd. 'cards'")
+        parser.add_argument('--accept-encoding', default='', help="Header Accept-Encoding, vd. gzip")
+        parser.add_argument('--budget-ms', type=float, default=500,
+                            help="Ngân sách p95 cho mỗi endpoint (0 = không kiểm tra)")
+        parser.add_argument('--output', default=None, help="Ghi kết quả ra file JSON")
+        parser.add_argument('--baseline', default=None,
+                            help="File JSON của lần chạy trước: lỗi nếu endpoint nào cần nhiều truy vấn hơn")
+
+    def handle(self, *args, **options):
+        missing = sorted({r for r in api_routes() if r not in SKIPPED}
+                         - {(c['method'], c['route']) for c in CASES})
+        if missing:
+            raise CommandError("No benchmark case for: " + ', '.join(f'{m.upper()} {r}' for m, r in missing))
+        for (method, route), reason in SKIPPED.items():
+            self.stdout.write(f"skip {method.upper()} {route}: {reason}")
+
+        cases = CASES
+        if options['only']:
+            cases = [c for c in CASES if re.search(options['only'], c['name'])]
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)['results']
+
+        results, problems = {}, []
+        for n_lists in (int(s) for s in options['scales'].split(',')):
+            scale = f'{n_lists}_lists'
+            results[scale] = self._run_scale(n_lists, cases, options)
+            problems += self._check(scale, results[scale], cases, baseline, options)
+
+        report = {
+            'options': {k: options[k] for k in ('scales', 'cards', 'members', 'repeat', 'accept_encoding')},
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(f"report written to {options['output']}")
+        if problems:
+            raise CommandError(f"{len(problems)} regression(s):\n" + '\n'.join(problems))
+
+    def _run_scale(self, n_lists, cases, options):
+        # Cache response riêng cho mỗi quy mô: id có thể được dùng lại sau rollback
+        caches_setting = {
+            **settings.CACHES,
+            BOARD_RESPONSE_CACHE_ALIAS: {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': f'bench-endpoints-{n_lists}',
+            },
+        }
+        results = {}
+        try:
+            with override_settings(CACHES=caches_setting, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), \
+                    self._atomic_all():
+                started = time.perf_counter()
+                fixtures = seed_endpoint_data(n_lists, options['cards'], options['members'])
+                self.stdout.write(f"\n{n_lists} lists, {options['cards']} cards, {options['members']} members "
+                                  f"(seeded in {time.perf_counter() - started:.1f}s)")
+                clients = {None: self._client(None, options)}
+                for key, user in fixtures['users'].items():
+                    clients[key] = self._client(user, options)
+                for item in cases:
+                    results[item['name']] = self._run_case(item, clients[item['user']], fixtures, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+        return results
+
+    def _atomic_all(self):
+        stack = ExitStack()
+        for alias in shard_aliases():
+            stack.enter_context(transaction.atomic(using=alias))
+        return stack
+
+    def _client(self, user, options):
+        headers = {}
+        if user is not None:
+            headers['HTTP_AUTHORIZATION'] = f"Bearer {get_tokens_for_user(user)['access']}"
+        if options['accept_encoding']:
+            headers['HTTP_ACCEPT_ENCODING'] = options['accept_encoding']
+        client = Client(raise_request_exception=False, **headers)
+        # Dữ liệu seed chỉ có ở primary
+        client.cookies[REPLICA_PIN_COOKIE] = '1'
+        return client
+
+    def _run_case(self, item, client, fixtures, options):
+        path = build_path(item, fixtures)
+        body = item['body'](fixtures) if callable(item['body']) else item['body']
+        timings, queries, statuses = [], [], set()
+        size = 0
+        for _ in range(options['repeat']):
+            try:
+                # DEBUG=True: queries_log có giới hạn, đầy thì CaptureQueriesContext không đếm được
+                reset_queries()
+                with self._atomic_all() as stack:
+                    captured = [stack.enter_context(CaptureQueriesContext(connections[alias]))
+                                for alias in shard_aliases()]
+                    start = time.perf_counter()
+                    if body is None:
+                        response = getattr(client, item['method'])(path)
+                    else:
+                        response = getattr(client, item['method'])(path, body, content_type='application/json')
+                    size = len(response.getvalue())
+                    timings.append(time.perf_counter() - start)
+                    queries.append(sum(len(c) for c in captured))
+                    statuses.add(response.status_code)
+                    raise _Rollback
+            except _Rollback:
+                pass
+        # Lần đầu là cache lạnh; p50/p95 tính trên các lần sau
+        warm = timings[1:] or timings
+        result = {
+            'status': sorted(statuses),
+            'queries': queries[0],
+            'queries_warm': queries[-1],
+            'first_ms': round(timings[0] * 1000, 2),
+            'p50_ms': round(percentile(warm, 50) * 1000, 2),
+            'p95_ms': round(percentile(warm, 95) * 1000, 2),
+            'bytes': size,
+        }
+        self.stdout.write(
+            f"{item['name']:<64} {','.join(map(str, result['status'])):>7} {result['queries']:>4} q "
+            f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  {size:>9} B"
+        )
+        return result
+
+    def _check(self, scale, results, cases, baseline, options):
+        problems = []
+        for item in cases:
+            name = item['name']
+            result = results[name]
+            failed = [s for s in result['status'] if s >= 400]
+            if failed:
+                problems.append(f"{scale} {name}: HTTP {','.join(map(str, failed))}")
+            budget = options['budget_ms'] * item['budget_factor']
+            if budget and result['p95_ms'] > budget:
+                problems.append(f"{scale} {name}: p95 {result['p95_ms']:.1f} ms > budget {budget:.0f} ms")
+            previous = (baseline or {}).get(scale, {}).get(name)
+            if previous and result['queries'] > previous['queries']:
+                problems.append(f"{scale} {name}: {result['queries']} queries (baseline {previous['queries']})")
+        return problems
@@ -0,0 +1,73 @@
+# boards/management/commands/bench_json.py
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from boards.management.commands.bench_serializers import _Rollback, _card_serializer, seed_board
+from config import renderers
+from config.renderers import FastJSONParser, FastJSONRenderer
+
+
+class Command(BaseCommand):
+    help = ("So sánh config.renderers (orjson nếu có) với JSONRenderer/JSONParser của DRF: "
+            "kiểm tra output giống hệt và đo throughput trên payload card thật (seed rồi rollback). "
+            "Các trường hợp biên được kiểm tra trong config/tests.py.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=300)
+        parser.add_argument('--members-per-card', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"orjson: {getattr(renderers.orjson, '__version__', 'not installed')}")
+        try:
+            with transaction.atomic():
+                list_obj = seed_board(options['cards'], options['users'], options['members_per_card'])
+                payload = _card_serializer(list_obj)
+                mismatches = self._check_conformance({'cards': payload})
+                self._run_benchmark(payload, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if mismatches:
+            raise CommandError(f"Conformance check failed: {', '.join(mismatches)}")
+
+    def _check_conformance(self, cases):
+        mismatches = []
+        reference, fast = JSONRenderer(), FastJSONRenderer()
+        for name, data in cases.items():
+            expected = reference.render(data)
+            ok = fast.render(data) == expected and renderers._stdlib_dumps(data) == expected
+            if ok:
+                parsed = JSONParser().parse(io.BytesIO(expected))
+                ok = FastJSONParser().parse(io.BytesIO(expected)) == parsed
+            if not ok:
+                mismatches.append(name)
+            self.stdout.write(f"conformance {name:>16}: {'OK' if ok else 'MISMATCH'}")
+        return mismatches
+
+    def _run_benchmark(self, payload, options):
+        body = JSONRenderer().render(payload)
+        self.stdout.write(f"payload: {options['cards']} cards, {len(body) / 1024:.0f} KiB")
+        cases = [
+            ('render JSONRenderer', lambda: JSONRenderer().render(payload)),
+            ('render FastJSONRenderer', lambda: FastJSONRenderer().render(payload)),
+            ('parse JSONParser', lambda: JSONParser().parse(io.BytesIO(body))),
+            ('parse FastJSONParser', lambda: FastJSONParser().parse(io.BytesIO(body))),
+        ]
+        for name, func in cases:
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            self.stdout.write(
+                f"{name:>24}: best {best * 1000:8.1f} ms  {len(body) / best / 2 ** 20:8.1f} MiB/s"
+            )
@@ -0,0 +1,141 @@
+# boards/management/commands/bench_serializers.py
+import json
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from auth_app.models import Profile
+from boards.models import Board, Card, CardMembership, Label, List, Workspace
+from boards.readers import read_boards, read_cards, read_lists
+from boards.serializers import (
+    LABELS_BY_ID, MEMBERS_WITH_PROFILE, BoardSerializer, CardSerializer, ListSerializer,
+)
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+def seed_board(n_cards, n_users, members_per_card, seed=0):
+    """Tạo một board với n_cards card, mỗi card có vài member lấy từ n_users user"""
+    rng = random.Random(seed)
+    users = User.objects.bulk_create([
+        User(username=f'bench_user_{i}', email=f'bench_user_{i}@example.com',
+             first_name=rng.choice(['', 'An', 'Binh', 'Chi']), last_name=rng.choice(['', 'Nguyen', 'Tran']))
+        for i in range(n_users)
+    ])
+    Profile.objects.bulk_create([Profile(user=u) for u in users])
+    owner = users[0]
+    workspace = Workspace.objects.create(name='bench', owner=owner)
+    board = Board.objects.create(name='bench', workspace=workspace, created_by=owner)
+    list_obj = List.objects.create(name='bench', board=board)
+    labels = Label.objects.bulk_create([Label(name=f'L{i}', color='#61bd4f', board=board) for i in range(6)])
+    List.objects.bulk_create([List(name=f'List {i}', board=board, position=i + 1) for i in range(20)])
+    cards = Card.objects.bulk_create([
+        Card(name=f'Card {i}', list=list_obj, created_by=owner, position=i, description='x' * rng.randint(0, 200),
+             due_date=timezone.now() if i % 3 == 0 else None)
+        for i in range(n_cards)
+    ])
+    Card.labels.through.objects.bulk_create([
+        Card.labels.through(card=card, label=label)
+        for card in cards
+        for label in rng.sample(labels, rng.randint(0, 2))
+    ])
+    CardMembership.objects.bulk_create([
+        CardMembership(card=card, user=user, assigned_by=owner)
+        for card in cards
+        for user in rng.sample(users, members_per_card)
+    ])
+    return list_obj
+
+
+def _cards(list_obj):
+    return Card.objects.filter(list=list_obj).order_by('position')
+
+
+def _card_serializer(list_obj):
+    return CardSerializer(_cards(list_obj).prefetch_related(MEMBERS_WITH_PROFILE, LABELS_BY_ID), many=True).data
+
+
+def _card_reader(list_obj):
+    return read_cards(_cards(list_obj))
+
+
+CASES = {
+    'CardSerializer': _card_serializer,
+    'read_cards': _card_reader,
+}
+
+# (tên, serializer DRF, reader nhanh) - output phải giống hệt nhau
+PARITY_CHECKS = [
+    ('cards', _card_serializer, _card_reader),
+    ('lists',
+     lambda l: ListSerializer(List.objects.filter(board_id=l.board_id).order_by('position'), many=True).data,
+     lambda l: read_lists(List.objects.filter(board_id=l.board_id).order_by('position'))),
+    ('boards',
+     lambda l: BoardSerializer(Board.objects.filter(id=l.board_id).select_related('workspace'), many=True).data,
+     lambda l: read_boards(Board.objects.filter(id=l.board_id))),
+]
+
+
+class Command(BaseCommand):
+    help = ("Benchmark serialize payload card lớn (mặc định 5.000 card), so sánh serializer DRF với boards.readers. "
+            "Dữ liệu seed được rollback sau khi chạy.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=300)
+        parser.add_argument('--members-per-card', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--check', action='store_true',
+                            help="So sánh output của boards.readers với serializer DRF, lỗi nếu khác nhau")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                list_obj = seed_board(options['cards'], options['users'], options['members_per_card'])
+                self.stdout.write(
+                    f"{options['cards']} cards, {options['users']} users, "
+                    f"{options['members_per_card']} members/card"
+                )
+                if options['check']:
+                    mismatches = self._check_parity(list_obj)
+                for name, func in CASES.items():
+                    self._run_case(name, func, list_obj, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+        if options['check'] and mismatches:
+            raise CommandError(f"Parity check failed: {', '.join(mismatches)}")
+
+    def _check_parity(self, list_obj):
+        mismatches = []
+        for name, reference, fast in PARITY_CHECKS:
+            expected = json.loads(json.dumps(reference(list_obj), cls=JSONEncoder))
+            actual = json.loads(json.dumps(fast(list_obj), cls=JSONEncoder))
+            ok = expected == actual
+            if not ok:
+                mismatches.append(name)
+            self.stdout.write(f"parity {name:>8}: {'OK' if ok else 'MISMATCH'} ({len(expected)} rows)")
+        return mismatches
+
+    def _run_case(self, name, func, list_obj, options):
+        timings = []
+        for _ in range(options['repeat']):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                func(list_obj)
+                timings.append(time.perf_counter() - start)
+        best = min(timings)
+        self.stdout.write(
+            f"{name:>24}: best {best * 1000:8.1f} ms  "
+            f"{options['cards'] / best:10.0f} cards/s  {len(queries.captured_queries)} queries"
+        )
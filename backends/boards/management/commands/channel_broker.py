@@ -0,0 +1,22 @@
+# boards/management/commands/channel_broker.py
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from config.channel_layers import ChannelBroker
+
+
+class Command(BaseCommand):
+    help = ("Chạy broker cho UnixSocketChannelLayer (CHANNEL_LAYER=unix): chuyển group_send/send "
+            "giữa các worker ASGI trên cùng một máy. Chạy trước khi khởi động các worker.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=getattr(settings, 'CHANNEL_BROKER_SOCKET', '/tmp/tasknest-channels.sock'))
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Channel broker listening on {options['socket']}")
+        try:
+            asyncio.run(ChannelBroker(options['socket']).serve())
+        except KeyboardInterrupt:
+            pass
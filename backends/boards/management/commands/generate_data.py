@@ -0,0 +1,219 @@
+# boards/management/commands/generate_data.py
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from auth_app.models import Profile
+from boards.models import (
+    Board, BoardMembership, Card, CardActivity, CardMembership, Checklist, ChecklistItem, Comment,
+    Label, List, Workspace,
+)
+from boards.sharding import assign_ids, copy_reference_rows, shard_for
+from config.db_router import use_shard
+
+User = get_user_model()
+
+GENERATED_PASSWORD = 'generated-password'
+LABEL_COLORS = ['#61bd4f', '#f2d600', '#ff9f1a', '#eb5a46', '#c377e0', '#0079bf']
+ROLE_WEIGHTS = {'admin': 1, 'editor': 6, 'viewer': 3}
+WORDS = ('fix deploy review design api login board card mobile report sync cache test bug page '
+         'release docs invoice meeting client search upload export import onboarding').split()
+
+
+class Distribution:
+    """
+    Số lượng ngẫu nhiên cho một tham số:
+    '5' → luôn 5; '2-8' → đều trong [2, 8]; '~20' → phân phối mũ trung bình 20
+    (đa số nhỏ, vài giá trị rất lớn, giống board/list thật).
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        try:
+            if spec.startswith('~'):
+                self.mean = float(spec[1:])
+                self.low = self.high = None
+            elif '-' in spec:
+                self.low, self.high = (int(x) for x in spec.split('-', 1))
+            else:
+                self.low = self.high = int(spec)
+        except ValueError:
+            raise ValueError(f"invalid distribution {spec!r}")
+
+    def __call__(self, rng):
+        if self.low is None:
+            return int(rng.expovariate(1 / self.mean)) if self.mean else 0
+        return rng.randint(self.low, self.high)
+
+    def __str__(self):
+        return self.spec
+
+
+def _sentence(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+
+
+class Command(BaseCommand):
+    help = ("Sinh dữ liệu giả lập quy mô lớn (workspace, board, list, card, label, thành viên, comment, "
+            "checklist, activity) bằng bulk_create theo lô. Cùng --seed cho cùng dữ liệu. Số lượng nhận "
+            "'N', 'a-b' (đều) hoặc '~N' (phân phối mũ, trung bình N). User sinh ra có mật khẩu "
+            f"'{GENERATED_PASSWORD}'.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='gen', help="Tiền tố username/tên, phải khác các lần chạy trước")
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--workspaces', type=int, default=100)
+        parser.add_argument('--boards', type=Distribution, default=Distribution('1-10'), help="Board mỗi workspace")
+        parser.add_argument('--members', type=Distribution, default=Distribution('~10'), help="Thành viên mỗi board")
+        parser.add_argument('--labels', type=Distribution, default=Distribution('6'), help="Label mỗi board")
+        parser.add_argument('--lists', type=Distribution, default=Distribution('3-12'), help="List mỗi board")
+        parser.add_argument('--cards', type=Distribution, default=Distribution('~30'), help="Card mỗi list")
+        parser.add_argument('--card-labels', type=Distribution, default=Distribution('0-2'))
+        parser.add_argument('--card-members', type=Distribution, default=Distribution('0-2'))
+        parser.add_argument('--comments', type=Distribution, default=Distribution('~2'), help="Comment mỗi card")
+        parser.add_argument('--checklists', type=Distribution, default=Distribution('0-1'), help="Checklist mỗi card")
+        parser.add_argument('--items', type=Distribution, default=Distribution('2-8'), help="Item mỗi checklist")
+        parser.add_argument('--activities', type=Distribution, default=Distribution('~3'), help="Activity mỗi card")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=f"{options['prefix']}_user_").exists():
+            raise CommandError(f"Users with prefix {options['prefix']!r} already exist, choose another --prefix")
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.counts = Counter()
+        self.now = timezone.now()
+        started = time.perf_counter()
+
+        users = self._create_users()
+        for i in range(options['workspaces']):
+            self._create_workspace(i, users)
+            if (i + 1) % 10 == 0 or i + 1 == options['workspaces']:
+                total = sum(self.counts.values())
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{i + 1}/{options['workspaces']} workspaces, {total} rows, "
+                                  f"{total / elapsed:.0f} rows/s")
+
+        for name, count in sorted(self.counts.items()):
+            self.stdout.write(f"{name:>18}: {count}")
+        self.stdout.write(f"{sum(self.counts.values())} rows in {time.perf_counter() - started:.1f}s")
+
+    def _bulk_create(self, model, objs, using=None):
+        objs = model.objects.using(using).bulk_create(assign_ids(objs), batch_size=self.options['batch_size'])
+        self.counts[model._meta.model_name] += len(objs)
+        return objs
+
+    def _create_users(self):
+        rng, prefix = self.rng, self.options['prefix']
+        # Băm mật khẩu một lần cho mọi user (PBKDF2 rất chậm nếu băm từng user)
+        password = make_password(GENERATED_PASSWORD)
+        first_names = ['An', 'Binh', 'Chi', 'Dung', 'Giang', 'Hoa', 'Khanh', 'Linh', 'Minh', 'Nam']
+        last_names = ['Nguyen', 'Tran', 'Le', 'Pham', 'Hoang', 'Vu', 'Dang', 'Bui']
+        with transaction.atomic(using='default'):
+            users = self._bulk_create(User, [
+                User(username=f'{prefix}_user_{i}', email=f'{prefix}_user_{i}@example.com', password=password,
+                     first_name=rng.choice(first_names), last_name=rng.choice(last_names))
+                for i in range(self.options['users'])
+            ], using='default')
+            self._bulk_create(Profile, [Profile(user=u) for u in users], using='default')
+        # bulk_create không phát signal chép bảng tham chiếu sang shard (boards.sharding)
+        for alias in getattr(settings, 'DATABASE_SHARDS', []):
+            copy_reference_rows(alias, user_ids=[u.pk for u in users])
+        return users
+
+    def _create_workspace(self, index, users):
+        rng, opts = self.rng, self.options
+        owner = rng.choice(users)
+        # create() để workspace được đặt vào shard và chép sang các shard như khi tạo qua API
+        workspace = Workspace.objects.create(name=f"{opts['prefix']} workspace {index}", owner=owner)
+        self.counts['workspace'] += 1
+        alias = shard_for(Workspace, pk=workspace.pk)
+
+        with use_shard(alias), transaction.atomic(using=alias):
+            boards, board_members = [], {}
+            for i in range(max(1, opts['boards'](rng))):
+                board = Board(name=_sentence(rng, 1, 3), workspace=workspace, created_by=owner,
+                              is_closed=rng.random() < 0.05)
+                members = rng.sample(users, min(len(users), opts['members'](rng)))
+                boards.append(board)
+                board_members[id(board)] = [owner] + [m for m in members if m != owner]
+            self._bulk_create(Board, boards, using=alias)
+            members_of = {board.pk: board_members[id(board)] for board in boards}
+
+            roles, weights = list(ROLE_WEIGHTS), list(ROLE_WEIGHTS.values())
+            self._bulk_create(BoardMembership, [
+                BoardMembership(board=board, user=user, role=rng.choices(roles, weights)[0])
+                for board in boards
+                for user in members_of[board.pk][1:]
+            ], using=alias)
+
+            labels = self._bulk_create(Label, [
+                Label(name=rng.choice(WORDS), color=rng.choice(LABEL_COLORS), board=board)
+                for board in boards
+                for _ in range(opts['labels'](rng))
+            ], using=alias)
+            labels_of = {}
+            for label in labels:
+                labels_of.setdefault(label.board_id, []).append(label)
+
+            lists = self._bulk_create(List, [
+                List(name=_sentence(rng, 1, 2), board=board, position=position)
+                for board in boards
+                for position in range(opts['lists'](rng))
+            ], using=alias)
+
+            cards = self._bulk_create(Card, [
+                Card(name=_sentence(rng, 2, 6), list=list_obj, position=position,
+                     created_by=rng.choice(members_of[list_obj.board_id]),
+                     description=_sentence(rng, 0, 40) if rng.random() < 0.4 else '',
+                     due_date=self.now + timedelta(days=rng.randint(-30, 60)) if rng.random() < 0.3 else None,
+                     completed=rng.random() < 0.2,
+                     status=rng.choice([c[0] for c in Card._meta.get_field('status').choices]))
+                for list_obj in lists
+                for position in range(opts['cards'](rng))
+            ], using=alias)
+            board_of_list = {list_obj.pk: list_obj.board_id for list_obj in lists}
+            self._create_card_children(cards, board_of_list, members_of, labels_of, alias)
+
+    def _create_card_children(self, cards, board_of_list, members_of, labels_of, alias):
+        rng, opts = self.rng, self.options
+        # Truyền *_id thay vì object: nhanh hơn đáng kể khi tạo hàng trăm nghìn hàng
+        through = Card.labels.through
+        card_labels, card_members, comments, checklists, activities = [], [], [], [], []
+        for card in cards:
+            board_id = board_of_list[card.list_id]
+            members = members_of[board_id]
+            board_labels = labels_of.get(board_id, [])
+            for label in rng.sample(board_labels, min(len(board_labels), opts['card_labels'](rng))):
+                card_labels.append(through(card_id=card.pk, label_id=label.pk))
+            for user in rng.sample(members, min(len(members), opts['card_members'](rng))):
+                card_members.append(CardMembership(card_id=card.pk, user_id=user.pk, assigned_by_id=card.created_by_id))
+            for _ in range(opts['comments'](rng)):
+                comments.append(Comment(card_id=card.pk, author_id=rng.choice(members).pk,
+                                        content=_sentence(rng, 3, 30)))
+            for position in range(opts['checklists'](rng)):
+                checklists.append(Checklist(card_id=card.pk, title=_sentence(rng, 1, 3), position=position,
+                                            created_by_id=card.created_by_id))
+            for _ in range(opts['activities'](rng)):
+                activities.append(CardActivity(card_id=card.pk, user_id=rng.choice(members).pk,
+                                               activity_type='card_updated', description=_sentence(rng, 3, 8)))
+        self._bulk_create(through, card_labels, using=alias)
+        self._bulk_create(CardMembership, card_members, using=alias)
+        self._bulk_create(Comment, comments, using=alias)
+        self._bulk_create(CardActivity, activities, using=alias)
+        checklists = self._bulk_create(Checklist, checklists, using=alias)
+        self._bulk_create(ChecklistItem, [
+            ChecklistItem(checklist_id=checklist.pk, text=_sentence(rng, 2, 8), position=position,
+                          completed=rng.random() < 0.4)
+            for checklist in checklists
+            for position in range(opts['items'](rng))
+        ], using=alias)
@@ -0,0 +1,198 @@
+# boards/management/commands/loadtest_websockets.py
+import asyncio
+import itertools
+import json
+import resource
+import statistics
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from auth_app.models import Profile
+from auth_app.tokens import get_tokens_for_user
+from boards.models import Board, Card, List, Workspace
+from boards.sharding import shard_for
+from config.db_router import use_shard
+
+try:
+    import websockets
+except ImportError:  # chỉ cần khi chạy load test
+    websockets = None
+
+User = get_user_model()
+
+LOADTEST_USERNAME = 'loadtest_owner'
+
+
+def seed_boards(n_boards):
+    """Board cho load test (tạo lần đầu, dùng lại ở các lần sau): mỗi board một list, một card"""
+    user, created = User.objects.get_or_create(username=LOADTEST_USERNAME,
+                                               defaults={'email': 'loadtest_owner@example.com'})
+    if created:
+        Profile.objects.create(user=user)
+    workspace, _ = Workspace.objects.get_or_create(name='loadtest', owner=user)
+    alias = shard_for(Workspace, pk=workspace.pk)
+    with use_shard(alias):
+        existing = list(Board.objects.filter(workspace=workspace).order_by('id')[:n_boards])
+        with transaction.atomic(using=alias):
+            for i in range(len(existing), n_boards):
+                board = Board.objects.create(name=f'loadtest {i}', workspace=workspace, created_by=user)
+                list_obj = List.objects.create(name='loadtest', board=board)
+                Card.objects.create(name='loadtest', list=list_obj, created_by=user)
+                existing.append(board)
+        cards = dict(Card.objects.filter(list__board__in=existing).values_list('list__board_id', 'id'))
+    return user, [(board.id, cards[board.id]) for board in existing]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = ("Load test WebSocket với server đang chạy (uvicorn/daphne, cùng database): mở --sockets "
+            "kết nối chia đều cho --boards board, PATCH card qua API để sinh sự kiện và đo độ trễ "
+            "từ lúc gửi request tới lúc từng kết nối nhận được sự kiện. Cần thư viện websockets.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--sockets', type=int, default=10000)
+        parser.add_argument('--boards', type=int, default=500)
+        parser.add_argument('--events', type=int, default=1000, help="Tổng số lần PATCH card")
+        parser.add_argument('--rate', type=float, default=100, help="Số PATCH mỗi giây")
+        parser.add_argument('--connect-rate', type=float, default=1000, help="Số kết nối mở mỗi giây")
+        parser.add_argument('--http-workers', type=int, default=16)
+        parser.add_argument('--settle', type=float, default=5, help="Số giây chờ sự kiện cuối cùng tới")
+        parser.add_argument('--heartbeat', type=float, default=30)
+
+    def handle(self, *args, **options):
+        if websockets is None:
+            raise CommandError("loadtest_websockets needs the 'websockets' package (pip install 'uvicorn[standard]')")
+        self._raise_fd_limit(options['sockets'] + options['http_workers'] + 100)
+        user, boards = seed_boards(options['boards'])
+        self.token = get_tokens_for_user(user)['access']
+        self.stdout.write(f"{options['sockets']} sockets on {len(boards)} boards, "
+                          f"{options['events']} events at {options['rate']}/s against {options['url']}")
+        asyncio.run(self._run(boards, options))
+
+    def _raise_fd_limit(self, needed):
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < needed:
+            target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            if target < needed:
+                self.stderr.write(f"RLIMIT_NOFILE hard limit is {hard}; raise it (ulimit -n) "
+                                  f"to open {needed} sockets. The server needs the same.")
+
+    async def _run(self, boards, options):
+        ws_base = options['url'].replace('http', 'ws', 1).rstrip('/')
+        self.sent_at = {}
+        self.latencies = []
+        self.stats = {'failed': 0, 'closed': 0, 'frames': 0, 'resync': 0}
+        self.connected = Counter()
+        self.stop = asyncio.Event()
+
+        # Kết nối chia round-robin cho các board
+        started = time.perf_counter()
+        interval = 1 / options['connect_rate']
+        tasks, readies = [], []
+        for board_id, _ in itertools.islice(itertools.cycle(boards), options['sockets']):
+            ready = asyncio.get_running_loop().create_future()
+            url = f'{ws_base}/ws/boards/{board_id}/?token={self.token}'
+            tasks.append(asyncio.ensure_future(self._socket(board_id, url, ready, options['heartbeat'])))
+            readies.append(ready)
+            await asyncio.sleep(interval)
+        await asyncio.wait(readies, timeout=60)
+        connect_time = time.perf_counter() - started
+        self.stdout.write(f"connected {sum(self.connected.values())}, failed {self.stats['failed']} "
+                          f"in {connect_time:.1f}s")
+
+        patched = await self._generate(boards, options)
+        await asyncio.sleep(options['settle'])
+        self.stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._report(patched)
+
+    async def _socket(self, board_id, url, ready, heartbeat):
+        try:
+            async with websockets.connect(url, max_queue=None, open_timeout=30, ping_interval=None) as ws:
+                self.connected[board_id] += 1
+                ready.set_result(True)
+                next_heartbeat = time.monotonic() + heartbeat
+                while not self.stop.is_set():
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), timeout=1)
+                    except asyncio.TimeoutError:
+                        raw = None
+                    if time.monotonic() > next_heartbeat:
+                        await ws.send('{"type":"heartbeat"}')
+                        next_heartbeat += heartbeat
+                    if raw is not None:
+                        self._received(json.loads(raw))
+        except Exception:
+            if not ready.done():
+                self.stats['failed'] += 1
+                ready.set_result(False)
+            else:
+                self.stats['closed'] += 1
+
+    def _received(self, frame):
+        now = time.perf_counter()
+        self.stats['frames'] += 1
+        if frame['type'] == 'resync_required':
+            self.stats['resync'] += 1
+        events = frame['events'] if frame['type'] == 'batch' else [frame]
+        for event in events:
+            if event.get('type') == 'card.updated':
+                sent = self.sent_at.get(event['data'].get('name'))
+                if sent is not None:
+                    self.latencies.append(now - sent)
+
+    async def _generate(self, boards, options):
+        """PATCH card theo nhịp --rate; trả về danh sách board_id của các request thành công"""
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(options['http_workers'])
+        interval = 1 / options['rate']
+        requests = []
+        started = time.perf_counter()
+        for n, (board_id, card_id) in zip(range(options['events']), itertools.cycle(boards)):
+            name = f'loadtest {n}'
+            self.sent_at[name] = time.perf_counter()
+            request = loop.run_in_executor(executor, self._patch_card, options['url'], card_id, name)
+            requests.append((board_id, request))
+            await asyncio.sleep(max(0, started + (n + 1) * interval - time.perf_counter()))
+        results = await asyncio.gather(*(request for _, request in requests))
+        executor.shutdown()
+        return [board_id for (board_id, _), ok in zip(requests, results) if ok]
+
+    def _patch_card(self, base_url, card_id, name):
+        request = urllib.request.Request(
+            f"{base_url.rstrip('/')}/api/cards/{card_id}/", method='PATCH', data=json.dumps({'name': name}).encode(),
+            headers={'Authorization': f'Bearer {self.token}', 'Content-Type': 'application/json'},
+        )
+        try:
+            urllib.request.urlopen(request, timeout=30).read()
+        except Exception:
+            return False
+        return True
+
+    def _report(self, patched):
+        # Mỗi PATCH trên một board được mọi kết nối của board đó nhận
+        expected = sum(self.connected[board_id] for board_id in patched)
+        lat = [x * 1000 for x in self.latencies]
+        self.stdout.write(
+            f"deliveries {len(lat)}/{expected}, frames {self.stats['frames']}, resync {self.stats['resync']}, "
+            f"closed {self.stats['closed']}, http errors {len(self.sent_at) - len(patched)}"
+        )
+        if lat:
+            self.stdout.write(
+                f"latency ms: p50 {percentile(lat, 50):.1f}  p95 {percentile(lat, 95):.1f}  "
+                f"p99 {percentile(lat, 99):.1f}  max {max(lat):.1f}  mean {statistics.mean(lat):.1f}"
+            )
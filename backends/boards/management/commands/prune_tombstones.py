@@ -0,0 +1,23 @@
+# boards/management/commands/prune_tombstones.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from boards.models import Tombstone
+from config.db_router import fan_out
+
+
+class Command(BaseCommand):
+    help = ("Xoá tombstone của change feed cũ hơn CHANGE_FEED_RETENTION_DAYS. "
+            "Client có cursor cũ hơn mốc này sẽ nhận 410 và tải lại board.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'CHANGE_FEED_RETENTION_DAYS', 30))
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # Tombstone nằm ở shard của board
+        deleted = sum(fan_out(lambda: Tombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]))
+        self.stdout.write(f"Deleted {deleted} tombstones older than {options['days']} days")
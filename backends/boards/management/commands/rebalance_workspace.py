@@ -0,0 +1,112 @@
+# boards/management/commands/rebalance_workspace.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from boards.models import Board, Workspace
+from boards.sharding import (
+    board_subtree, copy_reference_rows, copy_rows, get_directory, referenced_user_ids, sharding_enabled,
+)
+from config.db_router import shard_aliases, use_shard
+
+
+def _delete_boards(alias, board_ids):
+    """
+    Xoá board và mọi hàng dưới board ở `alias`, con trước cha. Dùng _raw_delete (DELETE trực
+    tiếp, không phát signal): dữ liệu vẫn còn ở shard mới nên không được gửi sự kiện xoá,
+    tombstone hay tăng version.
+    """
+    with use_shard(alias), transaction.atomic(using=alias):
+        for model, queryset, _ in reversed(board_subtree(board_ids)):
+            queryset._raw_delete(alias)
+
+
+class Command(BaseCommand):
+    help = ("Chuyển board của một workspace sang shard khác (boards.sharding). Workspace bị khoá ghi "
+            "(request ghi nhận 503) từ lúc bắt đầu tới khi directory trỏ sang shard mới; giữa các bước "
+            "chờ --wait giây (mặc định SHARD_DIRECTORY_TTL) để mọi process thấy directory mới.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('workspace_id', nargs='?', type=int)
+        parser.add_argument('target', nargs='?', help="Alias shard đích, vd. shard_1 hoặc default")
+        parser.add_argument('--wait', type=float, default=None)
+        parser.add_argument('--sync-reference', action='store_true',
+                            help="Chép toàn bộ user/profile/workspace từ default sang mọi shard (chạy một "
+                                 "lần khi mới bật sharding trên database có sẵn dữ liệu)")
+
+    def handle(self, *args, **options):
+        if not sharding_enabled():
+            raise CommandError("No shards configured (DATABASE_SHARD_URLS)")
+        if options['sync_reference']:
+            for alias in settings.DATABASE_SHARDS:
+                copy_reference_rows(alias)
+                self.stdout.write(f"reference rows copied to {alias}")
+        if options['workspace_id'] is None:
+            return
+        target = options['target']
+        if target not in shard_aliases():
+            raise CommandError(f"Unknown shard {target!r}; choose from {', '.join(shard_aliases())}")
+        try:
+            workspace = Workspace.objects.using('default').get(pk=options['workspace_id'])
+        except Workspace.DoesNotExist:
+            raise CommandError(f"Workspace {options['workspace_id']} does not exist")
+        source = workspace.shard
+        if source == target:
+            raise CommandError(f"Workspace {workspace.pk} is already on {target}")
+        wait = settings.SHARD_DIRECTORY_TTL if options['wait'] is None else options['wait']
+
+        # 1. Khoá ghi, chờ mọi process thấy trạng thái moving
+        self._set(workspace, shard_moving=True)
+        self.stdout.write(f"workspace {workspace.pk}: writes blocked, waiting {wait:.0f}s")
+        time.sleep(wait)
+
+        # 2. Chép sang shard đích
+        with use_shard(source):
+            board_ids = list(Board.objects.filter(workspace_id=workspace.pk).values_list('id', flat=True))
+        try:
+            copy_reference_rows(target, workspace_ids=[workspace.pk])
+            started = time.perf_counter()
+            for board_id in board_ids:
+                self._copy_board(board_id, source, target)
+            self._verify(board_ids, source, target)
+        except Exception:
+            _delete_boards(target, board_ids)
+            self._set(workspace, shard_moving=False)
+            raise
+        self.stdout.write(f"copied {len(board_ids)} boards to {target} in {time.perf_counter() - started:.1f}s")
+
+        # 3. Trỏ directory sang shard mới; process còn cache cũ vẫn đọc được bản ở source (và vẫn khoá ghi)
+        self._set(workspace, shard=target, shard_moving=False)
+        self.stdout.write(f"workspace {workspace.pk}: now on {target}, waiting {wait:.0f}s before cleanup")
+        time.sleep(wait)
+
+        # 4. Xoá bản ở source
+        _delete_boards(source, board_ids)
+        self.stdout.write(f"removed {len(board_ids)} boards from {source}")
+
+    def _set(self, workspace, **fields):
+        # update() không phát signal: chép trạng thái sang các shard không cần thiết
+        Workspace.objects.using('default').filter(pk=workspace.pk).update(**fields)
+        get_directory().invalidate(workspace.pk)
+
+    def _copy_board(self, board_id, source, target):
+        with use_shard(source):
+            tree = [(model, list(queryset), keep_pk) for model, queryset, keep_pk in board_subtree([board_id])]
+        user_ids = set()
+        for model, rows, _ in tree:
+            user_ids |= referenced_user_ids(model, rows)
+        copy_reference_rows(target, user_ids=user_ids)
+        with transaction.atomic(using=target):
+            for model, rows, keep_pk in tree:
+                copy_rows(model, rows, target, keep_pk=keep_pk)
+
+    def _verify(self, board_ids, source, target):
+        counts = {}
+        for alias in (source, target):
+            with use_shard(alias):
+                counts[alias] = [(model, queryset.count()) for model, queryset, _ in board_subtree(board_ids)]
+        for (model, expected), (_, copied) in zip(counts[source], counts[target]):
+            if expected != copied:
+                raise CommandError(f"{model._meta.label}: {expected} rows on {source}, {copied} on {target}")
@@ -0,0 +1,70 @@
+# Generated by Django 5.2 on 2026-10-19 19:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+try:
+    from django.contrib.postgres.operations import AddIndexConcurrently
+except ImportError:  # không có psycopg: chỉ chạy trên SQLite
+    AddIndexConcurrently = None
+
+
+class AddIndexOnline(migrations.AddIndex):
+    """
+    PostgreSQL: CREATE INDEX CONCURRENTLY (không khoá ghi bảng card/list/comment/activity) và
+    tắt statement_timeout (DB_STATEMENT_TIMEOUT_MS) trong lúc tạo. Database khác: AddIndex thường.
+    """
+
+    def _operation(self, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            return AddIndexConcurrently(self.model_name, self.index)
+        return None
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        operation = self._operation(schema_editor)
+        if operation is None:
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        schema_editor.execute('SET statement_timeout = 0')
+        try:
+            operation.database_forwards(app_label, schema_editor, from_state, to_state)
+        finally:
+            schema_editor.execute('RESET statement_timeout')
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        operation = self._operation(schema_editor)
+        if operation is None:
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        operation.database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY không chạy được trong transaction
+    atomic = False
+
+    dependencies = [
+        ('boards', '0013_change_feed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name='card',
+            index=models.Index(fields=['list', 'position'], name='card_list_position_idx'),
+        ),
+        AddIndexOnline(
+            model_name='card',
+            index=models.Index(condition=models.Q(('list__isnull', True)), fields=['created_by'], name='card_inbox_idx'),
+        ),
+        AddIndexOnline(
+            model_name='cardactivity',
+            index=models.Index(fields=['card', '-created_at'], name='activity_card_created_idx'),
+        ),
+        AddIndexOnline(
+            model_name='comment',
+            index=models.Index(fields=['card', '-created_at'], name='comment_card_created_idx'),
+        ),
+        AddIndexOnline(
+            model_name='list',
+            index=models.Index(fields=['board', 'position'], name='list_board_position_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-19 19:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0014_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('next_id', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='workspace',
+            name='shard',
+            field=models.CharField(default='default', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='workspace',
+            name='shard_moving',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -11,6 +11,10 @@ User = get_user_model()
 class Workspace(models.Model):
     name = models.CharField(max_length=255)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Directory cho sharding (boards.sharding): alias database chứa board của workspace
+    shard = models.CharField(max_length=64, default='default')
+    # Đang chuyển sang shard khác (rebalance_workspace): mọi request ghi bị từ chối
+    shard_moving = models.BooleanField(default=False)
     
 class Board(models.Model):
     name = models.CharField(max_length=255)
@@ -27,6 +31,16 @@ class Board(models.Model):
     )
 
     is_closed = models.BooleanField(default=False)
+    # Tăng mỗi khi có thay đổi dưới board (boards.versioning), dùng làm ETag
+    version = models.PositiveIntegerField(default=0)
+
+    def save(self, *args, **kwargs):
+        # version chỉ được tăng bằng F() trong boards.versioning, không ghi lại giá trị cũ từ instance
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != 'version'
+            ]
+        super().save(*args, **kwargs)
 
 
 class List(models.Model):
@@ -35,8 +49,19 @@ class List(models.Model):
     background = models.TextField(blank=True)
     visibility = models.CharField(max_length=20, default='private')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     board = models.ForeignKey(Board, on_delete=models.CASCADE)  # ✅ rename từ boardid → board
 
+    class Meta:
+        indexes = [models.Index(fields=['board', 'position'], name='list_board_position_idx')]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Để biết board cũ khi list bị chuyển sang board khác
+        instance._loaded_board_id = instance.__dict__.get('board_id')
+        return instance
+
 class Card(models.Model):
     name = models.CharField(max_length=255)
     background = models.TextField(blank=True)
@@ -51,6 +76,7 @@ class Card(models.Model):
     ]
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='doing')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, null=False)
     labels = models.ManyToManyField("Label", blank=True, related_name='cards')
     members = models.ManyToManyField(
@@ -68,6 +94,21 @@ class Card(models.Model):
         blank=True,
     )
     position = models.IntegerField(default=0, db_index=True)  # ✅ index
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['list', 'position'], name='card_list_position_idx'),
+            # Card trong Inbox (list=NULL) của một user
+            models.Index(fields=['created_by'], condition=models.Q(list__isnull=True), name='card_inbox_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Để biết list (và board) cũ khi card bị chuyển đi
+        instance._loaded_list_id = instance.__dict__.get('list_id')
+        return instance
+
 class CardMembership(models.Model):
     """Intermediate model để lưu thêm thông tin về card membership"""
     card = models.ForeignKey(Card, on_delete=models.CASCADE)
@@ -119,11 +160,13 @@ class CardActivity(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['card', '-created_at'], name='activity_card_created_idx')]
 
 class Label(models.Model):
     name = models.CharField(max_length=100)
     color = models.CharField(max_length=20)
     board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name='labels')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
 class BoardMembership(models.Model):
     board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name='memberships')
@@ -173,10 +216,11 @@ class Comment(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
-        ordering = ['-created_at']    
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['card', '-created_at'], name='comment_card_created_idx')]
 
 # Add to your models.py
 class Checklist(models.Model):
@@ -184,7 +228,7 @@ class Checklist(models.Model):
     title = models.CharField(max_length=255, default='Checklist')
     position = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
 
     class Meta:
@@ -241,6 +285,7 @@ class Attachment(models.Model):
         related_name='attachments_uploaded'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     # Cho cover image
     is_cover = models.BooleanField(default=False)
@@ -270,4 +315,21 @@ class Attachment(models.Model):
         """Kiểm tra có phải file ảnh không"""
         if self.mime_type:
             return self.mime_type.startswith('image/')
-        return False        
\ No newline at end of file
+        return False
+
+
+class Tombstone(models.Model):
+    """Object đã bị xoá (hoặc chuyển ra khỏi board), dùng cho change feed (boards.changes)"""
+    board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name='tombstones')
+    kind = models.CharField(max_length=20)  # 'lists', 'cards', 'labels', ... (boards.changes.KINDS)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['board', 'deleted_at'])]
+
+
+class IdSequence(models.Model):
+    """Id tiếp theo cho bảng được shard, cấp theo khối (boards.sharding.IdAllocator); chỉ nằm ở default"""
+    name = models.CharField(max_length=100, primary_key=True)  # app_label.model_name
+    next_id = models.BigIntegerField()
@@ -0,0 +1,192 @@
+# boards/outbox.py
+"""
+Outbox cho sự kiện realtime phát sinh từ request REST.
+
+Signal/view ghi nhận sự kiện trong transaction (publish_on_commit);
+khi transaction commit, sự kiện chỉ được đưa vào hàng đợi trong process — request
+không gọi Redis/channel layer. Một thread relay duy nhất mỗi process lấy sự kiện
+theo lô, gộp các sự kiện trùng (cùng board, type, id), dựng payload từ dữ liệu đã
+commit, gán seq cho cả lô (một lần gọi event log) và gửi một message group_send
+cho mỗi board. Transaction bị rollback thì không có sự kiện nào được gửi.
+
+Sự kiện còn trong hàng đợi khi process bị kill sẽ mất; client vẫn đồng bộ được
+qua change feed (boards.changes), nguồn dữ liệu chính là database.
+"""
+import asyncio
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from config.db_router import current_shard, use_shard
+from config.metrics import channel_group_sends, outbox_queue_depth
+
+from .realtime import board_group_name, get_event_log
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    def __init__(self, batch_size=500, linger=0.01):
+        self.batch_size = batch_size
+        self.linger = linger
+        self.queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def put_event(self, board_id, event_type, object_id, build_data):
+        """`build_data()` được gọi trong thread relay; trả về None nghĩa là object không còn → bỏ qua"""
+        self._ensure_started()
+        self.queue.put(('event', board_id, (event_type, object_id), build_data))
+
+    def put_message(self, board_id, message):
+        """Message điều khiển (membership.changed, board.deleted...): không có seq, không vào buffer"""
+        self._ensure_started()
+        self.queue.put(('message', board_id, None, message))
+
+    def flush(self, timeout=5):
+        """Chờ hàng đợi được gửi hết (dùng khi process sắp thoát, vd. management command)"""
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _ensure_started(self):
+        # Thread không được kế thừa qua fork (gunicorn --preload): mỗi process tự khởi động relay
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self.queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name='board-outbox-relay', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+                atexit.register(self.flush)
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        while True:
+            batch = [self.queue.get()]
+            if self.linger:
+                time.sleep(self.linger)
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            outbox_queue_depth.set(self.queue.qsize())
+            try:
+                messages = self._prepare(batch)
+                loop.run_until_complete(self._send(messages))
+            except Exception:
+                logger.exception("Failed to publish %d outbox items", len(batch))
+            finally:
+                close_old_connections()
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _prepare(self, batch):
+        """Gộp theo board, bỏ sự kiện trùng (giữ vị trí lần ghi nhận cuối), dựng payload và gán seq"""
+        pending = {}
+        for kind, board_id, key, item in batch:
+            board = pending.setdefault(board_id, {'events': {}, 'messages': []})
+            if kind == 'message':
+                board['messages'].append(item)
+            else:
+                board['events'].pop(key, None)
+                board['events'][key] = item
+
+        messages = []
+        log = get_event_log()
+        for board_id, board in pending.items():
+            events = []
+            for (event_type, _), build_data in board['events'].items():
+                data = build_data()
+                if data is not None:
+                    events.append({'type': event_type, 'data': data})
+            if events:
+                try:
+                    events = log.append_many(board_id, events)
+                except Exception as e:
+                    logger.warning("Failed to append %d events for board %s: %s", len(events), board_id, e)
+                    events = []
+            if events:
+                messages.append((board_id, {'type': 'board.events', 'events': events}))
+            messages.extend((board_id, message) for message in board['messages'])
+        return messages
+
+    async def _send(self, messages):
+        layer = get_channel_layer()
+        for board_id, message in messages:
+            channel_group_sends.labels(message['type']).inc()
+            try:
+                await layer.group_send(board_group_name(board_id), message)
+            except Exception as e:
+                # Sự kiện đã nằm trong buffer: client nhận lại qua resume
+                logger.warning("Failed to send %s to board %s: %s", message['type'], board_id, e)
+
+
+_relay = None
+_relay_lock = threading.Lock()
+
+
+def get_outbox():
+    global _relay
+    with _relay_lock:
+        if _relay is None:
+            _relay = OutboxRelay(
+                getattr(settings, 'REALTIME_OUTBOX_BATCH_SIZE', 500),
+                getattr(settings, 'REALTIME_OUTBOX_LINGER', 0.01),
+            )
+        return _relay
+
+
+def _in_shard(alias, build_data):
+    # Thread relay không có shard của request: dựng payload ở đúng shard đã ghi
+    def build():
+        with use_shard(alias):
+            return build_data()
+    return build
+
+
+def publish_on_commit(board_id, event_type, object_id, build_data):
+    """
+    Ghi nhận sự kiện; được đưa vào outbox sau khi transaction commit. `build_data()`
+    chạy trong thread relay nên payload phản ánh dữ liệu đã commit (mới nhất).
+
+    Outbox là queue.Queue trong bộ nhớ process, không phải bảng trong database: sự kiện
+    đã commit nhưng chưa gửi sẽ mất nếu worker chết hoặc bị restart (atexit chỉ flush khi
+    thoát bình thường). Seq chỉ được gán trong thread relay nên resume không thấy khoảng
+    trống; client chỉ thấy thay đổi đó khi đồng bộ lại qua change feed (boards.changes).
+    """
+    if board_id is None:
+        return
+    alias = current_shard()
+    build_data = _in_shard(alias, build_data)
+    transaction.on_commit(lambda: get_outbox().put_event(board_id, event_type, object_id, build_data), using=alias)
+
+
+def notify_membership_changed(board_id, user_id, role=None):
+    """
+    Báo cho các kết nối của `user_id` trên board: role=None nghĩa là đã bị xoá
+    khỏi board và kết nối sẽ bị đóng. Không đi qua buffer (không có seq).
+    """
+    transaction.on_commit(lambda: get_outbox().put_message(
+        board_id, {'type': 'membership.changed', 'user_id': user_id, 'role': role},
+    ), using=current_shard())
+
+
+def notify_board_deleted(board_id):
+    transaction.on_commit(lambda: get_outbox().put_message(board_id, {'type': 'board.deleted'}),
+                          using=current_shard())
@@ -10,13 +10,12 @@ def get_user_role_on_board(board, user):
     """
     if not user.is_authenticated:
         return None
-    if board.created_by == user:
+    if board.created_by_id == user.pk:
         return 'owner'
-    try:
-        membership = BoardMembership.objects.get(board=board, user=user)
-        return membership.role
-    except BoardMembership.DoesNotExist:
-        return None
+    return (BoardMembership.objects
+            .filter(board_id=board.pk, user_id=user.pk)
+            .values_list('role', flat=True)
+            .first())
 
 def check_board_view_permission(board, user):
     """
@@ -25,7 +24,7 @@ def check_board_view_permission(board, user):
     """
     role = get_user_role_on_board(board, user)
     if role in ['owner', 'admin', 'editor', 'viewer']:
-        return
+        return role
     raise PermissionDenied("You do not have permission to view this board.")
 
 def check_card_edit_permission(card, user):
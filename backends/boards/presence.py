@@ -0,0 +1,87 @@
+# boards/presence.py
+"""
+Ai đang xem board: mỗi kết nối WebSocket gửi heartbeat định kỳ, kết nối không
+gửi heartbeat trong PRESENCE_TTL giây được coi là đã rời đi. Không ghi DB.
+
+LocalPresence giữ trạng thái trong process; RedisPresence (đặt PRESENCE_URL)
+dùng sorted set theo board (score = thời điểm heartbeat) để mọi worker thấy nhau.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+
+def _member(user_id, conn_id):
+    return f'{user_id}:{conn_id}'
+
+
+def _user_ids(members):
+    return sorted({int(m.split(':', 1)[0]) for m in members})
+
+
+class LocalPresence:
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._boards = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def touch(self, board_id, user_id, conn_id):
+        with self._lock:
+            self._boards[board_id][_member(user_id, conn_id)] = time.monotonic()
+
+    def leave(self, board_id, user_id, conn_id):
+        with self._lock:
+            self._boards[board_id].pop(_member(user_id, conn_id), None)
+
+    def viewers(self, board_id):
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            members = self._boards.get(board_id, {})
+            for member in [m for m, seen in members.items() if seen < cutoff]:
+                del members[member]
+            return _user_ids(members)
+
+
+class RedisPresence:
+    def __init__(self, url, ttl=60):
+        import redis
+
+        self.ttl = ttl
+        self.client = redis.Redis.from_url(url)
+
+    def _key(self, board_id):
+        return f'board_presence:{board_id}'
+
+    def touch(self, board_id, user_id, conn_id):
+        key = self._key(board_id)
+        with self.client.pipeline(transaction=False) as pipe:
+            pipe.zadd(key, {_member(user_id, conn_id): time.time()})
+            pipe.expire(key, self.ttl * 2)
+            pipe.execute()
+
+    def leave(self, board_id, user_id, conn_id):
+        self.client.zrem(self._key(board_id), _member(user_id, conn_id))
+
+    def viewers(self, board_id):
+        key = self._key(board_id)
+        with self.client.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(key, '-inf', time.time() - self.ttl)
+            pipe.zrange(key, 0, -1)
+            _, members = pipe.execute()
+        return _user_ids(m.decode() for m in members)
+
+
+_presence = None
+_presence_lock = threading.Lock()
+
+
+def get_presence():
+    global _presence
+    with _presence_lock:
+        if _presence is None:
+            ttl = getattr(settings, 'PRESENCE_TTL', 60)
+            url = getattr(settings, 'PRESENCE_URL', '')
+            _presence = RedisPresence(url, ttl) if url else LocalPresence(ttl)
+        return _presence
@@ -0,0 +1,133 @@
+# boards/readers.py
+"""
+Serialize nhanh, chỉ đọc, cho các endpoint GET nóng (lists, cards, boards).
+
+Thay vì dựng model instance rồi đi qua field machinery của DRF, các hàm ở đây
+lấy dữ liệu bằng .values() và dựng thẳng dict. Output phải giống hệt
+ListSerializer / CardSerializer / BoardSerializer (xem `bench_serializers --check`).
+Khi thêm field vào các serializer đó, nhớ cập nhật ở đây.
+"""
+from django.contrib.auth import get_user_model
+from rest_framework import serializers
+
+from .models import Card, CardMembership
+from .serializers import USER_SUMMARY_CACHE, user_avatar_url
+
+User = get_user_model()
+
+_datetime_field = serializers.DateTimeField()
+
+
+def _datetime(value):
+    return _datetime_field.to_representation(value) if value else None
+
+
+def read_lists(queryset):
+    """Tương đương ListSerializer(queryset, many=True).data"""
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'background': row['background'],
+            'board': row['board_id'],
+            'visibility': row['visibility'],
+            'position': row['position'],
+        }
+        for row in queryset.values('id', 'name', 'background', 'board_id', 'visibility', 'position')
+    ]
+
+
+def read_boards(queryset):
+    """Tương đương BoardSerializer(queryset, many=True).data"""
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'workspace': {'id': row['workspace_id'], 'name': row['workspace__name']},
+            'created_by': row['created_by_id'],
+            'background': row['background'],
+            'visibility': row['visibility'],
+            'is_closed': row['is_closed'],
+        }
+        for row in queryset.values(
+            'id', 'name', 'workspace_id', 'workspace__name', 'created_by_id',
+            'background', 'visibility', 'is_closed',
+        )
+    ]
+
+
+def read_user_summaries(user_ids, context=None):
+    """
+    {user_id: dict} giống UserShortSerializer, dùng chung cache theo user id
+    với các serializer khác trong cùng response nếu truyền context.
+    """
+    context = context if context is not None else {}
+    cache = context.setdefault(USER_SUMMARY_CACHE, {})
+    request = context.get('request')
+
+    missing = [uid for uid in user_ids if uid not in cache]
+    if missing:
+        rows = User.objects.filter(id__in=missing).values(
+            'id', 'username', 'email', 'first_name', 'last_name',
+            'profile__avatar', 'profile__avatar_thumbnail',
+        )
+        for row in rows:
+            full = f"{row['first_name']} {row['last_name']}".strip()
+            cache[row['id']] = {
+                'id': row['id'],
+                'username': row['username'],
+                'email': row['email'],
+                'name': full or row['username'],
+                'avatar': user_avatar_url(
+                    row['profile__avatar_thumbnail'], row['profile__avatar'], row['email'], request,
+                ),
+            }
+    return cache
+
+
+def read_cards(queryset, context=None):
+    """
+    Tương đương CardSerializer(queryset, many=True).data với labels/members được
+    prefetch theo thứ tự id (LABELS_BY_ID, MEMBERS_WITH_PROFILE trong serializers).
+    Số query cố định, không phụ thuộc số card.
+    """
+    rows = list(queryset.values(
+        'id', 'name', 'status', 'background', 'visibility', 'list_id',
+        'description', 'due_date', 'completed', 'position', 'created_at',
+    ))
+    if not rows:
+        return []
+
+    card_ids = queryset.values('id')
+    labels, members = {}, {}
+    for card_id, label_id in (Card.labels.through.objects
+                              .filter(card_id__in=card_ids)
+                              .order_by('label_id')
+                              .values_list('card_id', 'label_id')):
+        labels.setdefault(card_id, []).append(label_id)
+    for card_id, user_id in (CardMembership.objects
+                             .filter(card_id__in=card_ids)
+                             .order_by('user_id')
+                             .values_list('card_id', 'user_id')):
+        members.setdefault(card_id, []).append(user_id)
+
+    users = read_user_summaries({uid for ids in members.values() for uid in ids}, context)
+
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'status': row['status'],
+            'background': row['background'],
+            'visibility': row['visibility'],
+            'list': row['list_id'],
+            'description': row['description'],
+            'due_date': _datetime(row['due_date']),
+            'completed': row['completed'],
+            'position': row['position'],
+            'created_at': _datetime(row['created_at']),
+            'labels': labels.get(row['id'], []),
+            'members': [users[uid] for uid in members.get(row['id'], ())],
+        }
+        for row in rows
+    ]
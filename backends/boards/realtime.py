@@ -0,0 +1,128 @@
+# boards/realtime.py
+"""
+Broadcast sự kiện realtime của board qua channel layer.
+
+Mỗi sự kiện nhận một số thứ tự (seq) tăng dần theo board và được giữ trong một
+ring buffer có giới hạn. Client mất kết nối gửi lại seq cuối cùng đã nhận
+(BoardConsumer, message `resume`) để được phát lại các sự kiện bị lỡ; nếu
+khoảng trống lớn hơn buffer thì client nhận `resync_required` và đồng bộ lại
+qua change feed (boards.changes). Sự kiện được gửi qua outbox (boards.outbox).
+
+Buffer nằm trong bộ nhớ process (LocalEventLog, chỉ khi CHANNEL_LAYER='local': mọi thứ
+chạy trong một process) hoặc Redis (RedisEventLog, REALTIME_EVENT_LOG_URL) để mọi worker
+dùng chung seq. Với log riêng từng process, seq của các worker trùng nhau và consumer
+bỏ nhầm sự kiện (coi là đã gửi) nên các channel layer khác bắt buộc dùng Redis.
+"""
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from config.renderers import dumps, loads
+
+
+def board_group_name(board_id):
+    return f'board_{board_id}'
+
+
+class LocalEventLog:
+    def __init__(self, size=200):
+        self.size = size
+        self._seq = defaultdict(int)
+        self._buffers = defaultdict(lambda: deque(maxlen=self.size))
+        self._lock = threading.Lock()
+
+    def append_many(self, board_id, events):
+        with self._lock:
+            first = self._seq[board_id] + 1
+            self._seq[board_id] += len(events)
+            events = [{'seq': first + i, **event} for i, event in enumerate(events)]
+            self._buffers[board_id].extend(events)
+            return events
+
+    def last_seq(self, board_id):
+        return self._seq.get(board_id, 0)
+
+    def since(self, board_id, last_seq):
+        """Các sự kiện có seq > last_seq, hoặc None nếu một phần đã bị đẩy khỏi buffer"""
+        with self._lock:
+            current = self._seq.get(board_id, 0)
+            if last_seq >= current:
+                return []
+            events = [e for e in self._buffers.get(board_id, ()) if e['seq'] > last_seq]
+        if not events or events[0]['seq'] != last_seq + 1:
+            return None
+        return events
+
+
+class RedisEventLog:
+    # Tăng seq và RPUSH vào buffer trong cùng một script để thứ tự trong buffer đúng theo seq.
+    # ARGV = size, ttl, payload...; trả về seq của payload đầu tiên.
+    APPEND_SCRIPT = """
+        local count = #ARGV - 2
+        local first = redis.call('INCRBY', KEYS[1], count) - count + 1
+        for i = 1, count do
+            redis.call('RPUSH', KEYS[2], (first + i - 1) .. ':' .. ARGV[i + 2])
+        end
+        redis.call('LTRIM', KEYS[2], -tonumber(ARGV[1]), -1)
+        redis.call('EXPIRE', KEYS[1], ARGV[2])
+        redis.call('EXPIRE', KEYS[2], ARGV[2])
+        return first
+    """
+
+    def __init__(self, url, size=200, ttl=3600):
+        import redis
+
+        self.size = size
+        self.ttl = ttl
+        self.client = redis.Redis.from_url(url)
+        self._append = self.client.register_script(self.APPEND_SCRIPT)
+
+    def _keys(self, board_id):
+        return f'board_events:{board_id}:seq', f'board_events:{board_id}:buffer'
+
+    def append_many(self, board_id, events):
+        args = [self.size, self.ttl, *(dumps(event) for event in events)]
+        first = int(self._append(keys=self._keys(board_id), args=args))
+        return [{'seq': first + i, **event} for i, event in enumerate(events)]
+
+    def last_seq(self, board_id):
+        return int(self.client.get(self._keys(board_id)[0]) or 0)
+
+    def since(self, board_id, last_seq):
+        seq_key, buffer_key = self._keys(board_id)
+        with self.client.pipeline(transaction=True) as pipe:
+            current, raw = pipe.get(seq_key).lrange(buffer_key, 0, -1).execute()
+        if last_seq >= int(current or 0):
+            return []
+        events = []
+        for item in raw:
+            seq, _, body = item.partition(b':')
+            if int(seq) > last_seq:
+                events.append({'seq': int(seq), **loads(body)})
+        if not events or events[0]['seq'] != last_seq + 1:
+            return None
+        return events
+
+
+_event_log = None
+_event_log_lock = threading.Lock()
+
+
+def get_event_log():
+    global _event_log
+    with _event_log_lock:
+        if _event_log is None:
+            size = getattr(settings, 'REALTIME_EVENT_BUFFER_SIZE', 200)
+            url = getattr(settings, 'REALTIME_EVENT_LOG_URL', '')
+            if url:
+                _event_log = RedisEventLog(url, size, getattr(settings, 'REALTIME_EVENT_BUFFER_TTL', 3600))
+            elif getattr(settings, 'CHANNEL_LAYER', 'local') != 'local':
+                raise ImproperlyConfigured(
+                    "REALTIME_EVENT_LOG_URL is required when CHANNEL_LAYER is not 'local': "
+                    "seqs must be shared by every process publishing or replaying board events."
+                )
+            else:
+                _event_log = LocalEventLog(size)
+        return _event_log
@@ -2,7 +2,10 @@
 from rest_framework import serializers
 from .models import Board, Workspace, List, Card, Label, BoardMembership,BoardInviteLink,Comment,CardActivity,CardMembership, Checklist, ChecklistItem, Attachment
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from auth_app.models import Profile
 import hashlib
+from functools import lru_cache
 
 User = get_user_model()
 
@@ -53,7 +56,39 @@ class ListSerializer(serializers.ModelSerializer):
         model = List
         fields = ['id', 'name', 'background', 'board', 'visibility', 'position']
 
+# Key trong context của serializer gốc, dùng chung cho cả response
+USER_SUMMARY_CACHE = '_user_summary_cache'
+
+
+@lru_cache(maxsize=4096)
+def gravatar_url(email):
+    h = hashlib.md5(email.lower().encode()).hexdigest()
+    return f"https://www.gravatar.com/avatar/{h}?d=identicon"
+
+
+def user_avatar_url(thumbnail_name, avatar_name, email, request=None):
+    """
+    URL avatar của user từ tên file trong Profile (dùng chung cho
+    UserShortSerializer và boards.readers để output giống hệt nhau).
+    """
+    # Ưu tiên avatar đã upload (thumbnail 40px nếu đã tạo xong)
+    name = thumbnail_name or avatar_name
+    if name:
+        url = Profile._meta.get_field('avatar').storage.url(name)
+        return request.build_absolute_uri(url) if request else url
+    # Fallback Gravatar theo email
+    if email:
+        return gravatar_url(email)
+    return None
+
+
 class UserShortSerializer(serializers.ModelSerializer):
+    """
+    Thông tin rút gọn của user (card members, comment author, activity...).
+    Cùng một user lặp lại rất nhiều lần trong một response nên kết quả được
+    memo theo user id trong context của serializer gốc.
+    Queryset nên select_related('profile') để lấy avatar không phát sinh N+1.
+    """
     name = serializers.SerializerMethodField()
     avatar = serializers.SerializerMethodField()
 
@@ -61,22 +96,25 @@ class UserShortSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email', 'name', 'avatar']
 
+    def to_representation(self, instance):
+        cache = self.context.setdefault(USER_SUMMARY_CACHE, {})
+        data = cache.get(instance.pk)
+        if data is None:
+            data = cache[instance.pk] = super().to_representation(instance)
+        return data
+
     def get_name(self, obj):
         full = getattr(obj, "get_full_name", lambda: "")() or ""
         return full.strip() or obj.username
     
     def get_avatar(self, obj):
-        # Nếu có field avatar trên model:
-        if hasattr(obj, "avatar") and obj.avatar:
-            try:
-                return obj.avatar.url  # ImageField/FileField
-            except Exception:
-                return str(obj.avatar)
-        # Fallback Gravatar theo email (tuỳ chọn)
-        if obj.email:
-            h = hashlib.md5(obj.email.lower().encode()).hexdigest()
-            return f"https://www.gravatar.com/avatar/{h}?d=identicon"
-        return None
+        profile = getattr(obj, "profile", None)
+        return user_avatar_url(
+            profile.avatar_thumbnail.name if profile is not None else None,
+            profile.avatar.name if profile is not None else None,
+            obj.email,
+            self.context.get('request'),
+        )
     
 class CardSerializer(serializers.ModelSerializer):
     """Basic card serializer for list views and simple operations"""
@@ -101,6 +139,13 @@ class CardSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
     
     
+# Prefetch dùng khi serialize nhiều card bằng CardSerializer: members kèm profile để
+# UserShortSerializer lấy avatar không phát sinh N+1, thứ tự theo id để output ổn định
+# (giống boards.readers.read_cards)
+MEMBERS_WITH_PROFILE = Prefetch('members', queryset=User.objects.select_related('profile').order_by('id'))
+LABELS_BY_ID = Prefetch('labels', queryset=Label.objects.order_by('id'))
+
+
 class LabelSerializer(serializers.ModelSerializer):
     class Meta:
         model = Label
@@ -0,0 +1,445 @@
+# boards/sharding.py
+"""
+Sharding theo workspace (tùy chọn): DATABASE_SHARD_URLS thêm các alias shard_1, shard_2...,
+default là shard đầu tiên. Không cấu hình shard thì mọi thứ nằm ở default như trước.
+
+- Workspace nằm ở default và là directory: Workspace.shard là alias chứa board của
+  workspace. Workspace mới được đặt vào shard theo id (id % số shard). Directory được
+  cache trong process SHARD_DIRECTORY_TTL giây.
+- Board và mọi bảng dưới board (list, card, label, comment, checklist, attachment,
+  membership, tombstone...) nằm ở shard của workspace; card ở Inbox nằm ở shard nơi
+  nó được tạo/bị chuyển ra. Mỗi shard có đủ schema, user/profile/workspace được chép
+  sang mọi shard (bảng tham chiếu) để khoá ngoại và select_related vẫn đúng.
+- Id của board/list/card/... được cấp theo khối từ default (IdSequence) nên duy nhất trên
+  mọi shard: URL chỉ có id vẫn tìm được shard (locate), và workspace chuyển shard giữ
+  nguyên id.
+- Request được định tuyến bởi config.middleware.ShardMiddleware theo tham số URL (SHARD_KWARGS);
+  view không gắn với workspace nào (danh sách workspace, inbox, board đã đóng) gom
+  kết quả từ mọi shard bằng fan_out(). Chuyển workspace: manage.py rebalance_workspace.
+"""
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from auth_app.models import Profile
+from config.db_router import current_shard, shard_aliases, use_shard
+
+from .versioning import bump_board_versions_for_user
+
+from .models import (
+    Attachment, Board, BoardInviteLink, BoardMembership, Card, CardActivity, CardMembership, Checklist,
+    ChecklistItem, Comment, IdSequence, Label, List, Tombstone, Workspace,
+)
+
+User = get_user_model()
+
+# Đường dẫn từ object tới workspace, cho các model có thể được tìm theo id trong URL
+WORKSPACE_PATHS = {
+    Board: 'workspace_id',
+    List: 'board__workspace_id',
+    Label: 'board__workspace_id',
+    BoardInviteLink: 'board__workspace_id',
+    Card: 'list__board__workspace_id',
+    Comment: 'card__list__board__workspace_id',
+    Checklist: 'card__list__board__workspace_id',
+    Attachment: 'card__list__board__workspace_id',
+    ChecklistItem: 'checklist__card__list__board__workspace_id',
+}
+
+# Tham số URL → (model, field); 'pk' lấy model từ view (shard_model hoặc queryset)
+SHARD_KWARGS = {
+    'board_id': (Board, 'pk'),
+    'list_id': (List, 'pk'),
+    'card_id': (Card, 'pk'),
+    'label_id': (Label, 'pk'),
+    'comment_id': (Comment, 'pk'),
+    'checklist_id': (Checklist, 'pk'),
+    'attachment_id': (Attachment, 'pk'),
+    'token': (BoardInviteLink, 'token'),
+}
+
+# Model được cấp id từ IdSequence: được tìm theo id trong URL nên id phải duy nhất trên mọi shard.
+# Các bảng còn lại (membership, activity, tombstone, bảng trung gian ManyToMany) dùng id
+# tự tăng của từng shard; tạo qua bulk_create nên không đi qua pre_save.
+ALLOCATED_MODELS = (Board, List, Card, Label, Comment, Checklist, ChecklistItem, Attachment)
+
+
+def sharding_enabled():
+    return bool(getattr(settings, 'DATABASE_SHARDS', []))
+
+
+class WorkspaceMoving(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Workspace is being moved to another database, try again shortly.'
+    default_code = 'workspace_moving'
+
+
+class ShardDirectory:
+    """
+    workspace_id → (alias, đang chuyển) và object → workspace_id, cache trong process TTL giây.
+    Chuyển shard chờ hết TTL giữa các bước (rebalance_workspace) nên cache cũ không làm mất dữ liệu.
+    """
+
+    def __init__(self, ttl=30, max_entries=100_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._workspaces = {}
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, store, key):
+        entry = store.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def _store(self, store, key, value):
+        with self._lock:
+            if len(store) >= self.max_entries:
+                store.clear()
+            store[key] = (time.monotonic() + self.ttl, value)
+
+    def workspace(self, workspace_id):
+        """(alias, moving); workspace không tồn tại → ('default', False)"""
+        entry = self._cached(self._workspaces, workspace_id)
+        if entry is None:
+            row = (Workspace.objects.using('default')
+                   .filter(pk=workspace_id).values_list('shard', 'shard_moving').first())
+            entry = row or ('default', False)
+            self._store(self._workspaces, workspace_id, entry)
+        return entry
+
+    def locate(self, model, **lookup):
+        """(alias, workspace_id) của object; không tìm thấy → None. Card ở Inbox có workspace_id None."""
+        key = (model._meta.label, *sorted(lookup.items()))
+        workspace_id = self._cached(self._objects, key)
+        if workspace_id is not None:
+            return self.workspace(workspace_id)[0], workspace_id
+        path = WORKSPACE_PATHS[model]
+        for alias in shard_aliases():
+            rows = model.objects.using(alias).filter(**lookup).values_list(path, flat=True)[:1]
+            for workspace_id in rows:
+                if workspace_id is None:
+                    return alias, None
+                self._store(self._objects, key, workspace_id)
+                return self.workspace(workspace_id)[0], workspace_id
+        return None
+
+    def invalidate(self, workspace_id):
+        with self._lock:
+            self._workspaces.pop(workspace_id, None)
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_directory():
+    global _directory
+    with _directory_lock:
+        if _directory is None:
+            _directory = ShardDirectory(getattr(settings, 'SHARD_DIRECTORY_TTL', 30))
+        return _directory
+
+
+def shard_for(model, **lookup):
+    """Alias chứa object (model là Workspace hoặc một model trong WORKSPACE_PATHS); không có → 'default'"""
+    if not sharding_enabled():
+        return 'default'
+    if model is Workspace:
+        return get_directory().workspace(lookup['pk'])[0]
+    found = get_directory().locate(model, **lookup)
+    return found[0] if found else 'default'
+
+
+def resolve_view_shard(view_class, view_kwargs):
+    """(alias, moving) cho request theo tham số URL; view không gắn với object nào → None"""
+    directory = get_directory()
+    if 'workspace_id' in view_kwargs:
+        return directory.workspace(view_kwargs['workspace_id'])
+    for kwarg, value in view_kwargs.items():
+        if kwarg == 'pk':
+            model = getattr(view_class, 'shard_model', None) or getattr(getattr(view_class, 'queryset', None), 'model', None)
+            field = 'pk'
+        else:
+            model, field = SHARD_KWARGS.get(kwarg, (None, None))
+        if model is None:
+            continue
+        found = directory.locate(model, **{field: value})
+        if found is None:
+            return None
+        alias, workspace_id = found
+        return alias, workspace_id is not None and directory.workspace(workspace_id)[1]
+    return None
+
+
+def enter_shard_of(model, write=True, **lookup):
+    """use_shard() cho object không có trong URL (vd. id trong body); workspace đang chuyển mà ghi → 503"""
+    found = get_directory().locate(model, **lookup) if sharding_enabled() else None
+    if found is None:
+        return use_shard(None)
+    alias, workspace_id = found
+    if write and workspace_id is not None and get_directory().workspace(workspace_id)[1]:
+        raise WorkspaceMoving
+    return use_shard(alias)
+
+
+class IdAllocator:
+    """Cấp id cho ALLOCATED_MODELS theo khối SHARD_ID_BLOCK_SIZE, mỗi khối một transaction ngắn ở default"""
+
+    def __init__(self, block_size=1000):
+        self.block_size = block_size
+        self._blocks = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def next_id(self, model):
+        with self._lock:
+            # Khối đã cấp không được dùng chung với process con (fork)
+            if self._pid != os.getpid():
+                self._blocks = {}
+                self._pid = os.getpid()
+            block = self._blocks.get(model)
+            if block is None or block[0] >= block[1]:
+                block = self._blocks[model] = self._reserve(model)
+            next_id = block[0]
+            block[0] += 1
+            return next_id
+
+    def _reserve(self, model):
+        name = model._meta.label_lower
+        with transaction.atomic(using='default'):
+            sequence = IdSequence.objects.using('default').select_for_update().filter(name=name).first()
+            if sequence is None:
+                # Lần đầu: bắt đầu sau id lớn nhất đang có trên mọi shard
+                start = 1 + max(model.objects.using(alias).aggregate(m=Max('pk'))['m'] or 0
+                                for alias in shard_aliases())
+                try:
+                    with transaction.atomic(using='default'):
+                        sequence = IdSequence.objects.using('default').create(name=name, next_id=start)
+                except IntegrityError:
+                    sequence = IdSequence.objects.using('default').select_for_update().get(name=name)
+            start = sequence.next_id
+            sequence.next_id = start + self.block_size
+            sequence.save(using='default', update_fields=['next_id'])
+        return [start, start + self.block_size]
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_allocator():
+    global _allocator
+    with _allocator_lock:
+        if _allocator is None:
+            _allocator = IdAllocator(getattr(settings, 'SHARD_ID_BLOCK_SIZE', 1000))
+        return _allocator
+
+
+def assign_ids(objs):
+    """bulk_create() không phát pre_save: cấp id trước cho object thuộc ALLOCATED_MODELS"""
+    if sharding_enabled():
+        allocator = get_allocator()
+        for obj in objs:
+            if type(obj) in ALLOCATED_MODELS and obj.pk is None:
+                obj.pk = allocator.next_id(type(obj))
+    return objs
+
+
+def _auto_time_fields(model):
+    return [f.attname for f in model._meta.concrete_fields
+            if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+
+
+def copy_rows(model, objs, alias, keep_pk=True, upsert=False):
+    """
+    Chép object sang `alias` bằng bulk_create (không phát signal), giữ nguyên created_at/updated_at.
+    keep_pk=False: shard đích tự cấp id (bảng dùng id tự tăng).
+    """
+    objs = list(objs)
+    if not objs:
+        return
+    times = _auto_time_fields(model)
+    saved = [{name: getattr(obj, name) for name in times} for obj in objs]
+    if not keep_pk:
+        for obj in objs:
+            obj.pk = None
+    options = {}
+    if upsert:
+        options = {
+            'update_conflicts': True, 'unique_fields': [model._meta.pk.name],
+            'update_fields': [f.name for f in model._meta.concrete_fields if not f.primary_key],
+        }
+    model.objects.using(alias).bulk_create(objs, batch_size=500, **options)
+    if times and all(obj.pk is not None for obj in objs):
+        # bulk_create ghi đè auto_now/auto_now_add bằng thời điểm hiện tại; bulk_update thì không
+        for obj, values in zip(objs, saved):
+            for name, value in values.items():
+                setattr(obj, name, value)
+        model.objects.using(alias).bulk_update(objs, times, batch_size=500)
+
+
+def copy_reference_rows(alias, user_ids=None, workspace_ids=None):
+    """Chép user/profile/workspace từ default sang shard; None = tất cả"""
+    users = User.objects.using('default').all()
+    profiles = Profile.objects.using('default').all()
+    workspaces = Workspace.objects.using('default').all()
+    if user_ids is not None:
+        users, profiles = users.filter(pk__in=user_ids), profiles.filter(user_id__in=user_ids)
+    if workspace_ids is not None:
+        workspaces = workspaces.filter(pk__in=workspace_ids)
+    with transaction.atomic(using=alias):
+        copy_rows(User, users, alias, upsert=True)
+        copy_rows(Profile, profiles, alias, upsert=True)
+        copy_rows(Workspace, workspaces, alias, upsert=True)
+
+
+def card_subtree(card_ids):
+    """(model, queryset, giữ id) của mọi hàng dưới các card, theo thứ tự chép (cha trước con)"""
+    return [
+        (Card.labels.through, Card.labels.through.objects.filter(card_id__in=card_ids), False),
+        (Card.watchers.through, Card.watchers.through.objects.filter(card_id__in=card_ids), False),
+        (CardMembership, CardMembership.objects.filter(card_id__in=card_ids), False),
+        (CardActivity, CardActivity.objects.filter(card_id__in=card_ids), False),
+        (Comment, Comment.objects.filter(card_id__in=card_ids), True),
+        (Checklist, Checklist.objects.filter(card_id__in=card_ids), True),
+        (ChecklistItem, ChecklistItem.objects.filter(checklist__card_id__in=card_ids), True),
+        (Attachment, Attachment.objects.filter(card_id__in=card_ids), True),
+    ]
+
+
+def board_subtree(board_ids):
+    """(model, queryset, giữ id) của board và mọi hàng dưới board, cha trước con"""
+    card_ids = Card.objects.filter(list__board_id__in=board_ids).values('id')
+    return [
+        (Board, Board.objects.filter(pk__in=board_ids), True),
+        (BoardMembership, BoardMembership.objects.filter(board_id__in=board_ids), False),
+        (BoardInviteLink, BoardInviteLink.objects.filter(board_id__in=board_ids), False),
+        (Label, Label.objects.filter(board_id__in=board_ids), True),
+        (Tombstone, Tombstone.objects.filter(board_id__in=board_ids), False),
+        (List, List.objects.filter(board_id__in=board_ids), True),
+        (Card, Card.objects.filter(list__board_id__in=board_ids), True),
+        *card_subtree(card_ids),
+    ]
+
+
+def referenced_user_ids(model, rows):
+    fields = [f.attname for f in model._meta.concrete_fields if f.is_relation and f.related_model is User]
+    return {getattr(row, name) for row in rows for name in fields if getattr(row, name) is not None}
+
+
+def copy_card_tree(card_ids, source, target, detach=False):
+    """
+    Chép card và mọi hàng dưới card từ source sang target (cùng id). detach=True: card
+    sang target ở Inbox và không giữ label (label thuộc board cũ).
+    """
+    with use_shard(source):
+        cards = list(Card.objects.filter(pk__in=card_ids))
+        subtree = [(model, list(queryset), keep_pk) for model, queryset, keep_pk in card_subtree(card_ids)
+                   if not (detach and model is Card.labels.through)]
+    user_ids = referenced_user_ids(Card, cards)
+    for model, rows, _ in subtree:
+        user_ids |= referenced_user_ids(model, rows)
+    if detach:
+        for card in cards:
+            card.list_id = None
+    copy_reference_rows(target, user_ids=user_ids)
+    with transaction.atomic(using=target):
+        copy_rows(Card, cards, target)
+        for model, rows, keep_pk in subtree:
+            copy_rows(model, rows, target, keep_pk=keep_pk)
+
+
+def relocate_card(card_id, source, target):
+    """Chuyển card (chưa ở list nào bên target) sang shard khác; card bên target ở Inbox"""
+    copy_card_tree([card_id], source, target, detach=True)
+    with use_shard(source):
+        # Xoá bên source phát card.deleted/tombstone cho board cũ như khi card bị xoá
+        with transaction.atomic(using=source):
+            Card.objects.filter(pk=card_id).delete()
+
+
+def relocate_card_for_list(card_id, list_id):
+    """
+    Card được chuyển vào list ở shard khác (từ Inbox hoặc workspace khác): chép card sang
+    shard của list trước khi cập nhật. Trả về alias đích, hoặc None nếu không cần chuyển.
+    """
+    if not sharding_enabled() or not list_id:
+        return None
+    try:
+        list_id = int(list_id)
+    except (TypeError, ValueError):
+        return None
+    found = get_directory().locate(List, pk=list_id)
+    source = current_shard()
+    if found is None or found[0] == source:
+        return None
+    target, workspace_id = found
+    if get_directory().workspace(workspace_id)[1]:
+        raise WorkspaceMoving
+    relocate_card(card_id, source, target)
+    return target
+
+
+# ===== Signals =====
+
+@receiver(pre_save, dispatch_uid="boards_sharding_allocate_id")
+def allocate_id(sender, instance, raw=False, **kwargs):
+    if sender in ALLOCATED_MODELS and instance.pk is None and not raw and sharding_enabled():
+        instance.pk = get_allocator().next_id(sender)
+
+
+@receiver(post_save, sender=Workspace, dispatch_uid="boards_sharding_place_workspace")
+def place_workspace(sender, instance, created, using, raw=False, **kwargs):
+    """Workspace mới: chọn shard theo id"""
+    if created and not raw and using == 'default' and sharding_enabled():
+        aliases = shard_aliases()
+        instance.shard = aliases[instance.pk % len(aliases)]
+        Workspace.objects.using('default').filter(pk=instance.pk).update(shard=instance.shard)
+
+
+@receiver(post_save, sender=User, dispatch_uid="boards_sharding_replicate_user")
+@receiver(post_save, sender=Profile, dispatch_uid="boards_sharding_replicate_profile")
+@receiver(post_save, sender=Workspace, dispatch_uid="boards_sharding_replicate_workspace")
+def replicate_reference_row(sender, instance, using, raw=False, **kwargs):
+    if raw or using != 'default' or not sharding_enabled():
+        return
+    row = sender.objects.using('default').filter(pk=instance.pk)
+
+    def replicate():
+        for alias in settings.DATABASE_SHARDS:
+            copy_rows(sender, row, alias, upsert=True)
+        if sender is not Workspace and not kwargs['created']:
+            # Response của board được dựng từ bản chép trên shard: tăng version lại sau khi chép xong
+            bump_board_versions_for_user(instance.pk if sender is User else instance.user_id)
+    transaction.on_commit(replicate, using='default')
+
+
+@receiver(post_delete, sender=User, dispatch_uid="boards_sharding_delete_user")
+@receiver(post_delete, sender=Workspace, dispatch_uid="boards_sharding_delete_workspace")
+def delete_reference_row(sender, instance, using, **kwargs):
+    if using != 'default' or not sharding_enabled():
+        return
+    pk = instance.pk
+
+    def delete():
+        # Xoá theo cascade ở từng shard (board, card... của workspace/user). Xoá qua instance để
+        # origin của signal là object gốc như khi xoá ở default (signals._cascaded)
+        for alias in settings.DATABASE_SHARDS:
+            with use_shard(alias):
+                for obj in sender.objects.using(alias).filter(pk=pk):
+                    obj.delete(using=alias)
+        if sender is Workspace:
+            get_directory().invalidate(pk)
+    transaction.on_commit(delete, using='default')
+
@@ -0,0 +1,232 @@
+# boards/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from auth_app.models import Profile
+
+from .models import (
+    Attachment, Board, BoardInviteLink, BoardMembership, Card, CardActivity, CardMembership,
+    Checklist, ChecklistItem, Comment, Label, List, Workspace,
+)
+from .changes import record_tombstones
+from .readers import read_cards, read_lists
+from .outbox import notify_board_deleted, notify_membership_changed, publish_on_commit
+from .serializers import LabelSerializer
+from .versioning import (
+    bump_board_version, bump_board_version_for_card, bump_board_version_for_checklist,
+    bump_board_versions_for_user,
+)
+
+User = get_user_model()
+
+
+def _cascaded(instance, origin):
+    """
+    Bị xoá theo cascade từ workspace/board/list/card/checklist: object gốc sẽ tự tăng version
+    (hoặc board đã bị xoá), không cần một UPDATE cho từng object con.
+    """
+    return origin is not None and origin is not instance and isinstance(
+        origin, (Workspace, Board, List, Card, Checklist),
+    )
+
+
+@receiver(post_save, sender=Board, dispatch_uid="boards_version_board_saved")
+def board_saved(sender, instance, created, **kwargs):
+    if not created:
+        bump_board_version(instance.pk)
+
+
+@receiver(post_delete, sender=Board, dispatch_uid="boards_realtime_board_deleted")
+def board_deleted(sender, instance, **kwargs):
+    notify_board_deleted(instance.pk)
+
+
+@receiver(post_save, sender=List, dispatch_uid="boards_version_list_saved")
+@receiver(post_delete, sender=List, dispatch_uid="boards_version_list_deleted")
+def list_changed(sender, instance, signal, origin=None, **kwargs):
+    if _cascaded(instance, origin):
+        return
+    bump_board_version(instance.board_id)
+    list_id = instance.pk
+    if signal is post_delete:
+        record_tombstones(instance.board_id, 'lists', [list_id])
+        publish_on_commit(instance.board_id, 'list.deleted', list_id, lambda: {'id': list_id})
+        return
+    old_board_id = getattr(instance, '_loaded_board_id', None)
+    if old_board_id is not None and old_board_id != instance.board_id:
+        bump_board_version(old_board_id)
+        record_tombstones(old_board_id, 'lists', [list_id])
+        publish_on_commit(old_board_id, 'list.deleted', list_id, lambda: {'id': list_id})
+    instance._loaded_board_id = instance.board_id
+    publish_on_commit(instance.board_id, 'list.updated', list_id, lambda: _list_data(list_id))
+
+
+def _board_id_of_list(list_id):
+    if list_id is None:
+        return None
+    return List.objects.filter(pk=list_id).values_list('board_id', flat=True).first()
+
+
+def _board_id_of_card_list(card):
+    """Board của list chứa card; dùng list đã nạp sẵn (vd. select_related) nếu có"""
+    cached = Card.list.field.get_cached_value(card, None)
+    if cached is not None and cached.pk == card.list_id:
+        return cached.board_id
+    return _board_id_of_list(card.list_id)
+
+
+def _board_id_of_card(card_id):
+    return List.objects.filter(card__id=card_id).values_list('board_id', flat=True).first()
+
+
+def _list_data(list_id):
+    rows = read_lists(List.objects.filter(pk=list_id))
+    return rows[0] if rows else None
+
+
+def _card_data(card_id):
+    rows = read_cards(Card.objects.filter(pk=card_id))
+    return rows[0] if rows else None
+
+
+def _label_data(label_id):
+    label = Label.objects.filter(pk=label_id).first()
+    return LabelSerializer(label).data if label else None
+
+
+def _publish_card_updated(card_id, board_id=None):
+    if board_id is None:
+        board_id = _board_id_of_card(card_id)
+    publish_on_commit(board_id, 'card.updated', card_id, lambda: _card_data(card_id))
+
+
+def _touch_card(card_id):
+    # labels/members nằm trong payload của card: change feed phải thấy card thay đổi
+    Card.objects.filter(pk=card_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Card, dispatch_uid="boards_version_card_saved")
+@receiver(post_delete, sender=Card, dispatch_uid="boards_version_card_deleted")
+def card_changed(sender, instance, signal, origin=None, **kwargs):
+    if _cascaded(instance, origin):
+        return
+    card_id, board_id = instance.pk, _board_id_of_card_list(instance)
+    bump_board_version(board_id)
+    if signal is post_delete:
+        record_tombstones(board_id, 'cards', [card_id])
+        publish_on_commit(board_id, 'card.deleted', card_id, lambda: {'id': card_id})
+        return
+    old_list_id = getattr(instance, '_loaded_list_id', None)
+    if old_list_id is not None and old_list_id != instance.list_id:
+        old_board_id = _board_id_of_list(old_list_id)
+        if old_board_id != board_id:
+            bump_board_version(old_board_id)
+            record_tombstones(old_board_id, 'cards', [card_id])
+            publish_on_commit(old_board_id, 'card.deleted', card_id, lambda: {'id': card_id})
+    instance._loaded_list_id = instance.list_id
+    _publish_card_updated(card_id, board_id)
+
+
+@receiver(post_save, sender=BoardMembership, dispatch_uid="boards_realtime_membership_saved")
+@receiver(post_delete, sender=BoardMembership, dispatch_uid="boards_realtime_membership_deleted")
+def membership_changed(sender, instance, signal, origin=None, **kwargs):
+    """Kết nối WebSocket đang mở của user cập nhật role hoặc bị đóng khi bị xoá khỏi board"""
+    if not _cascaded(instance, origin):
+        role = None if signal is post_delete else instance.role
+        notify_membership_changed(instance.board_id, instance.user_id, role)
+
+
+@receiver(post_save, sender=BoardMembership, dispatch_uid="boards_version_membership_saved")
+@receiver(post_delete, sender=BoardMembership, dispatch_uid="boards_version_membership_deleted")
+@receiver(post_save, sender=BoardInviteLink, dispatch_uid="boards_version_invite_saved")
+@receiver(post_delete, sender=BoardInviteLink, dispatch_uid="boards_version_invite_deleted")
+def board_child_changed(sender, instance, origin=None, **kwargs):
+    if not _cascaded(instance, origin):
+        bump_board_version(instance.board_id)
+
+
+@receiver(post_save, sender=Label, dispatch_uid="boards_version_label_saved")
+@receiver(post_delete, sender=Label, dispatch_uid="boards_version_label_deleted")
+def label_changed(sender, instance, signal, origin=None, **kwargs):
+    if _cascaded(instance, origin):
+        return
+    bump_board_version(instance.board_id)
+    label_id = instance.pk
+    if signal is post_delete:
+        record_tombstones(instance.board_id, 'labels', [label_id])
+        publish_on_commit(instance.board_id, 'label.deleted', label_id, lambda: {'id': label_id})
+    else:
+        publish_on_commit(instance.board_id, 'label.updated', label_id, lambda: _label_data(label_id))
+
+
+TOMBSTONE_KINDS = {Comment: 'comments', Checklist: 'checklists', Attachment: 'attachments'}
+
+
+@receiver(post_save, sender=CardActivity, dispatch_uid="boards_version_activity_saved")
+@receiver(post_delete, sender=CardActivity, dispatch_uid="boards_version_activity_deleted")
+@receiver(post_save, sender=Comment, dispatch_uid="boards_version_comment_saved")
+@receiver(post_delete, sender=Comment, dispatch_uid="boards_version_comment_deleted")
+@receiver(post_save, sender=Checklist, dispatch_uid="boards_version_checklist_saved")
+@receiver(post_delete, sender=Checklist, dispatch_uid="boards_version_checklist_deleted")
+@receiver(post_save, sender=Attachment, dispatch_uid="boards_version_attachment_saved")
+@receiver(post_delete, sender=Attachment, dispatch_uid="boards_version_attachment_deleted")
+def card_child_changed(sender, instance, signal, origin=None, **kwargs):
+    if _cascaded(instance, origin):
+        return
+    bump_board_version_for_card(instance.card_id)
+    kind = TOMBSTONE_KINDS.get(sender)
+    if signal is post_delete and kind:
+        record_tombstones(_board_id_of_card(instance.card_id), kind, [instance.pk])
+
+
+@receiver(post_save, sender=CardMembership, dispatch_uid="boards_version_card_membership_saved")
+@receiver(post_delete, sender=CardMembership, dispatch_uid="boards_version_card_membership_deleted")
+def card_membership_changed(sender, instance, origin=None, **kwargs):
+    if not _cascaded(instance, origin):
+        bump_board_version_for_card(instance.card_id)
+        _touch_card(instance.card_id)
+        _publish_card_updated(instance.card_id)
+
+
+@receiver(post_save, sender=ChecklistItem, dispatch_uid="boards_version_checklist_item_saved")
+@receiver(post_delete, sender=ChecklistItem, dispatch_uid="boards_version_checklist_item_deleted")
+def checklist_item_changed(sender, instance, origin=None, **kwargs):
+    if not _cascaded(instance, origin):
+        bump_board_version_for_checklist(instance.checklist_id)
+        # items nằm trong payload của checklist
+        Checklist.objects.filter(pk=instance.checklist_id).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Card.labels.through, dispatch_uid="boards_version_card_labels")
+@receiver(m2m_changed, sender=Card.members.through, dispatch_uid="boards_version_card_members")
+@receiver(m2m_changed, sender=Card.watchers.through, dispatch_uid="boards_version_card_watchers")
+def card_relation_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_board_version_for_card(instance.pk)
+        _touch_card(instance.pk)
+        if sender is not Card.watchers.through:
+            _publish_card_updated(instance.pk)
+    elif isinstance(instance, Label):
+        bump_board_version(instance.board_id)
+        Card.objects.filter(pk__in=pk_set or ()).update(updated_at=timezone.now())
+    else:
+        # user.watched_cards...: tăng version cho board của từng card
+        for card_id in pk_set or ():
+            bump_board_version_for_card(card_id)
+        Card.objects.filter(pk__in=pk_set or ()).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=User, dispatch_uid="boards_version_user_saved")
+@receiver(post_save, sender=Profile, dispatch_uid="boards_version_profile_saved")
+def user_summary_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Tên/email/avatar hiển thị trong members của board và card"""
+    if created:
+        return
+    fields = {'username', 'email', 'first_name', 'last_name', 'avatar', 'avatar_thumbnail'}
+    if update_fields is not None and not fields & set(update_fields):
+        return
+    bump_board_versions_for_user(instance.pk if sender is User else instance.user_id)
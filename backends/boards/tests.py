@@ -1,3 +1,349 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from auth_app.models import Profile
+from auth_app.tokens import get_tokens_for_user
+from config.db_router import use_shard
+
+from .cache import BOARD_RESPONSE_CACHE_ALIAS
+from . import sharding
+from .management.commands.bench_endpoints import seed_endpoint_data
+from .management.commands.bench_serializers import seed_board
+from .changes import encode_cursor
+from .models import Attachment, Board, Card, CardMembership, Comment, List, Workspace
+from .outbox import get_outbox
+from .realtime import board_group_name
+from .readers import read_boards, read_cards, read_lists
+from .serializers import LABELS_BY_ID, MEMBERS_WITH_PROFILE, BoardSerializer, CardSerializer, ListSerializer
+
+
+def _json(data):
+    # So sánh sau khi encode JSON: datetime/Decimal của hai đường đọc ra cùng chuỗi
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+class ReaderParityTests(TestCase):
+    """boards.readers phải trả về đúng payload của serializer DRF tương ứng"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.list = seed_board(n_cards=30, n_users=8, members_per_card=2)
+        cls.board_id = cls.list.board_id
+
+    def assertSameJSON(self, actual, expected):
+        self.assertTrue(expected)
+        self.assertEqual(_json(actual), _json(expected))
+
+    def test_read_cards(self):
+        cards = Card.objects.filter(list=self.list).order_by('position')
+        expected = CardSerializer(cards.prefetch_related(MEMBERS_WITH_PROFILE, LABELS_BY_ID), many=True).data
+        self.assertSameJSON(read_cards(cards), expected)
+
+    def test_read_lists(self):
+        lists = List.objects.filter(board_id=self.board_id).order_by('position')
+        self.assertSameJSON(read_lists(lists), ListSerializer(lists, many=True).data)
+
+    def test_read_boards(self):
+        boards = Board.objects.filter(id=self.board_id)
+        expected = BoardSerializer(boards.select_related('workspace'), many=True).data
+        self.assertSameJSON(read_boards(boards), expected)
+
+
+class EndpointQueryCountTests(TestCase):
+    """Số truy vấn của các GET chính không được tăng theo số list/card của board (N+1)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixtures = seed_endpoint_data(n_lists=5, n_cards=50, n_members=6)
+        cls.owner = cls.fixtures['users']['owner']
+
+    def setUp(self):
+        caches[BOARD_RESPONSE_CACHE_ALIAS].clear()
+        self.client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {get_tokens_for_user(self.owner)['access']}"
+
+    def grow_board(self):
+        """Thêm list, card (có label và thành viên) vào board chính"""
+        board = Board.objects.get(pk=self.fixtures['board_id'])
+        labels = list(board.labels.all())
+        members = [m.user for m in board.memberships.select_related('user')]
+        lists = List.objects.bulk_create([List(name=f'More {i}', board=board, position=100 + i) for i in range(10)])
+        cards = Card.objects.bulk_create([
+            Card(name=f'More card {i}', list=lists[i % 10], created_by=self.owner, position=100 + i)
+            for i in range(100)
+        ])
+        Card.labels.through.objects.bulk_create([
+            Card.labels.through(card=card, label=labels[i % len(labels)]) for i, card in enumerate(cards)
+        ])
+        CardMembership.objects.bulk_create([
+            CardMembership(card=card, user=members[i % len(members)], assigned_by=self.owner)
+            for i, card in enumerate(cards)
+        ])
+        Card.objects.filter(pk__in=[c.pk for c in cards[:30]]).update(list_id=self.fixtures['list_id'])
+        caches[BOARD_RESPONSE_CACHE_ALIAS].clear()
+
+    def assertQueryCount(self, path, expected):
+        with self.assertNumQueries(expected):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertConstantQueries(self, path, expected):
+        self.assertQueryCount(path, expected)
+        self.grow_board()
+        self.assertQueryCount(path, expected)
+
+    def test_board_detail(self):
+        f = self.fixtures
+        self.assertConstantQueries(f"/api/workspaces/{f['workspace_id']}/boards/{f['board_id']}/", 2)
+
+    def test_lists(self):
+        self.assertConstantQueries(f"/api/boards/{self.fixtures['board_id']}/lists/", 2)
+
+    def test_cards(self):
+        self.assertConstantQueries(f"/api/lists/{self.fixtures['list_id']}/cards/", 6)
+
+
+class BoardVersionTests(TestCase):
+    """Trong transaction, version của board chỉ tăng một lần khi commit"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # TestCase không bao giờ commit: chạy tay bump của dữ liệu seed để test bắt đầu với
+        # connection không còn bump nào đang chờ (bỏ qua callback outbox)
+        with cls.captureOnCommitCallbacks() as callbacks:
+            cls.fixtures = seed_endpoint_data(n_lists=2, n_cards=20, n_members=4)
+        cls.run_version_bumps(callbacks)
+        cls.board_id = cls.fixtures['board_id']
+
+    @staticmethod
+    def run_version_bumps(callbacks):
+        for callback in callbacks:
+            if callback.__module__ == 'boards.versioning':
+                callback()
+
+    def version(self):
+        return Board.objects.values_list('version', flat=True).get(pk=self.board_id)
+
+    def test_batch_update_bumps_once(self):
+        owner = self.fixtures['users']['owner']
+        cards = Card.objects.filter(list__board_id=self.board_id).order_by('id')
+        body = [{'id': card.id, 'position': 1000 + i} for i, card in enumerate(cards)]
+        before = self.version()
+        self.client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {get_tokens_for_user(owner)['access']}"
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.patch('/api/cards/batch-update/', body, content_type='application/json')
+            self.run_version_bumps(callbacks)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(body), 1)
+        bumps = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "boards_board"')]
+        self.assertEqual(len(bumps), 1)
+        self.assertEqual(self.version(), before + 1)
+
+    def test_rolled_back_savepoint_reregisters(self):
+        card = Card.objects.filter(list__board_id=self.board_id).first()
+        before = self.version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            try:
+                with transaction.atomic():
+                    card.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.assertEqual(self.version(), before)
+            card.save()
+        self.run_version_bumps(callbacks)
+        self.assertEqual(self.version(), before + 1)
+
+
+class RealtimeOutboxTests(TransactionTestCase):
+    """Thay đổi đã commit đi qua outbox tới group của board (channel layer 'local' khi test)"""
+
+    def test_committed_card_change_reaches_group(self):
+        fixtures = seed_endpoint_data(n_lists=1, n_cards=1, n_members=4)
+        self.assertTrue(get_outbox().flush())  # sự kiện của dữ liệu seed
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(board_group_name(fixtures['board_id']), channel)
+
+        card = Card.objects.create(name='Realtime', list_id=fixtures['list_id'], created_by=fixtures['users']['owner'])
+        self.assertTrue(get_outbox().flush())
+
+        async def receive():
+            return await asyncio.wait_for(layer.receive(channel), timeout=5)
+        message = async_to_sync(receive)()
+        self.assertEqual(message['type'], 'board.events')
+        [event] = message['events']
+        self.assertEqual((event['type'], event['data']['id']), ('card.updated', card.id))
+        self.assertIsInstance(event['seq'], int)
+
+
+class ChangeFeedTests(TestCase):
+    """Mọi object bị đổi bởi một request đều có trong change feed kể từ cursor trước đó"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixtures = seed_endpoint_data(n_lists=1, n_cards=2, n_members=4)
+        cls.owner = cls.fixtures['users']['owner']
+
+    def setUp(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {get_tokens_for_user(self.owner)['access']}"
+
+    def changes_since(self, moment):
+        response = self.client.get(f"/api/boards/{self.fixtures['board_id']}/changes/",
+                                   {'since': encode_cursor(moment)})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cover_swap_returns_both_attachments(self):
+        card = Card.objects.filter(list_id=self.fixtures['list_id']).first()
+        old, new = [
+            Attachment.objects.create(card=card, name=name, attachment_type='link', url='https://example.com',
+                                      uploaded_by=self.owner, is_cover=name == 'old')
+            for name in ('old', 'new')
+        ]
+        Attachment.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        cursor = timezone.now() - timedelta(minutes=10)
+
+        response = self.client.patch(f'/api/attachments/{new.pk}/', {'is_cover': True}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        covers = {a['id']: a['is_cover'] for a in self.changes_since(cursor)['attachments']}
+        self.assertEqual(covers, {old.pk: False, new.pk: True})
+
+
+@override_settings(DATABASE_SHARDS=['shard_1'])
+class ShardingTests(TestCase):
+    """Sharding theo workspace (boards.sharding) với default và shard_1"""
+
+    databases = {'default', 'shard_1'}
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.owner, cls.member = User.objects.bulk_create([
+            User(username='shard_owner', email='shard_owner@example.com'),
+            User(username='shard_member', email='shard_member@example.com'),
+        ])
+        Profile.objects.bulk_create([Profile(user=cls.owner), Profile(user=cls.member)])
+
+    def setUp(self):
+        caches[BOARD_RESPONSE_CACHE_ALIAS].clear()
+        # Directory/bộ cấp id là cache của process: không dùng lại giữa các test
+        for name in ('_directory', '_allocator'):
+            patcher = mock.patch.object(sharding, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {get_tokens_for_user(self.owner)['access']}"
+
+    def api(self, method, path, data=None, user=None, expected=None):
+        headers = {}
+        if user is not None:
+            headers['HTTP_AUTHORIZATION'] = f"Bearer {get_tokens_for_user(user)['access']}"
+        response = getattr(self.client, method)(path, data, content_type='application/json', **headers)
+        if expected is not None:
+            self.assertEqual(response.status_code, expected, response.content)
+        return response.json() if response.content else None
+
+    def create_workspace(self, alias):
+        """Workspace qua API cho tới khi được đặt vào `alias`, kèm bản chép user/workspace ở shard_1"""
+        while True:
+            workspace_id = self.api('post', '/api/workspaces/', {'name': 'Shard'}, expected=201)['id']
+            if Workspace.objects.get(pk=workspace_id).shard == alias:
+                break
+        # Thường do on_commit (replicate_reference_row) chép; TestCase không commit
+        sharding.copy_reference_rows('shard_1')
+        return workspace_id
+
+    def create_board(self, workspace_id):
+        board = self.api('post', f'/api/workspaces/{workspace_id}/boards/', {'name': 'Board'}, expected=201)
+        list_id = self.api('post', f"/api/boards/{board['id']}/lists/", {'name': 'List', 'board': board['id']},
+                           expected=201)['id']
+        return board['id'], list_id
+
+    def count(self, model, alias, **lookup):
+        return model.objects.using(alias).filter(**lookup).count()
+
+    def test_workspace_placement(self):
+        for _ in range(4):
+            workspace_id = self.api('post', '/api/workspaces/', {'name': 'Placed'}, expected=201)['id']
+            expected = ['default', 'shard_1'][workspace_id % 2]
+            self.assertEqual(Workspace.objects.get(pk=workspace_id).shard, expected)
+            self.assertEqual(sharding.shard_for(Workspace, pk=workspace_id), expected)
+
+    def test_crud_routed_to_workspace_shard(self):
+        workspace_id = self.create_workspace('shard_1')
+        board_id, list_id = self.create_board(workspace_id)
+        card_id = self.api('post', f'/api/lists/{list_id}/cards/', {'name': 'Card'}, expected=201)['id']
+        self.api('post', f'/api/cards/{card_id}/comments/', {'content': 'hi'}, expected=201)
+        for model, lookup in ((Board, {'pk': board_id}), (List, {'pk': list_id}), (Card, {'pk': card_id}),
+                              (Comment, {'card_id': card_id})):
+            self.assertEqual((self.count(model, 'shard_1', **lookup), self.count(model, 'default', **lookup)), (1, 0))
+
+        self.api('patch', f'/api/cards/{card_id}/', {'name': 'Renamed'}, expected=200)
+        cards = self.api('get', f'/api/lists/{list_id}/cards/', expected=200)
+        self.assertEqual([card['name'] for card in cards], ['Renamed'])
+        self.api('get', f'/api/workspaces/{workspace_id}/boards/{board_id}/', expected=200)
+
+        self.api('delete', f'/api/cards/{card_id}/', expected=204)
+        self.assertEqual(self.count(Card, 'shard_1', pk=card_id), 0)
+
+    def test_inbox_and_workspace_list_fan_out(self):
+        workspace_id = self.create_workspace('shard_1')
+        board_id, _ = self.create_board(workspace_id)
+        self.api('post', f'/api/boards/{board_id}/members/', {'user_id': self.member.id, 'role': 'editor'},
+                 expected=201)
+        workspaces = self.api('get', '/api/workspaces/', user=self.member, expected=200)
+        self.assertEqual([w['id'] for w in workspaces], [workspace_id])
+
+        on_default = self.api('post', '/api/cards/', {'name': 'Inbox default'}, expected=201)
+        with use_shard('shard_1'):
+            on_shard = Card.objects.create(name='Inbox shard_1', created_by=self.owner)
+        self.assertTrue(Card.objects.using('default').filter(pk=on_default['id']).exists())
+        inbox = self.api('get', '/api/cards/', expected=200)
+        self.assertEqual({card['id'] for card in inbox}, {on_default['id'], on_shard.pk})
+
+    def test_relocate_card_for_list(self):
+        workspace_id = self.create_workspace('shard_1')
+        _, list_id = self.create_board(workspace_id)
+        card_id = self.api('post', '/api/cards/', {'name': 'Inbox'}, expected=201)['id']
+        self.api('post', f'/api/cards/{card_id}/comments/', {'content': 'keep me'}, expected=201)
+
+        self.assertEqual(sharding.relocate_card_for_list(card_id, list_id), 'shard_1')
+        self.assertFalse(Card.objects.using('default').filter(pk=card_id).exists())
+        self.assertIsNone(Card.objects.using('shard_1').get(pk=card_id).list_id)
+        self.assertEqual(self.count(Comment, 'shard_1', card_id=card_id), 1)
+        # Card đã ở shard của list: không phải chuyển nữa
+        with use_shard('shard_1'):
+            self.assertIsNone(sharding.relocate_card_for_list(card_id, list_id))
+
+    def test_rebalance_workspace(self):
+        workspace_id = self.create_workspace('shard_1')
+        board_id, list_id = self.create_board(workspace_id)
+        for i in range(3):
+            card_id = self.api('post', f'/api/lists/{list_id}/cards/', {'name': f'Card {i}'}, expected=201)['id']
+            self.api('post', f'/api/cards/{card_id}/comments/', {'content': 'hi'}, expected=201)
+        models = (Board, List, Card, Comment)
+        before = [self.count(model, 'shard_1') for model in models]
+
+        call_command('rebalance_workspace', workspace_id, 'default', wait=0, stdout=io.StringIO())
+
+        self.assertEqual(Workspace.objects.get(pk=workspace_id).shard, 'default')
+        self.assertEqual([self.count(model, 'default') for model in models], before)
+        self.assertEqual([self.count(model, 'shard_1') for model in models], [0] * len(models))
+        cards = self.api('get', f'/api/lists/{list_id}/cards/', expected=200)
+        self.assertEqual(len(cards), 3)
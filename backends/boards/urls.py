@@ -6,6 +6,7 @@ from .views import (
     ListsCreateView,
     CardListCreateView,
     BoardDetailView,
+    BoardChangesView,
     CardDetailView,
     ListDetailView,
     InboxCardCreateView,
@@ -39,6 +40,7 @@ urlpatterns = [
     # Card (theo list)
     path('lists/<int:list_id>/cards/', CardListCreateView.as_view(), name='card-list-create'),
     path('workspaces/<int:workspace_id>/boards/<int:board_id>/', BoardDetailView.as_view(), name='board-detail'),
+    path('boards/<int:board_id>/changes/', BoardChangesView.as_view(), name='board-changes'),
     # Card va List thay doi vi tri khi f5 va save card list
     path('cards/<int:card_id>/', CardDetailView.as_view(), name='card-detail'),
     path('lists/<int:list_id>/', ListDetailView.as_view(), name='list-detail'),
@@ -0,0 +1,104 @@
+# boards/versioning.py
+"""
+Version theo board: tăng mỗi khi có thay đổi bất kỳ dưới board đó
+(list, card, label, member, comment, checklist, attachment...).
+
+Hầu hết thay đổi được bắt qua signals (boards/signals.py). Các chỗ dùng
+QuerySet.update()/bulk_create() không phát signal nên phải gọi bump_* trực tiếp.
+Version luôn được tăng bằng F() để không bị ghi đè bởi instance cũ.
+
+Trong transaction, bump_board_version() chỉ ghi nhận board id; mỗi board được tăng version
+một lần khi commit (một UPDATE cho cả transaction, vd. batch-update 200 card).
+"""
+import weakref
+
+from django.db import connections, router, transaction
+from django.db.models import F, Q
+from django.utils.http import parse_etags
+
+from config.db_router import fan_out
+
+from .models import Board
+
+
+def _bump(*args, **lookup):
+    Board.objects.filter(*args, **lookup).update(version=F('version') + 1)
+
+
+class _PendingBumps:
+    """Board id cần tăng version khi transaction đang mở trên một connection commit"""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.board_ids = set()
+        self.callback = None
+
+    def is_scheduled(self):
+        # Django bỏ callback on_commit khi transaction/savepoint chứa nó bị rollback; callback
+        # chỉ được giữ ở đó nên weakref chết theo và lần bump sau đăng ký lại
+        return self.callback is not None and self.callback() is not None
+
+
+# connection → bump đang chờ của transaction hiện tại trên connection đó
+_pending = weakref.WeakKeyDictionary()
+
+
+def _schedule(connection, alias):
+    pending = _PendingBumps(alias)
+
+    def flush():
+        if _pending.get(connection) is pending:
+            del _pending[connection]
+        Board.objects.using(alias).filter(pk__in=pending.board_ids).update(version=F('version') + 1)
+
+    pending.callback = weakref.ref(flush)
+    _pending[connection] = pending
+    transaction.on_commit(flush, using=alias)
+    return pending
+
+
+def bump_board_version(board_id):
+    if board_id is None:
+        return
+    alias = router.db_for_write(Board)
+    connection = connections[alias]
+    if not connection.in_atomic_block:
+        _bump(pk=board_id)
+        return
+    pending = _pending.get(connection)
+    if pending is None or not pending.is_scheduled():
+        pending = _schedule(connection, alias)
+    pending.board_ids.add(board_id)
+
+
+def bump_board_version_for_list(list_id):
+    if list_id is not None:
+        _bump(list__id=list_id)
+
+
+def bump_board_version_for_card(card_id):
+    if card_id is not None:
+        _bump(list__card__id=card_id)
+
+
+def bump_board_version_for_checklist(checklist_id):
+    if checklist_id is not None:
+        _bump(list__card__checklists__id=checklist_id)
+
+
+def bump_board_versions_for_user(user_id):
+    """Tên/avatar của user xuất hiện trong payload của mọi board user tham gia (trên mọi shard)"""
+    fan_out(lambda: _bump(Q(created_by_id=user_id) | Q(members__id=user_id)))
+
+
+def board_etag(board):
+    return f'"board-{board.pk}-v{board.version}"'
+
+
+def etag_matches(request, etag):
+    """If-None-Match có chứa `etag` không (so sánh yếu, vì ETag có thể bị nén thành W/"...")"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or any(e.removeprefix('W/') == etag for e in etags)
@@ -3,16 +3,21 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import generics,status
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.parsers import MultiPartParser, FormParser
+from config.db_router import fan_out, use_shard
+from config.renderers import FastJSONParser
 from rest_framework.response import Response
 
 from django.contrib.auth import get_user_model
 from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect
-from django.db import transaction
+from django.db import router, transaction
 from django.http import FileResponse
 from django.utils.encoding import smart_str
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
+import heapq
 from urllib.parse import urlparse
 
 from rest_framework import permissions
@@ -27,7 +32,12 @@ from .serializers import (
     CardMembership,CardMembershipSerializer,ChecklistSerializer, ChecklistItemSerializer,
     AttachmentSerializer
 )
-from .decorators import require_board_admin, require_board_editor, require_card_editor, require_board_viewer
+from .readers import read_boards, read_cards, read_lists
+from .versioning import bump_board_version, bump_board_version_for_checklist
+from .changes import CursorExpired, InvalidCursor, build_change_feed, record_tombstones
+from .outbox import publish_on_commit
+from .sharding import enter_shard_of, relocate_card_for_list
+from .decorators import read_from_replica, require_board_admin, require_board_editor, require_card_editor, require_board_viewer
 from .permissions import check_board_admin_permission,check_card_edit_permission, check_board_view_permission, IsBoardMember # Import hàm permission mới
 
 User = get_user_model()
@@ -40,8 +50,13 @@ User = get_user_model()
 class WorkspaceListCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @read_from_replica
     def get(self, request):
-        workspaces = Workspace.objects.filter(Q(owner=request.user) | Q(board__members=request.user)).distinct()
+        # Board nằm ở shard của workspace: lấy workspace có board user tham gia từ mọi shard
+        member_workspace_ids = set().union(*fan_out(lambda: set(
+            Board.objects.filter(members=request.user).values_list('workspace_id', flat=True)
+        )))
+        workspaces = Workspace.objects.filter(Q(owner=request.user) | Q(id__in=member_workspace_ids))
         serializer = WorkspaceSerializer(workspaces, many=True)
         return Response(serializer.data)
 
@@ -55,6 +70,7 @@ class WorkspaceListCreateView(APIView):
 class BoardListCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @read_from_replica
     def get(self, request, workspace_id):
         boards = (Board.objects
                 .filter(is_closed=False)
@@ -62,8 +78,7 @@ class BoardListCreateView(APIView):
                 .distinct()
                 .select_related('workspace'))  # ✅ thêm
 
-        serializer = BoardSerializer(boards, many=True, context={'request': request})
-        return Response(serializer.data)
+        return Response(read_boards(boards))
 
     def post(self, request, workspace_id):
         DEFAULT_LABEL_COLORS = ['#61bd4f', '#f2d600', '#ff9f1a', '#eb5a46', '#c377e0', '#0079bf']
@@ -84,11 +99,13 @@ class BoardListCreateView(APIView):
 class BoardDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
-    @require_board_viewer(lambda s, r, **k: Board.objects.get(id=k['board_id']))
+    @read_from_replica
+    @require_board_viewer(lambda s, r, **k: Board.objects.get(id=k['board_id']), etag=True, cache='board')
     def get(self, request, workspace_id, board_id):
-        board = Board.objects.get(id=board_id, workspace_id=workspace_id)
-        serializer = BoardSerializer(board, context={'request': request})
-        return Response(serializer.data)
+        boards = read_boards(Board.objects.filter(id=board_id, workspace_id=workspace_id))
+        if not boards:
+            raise Board.DoesNotExist("Board matching query does not exist.")
+        return Response(boards[0])
 
     @require_board_admin(lambda s, r, **k: Board.objects.get(id=k['board_id']))
     def patch(self, request, workspace_id, board_id):
@@ -106,17 +123,37 @@ class BoardDetailView(APIView):
         board.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class BoardChangesView(APIView):
+    """Các thay đổi của board kể từ cursor `since` (boards.changes), không có `since` → toàn bộ board"""
+    permission_classes = [IsAuthenticated]
+
+    @read_from_replica
+    @require_board_viewer(lambda s, r, **k: Board.objects.get(id=k['board_id']))
+    def get(self, request, board_id):
+        board = Board.objects.get(id=board_id)
+        try:
+            feed = build_change_feed(board, request.query_params.get('since'), request)
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except CursorExpired:
+            return Response({'error': 'Cursor expired, reload the board.', 'code': 'cursor_expired'},
+                            status=status.HTTP_410_GONE)
+        return Response(feed)
+
+
 class ClosedBoardsListView(APIView):
     permission_classes = [IsAuthenticated]
+    @read_from_replica
     def get(self, request):
         # views.py
-        user_boards = (Board.objects
-            .filter(Q(created_by=request.user) | Q(members=request.user), is_closed=True)
-            .distinct()
-            .select_related('workspace'))  # ✅ thay vì prefetch_related
+        def user_boards():
+            return read_boards(Board.objects
+                .filter(Q(created_by=request.user) | Q(members=request.user), is_closed=True)
+                .distinct()
+                .select_related('workspace'))  # ✅ thay vì prefetch_related
 
-        serializer = BoardSerializer(user_boards, many=True, context={'request': request})
-        return Response(serializer.data)
+        # Board đã đóng của user có thể nằm ở mọi shard
+        return Response([board for boards in fan_out(user_boards) for board in boards])
     
 # ===================================================================
 # Views cho List và Card
@@ -124,11 +161,11 @@ class ClosedBoardsListView(APIView):
 
 class ListsCreateView(APIView):
     permission_classes = [IsAuthenticated]
-    @require_board_viewer(lambda s, r, **k: Board.objects.get(id=k['board_id']))
+    @read_from_replica
+    @require_board_viewer(lambda s, r, **k: Board.objects.get(id=k['board_id']), etag=True, cache='lists')
     def get(self, request, board_id):
         lists = List.objects.filter(board_id=board_id).order_by('position')
-        serializer = ListSerializer(lists, many=True)
-        return Response(serializer.data)
+        return Response(read_lists(lists))
 
     @require_board_editor(lambda s, r, **k: Board.objects.get(id=k['board_id']))
     def post(self, request, board_id):
@@ -150,18 +187,24 @@ class ListDetailView(APIView):
     @require_board_admin(lambda s, r, **k: List.objects.get(id=k['list_id']).board)
     def delete(self, request, list_id):
         list_obj = List.objects.get(id=list_id)
-        Card.objects.filter(list=list_obj).update(list=None)
+        cards = Card.objects.filter(list=list_obj)
+        # Card chuyển về Inbox, tức là rời khỏi board trong change feed
+        card_ids = list(cards.values_list('id', flat=True))
+        record_tombstones(list_obj.board_id, 'cards', card_ids)
+        cards.update(list=None, updated_at=timezone.now())
+        for card_id in card_ids:
+            publish_on_commit(list_obj.board_id, 'card.deleted', card_id, lambda card_id=card_id: {'id': card_id})
         list_obj.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 class CardListCreateView(APIView):
     permission_classes = [IsAuthenticated]
-    @require_board_viewer(lambda s, r, **k: List.objects.get(id=k['list_id']).board)
+    @read_from_replica
+    @require_board_viewer(lambda s, r, **k: List.objects.get(id=k['list_id']).board, etag=True, cache='cards')
     def get(self, request, list_id):
-        # Tối ưu query ở đây
-        cards = Card.objects.filter(list_id=list_id).prefetch_related('members').order_by('position')
-        serializer = CardSerializer(cards, many=True)
-        return Response(serializer.data)
+        # Đọc nhanh qua .values(), output giống CardSerializer
+        cards = Card.objects.filter(list_id=list_id).order_by('position')
+        return Response(read_cards(cards))
 
     @require_board_editor(lambda s, r, **k: List.objects.get(id=k['list_id']).board)
     def post(self, request, list_id):
@@ -183,7 +226,15 @@ class CardDetailView(APIView):
             'name': card.name,
             'labels': set(card.labels.all())
         }
-        
+
+        # List đích ở shard khác: card đã được chép sang shard đó (ở Inbox), cập nhật tiếp ở đó
+        target = relocate_card_for_list(card_id, request.data.get('list'))
+        if target is not None:
+            with use_shard(target):
+                return self._update(Card.objects.get(id=card_id), old_data, request)
+        return self._update(card, old_data, request)
+
+    def _update(self, card, old_data, request):
         serializer = CardSerializer(card, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         
@@ -280,20 +331,25 @@ class CardDetailView(APIView):
 
 class InboxCardCreateView(APIView):
     permission_classes = [IsAuthenticated]
+    @read_from_replica
     def get(self, request):
-        user_accessible_boards = Board.objects.filter(Q(created_by=request.user) | Q(members=request.user)).distinct()
-        all_related_user_ids = set()
-        for board in user_accessible_boards:
-            if board.created_by: all_related_user_ids.add(board.created_by.id)
-            all_related_user_ids.update(board.members.values_list('id', flat=True))
-
-        inbox_cards = (Card.objects
+        def related_user_ids():
+            user_accessible_boards = Board.objects.filter(Q(created_by=request.user) | Q(members=request.user)).distinct()
+            user_ids = set()
+            for board in user_accessible_boards:
+                if board.created_by: user_ids.add(board.created_by.id)
+                user_ids.update(board.members.values_list('id', flat=True))
+            return user_ids
+        all_related_user_ids = set().union(*fan_out(related_user_ids))
+
+        # Card ở Inbox có thể nằm ở mọi shard: gộp lại theo created_at giảm dần
+        inbox_cards = fan_out(lambda: read_cards(Card.objects
             .filter(list__isnull=True, created_by_id__in=all_related_user_ids)
-            .prefetch_related('members')        # ✅ thêm
-            .order_by('-created_at'))
+            .order_by('-created_at')))
 
-        serializer = CardSerializer(inbox_cards, many=True)
-        return Response(serializer.data)
+        if len(inbox_cards) == 1:
+            return Response(inbox_cards[0])
+        return Response(list(heapq.merge(*inbox_cards, key=lambda c: parse_datetime(c['created_at']), reverse=True)))
     
     def post(self, request):
         serializer = CardSerializer(data=request.data)
@@ -310,13 +366,18 @@ class CardBatchUpdateView(APIView):
         if not isinstance(updates, list) or not updates:
             return Response({"error": "Request body must be a non-empty list"}, status=400)
 
+        # Card nằm trong body: vào shard của card đầu tiên (các card phải cùng board)
+        with enter_shard_of(Card, pk=updates[0].get("id")):
+            return self._update(request, updates)
+
+    def _update(self, request, updates):
         first_card = get_object_or_404(Card, id=updates[0].get("id"))
         if not first_card.list:
             return Response({"error": "Inbox cards cannot be batch-updated here"}, status=400)
         board = first_card.list.board
         check_board_admin_permission(board, request.user)  # ✅ kiểm tra admin/owner
 
-        with transaction.atomic():
+        with transaction.atomic(using=router.db_for_write(Card)):
             for upd in updates:
                 card = get_object_or_404(Card, id=upd.get("id"))
                 if not card.list or card.list.board_id != board.id:
@@ -334,9 +395,10 @@ class CardBatchUpdateView(APIView):
 class BoardMembersView(APIView):
     permission_classes = [IsAuthenticated]
 
-    @require_board_viewer(lambda s, r, **k: Board.objects.get(id=k['board_id']))
+    @read_from_replica
+    @require_board_viewer(lambda s, r, **k: Board.objects.get(id=k['board_id']), etag=True, cache='members')
     def get(self, request, board_id):
-        memberships = BoardMembership.objects.filter(board_id=board_id).select_related('user')
+        memberships = BoardMembership.objects.filter(board_id=board_id).select_related('user__profile')
         serializer = BoardMembershipSerializer(memberships, many=True)
         return Response(serializer.data)
 
@@ -393,7 +455,8 @@ class BoardMembersView(APIView):
 class BoardLabelListCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
-    @require_board_viewer(lambda self, request, board_id: Board.objects.get(id=board_id))
+    @read_from_replica
+    @require_board_viewer(lambda self, request, board_id: Board.objects.get(id=board_id), etag=True, cache='labels')
     def get(self, request, board_id):
         """Lấy danh sách tất cả labels của một board."""
         labels = Label.objects.filter(board_id=board_id)
@@ -477,6 +540,7 @@ class BoardShareLinkView(APIView):
     @require_board_admin(lambda self, request, board_id: Board.objects.get(id=board_id))
     def delete(self, request, board_id):
         BoardInviteLink.objects.filter(board_id=board_id, is_active=True).update(is_active=False)
+        bump_board_version(board_id)  # update() không phát signal
         return Response(status=status.HTTP_204_NO_CONTENT)
     
 
@@ -522,6 +586,7 @@ class BoardJoinByLinkView(APIView):
 class CardCommentsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @read_from_replica
     def get(self, request, card_id):
         card = Card.objects.select_related('list__board', 'created_by').get(id=card_id)
         # Quyền xem: nếu có list => dùng quyền xem board; nếu inbox => tác giả hoặc cùng board
@@ -539,7 +604,7 @@ class CardCommentsView(APIView):
                 if not has_common:
                     return Response({'detail': 'Forbidden'}, status=403)
 
-        qs = Comment.objects.filter(card=card).order_by('-created_at')
+        qs = Comment.objects.filter(card=card).select_related('author__profile').order_by('-created_at')
         return Response(CommentSerializer(qs, many=True).data)
 
     def post(self, request, card_id):
@@ -585,6 +650,7 @@ class CardMembershipListCreateView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @read_from_replica
     def get(self, request, card_id):
         """Lấy danh sách tất cả thành viên của card."""
         card = Card.objects.get(id=card_id)
@@ -593,7 +659,7 @@ class CardMembershipListCreateView(APIView):
             check_board_view_permission(card.list.board, request.user)
         # (Bạn có thể thêm logic cho inbox card ở đây nếu cần)
 
-        memberships = CardMembership.objects.filter(card=card).select_related('user', 'assigned_by')
+        memberships = CardMembership.objects.filter(card=card).select_related('user__profile', 'assigned_by__profile')
         serializer = CardMembershipSerializer(memberships, many=True)
         return Response(serializer.data)
 
@@ -713,13 +779,14 @@ class CardMembershipDetailView(APIView):
 class CardWatchersView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @read_from_replica
     def get(self, request, card_id):
         """Get card watchers"""
         card = Card.objects.get(id=card_id)
         if card.list:
             check_board_view_permission(card.list.board, request.user)
         
-        watchers = card.watchers.all()
+        watchers = card.watchers.select_related('profile')
         return Response(UserShortSerializer(watchers, many=True).data)
     
     def post(self, request, card_id):
@@ -742,13 +809,14 @@ class CardWatchersView(APIView):
 class CardActivityView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @read_from_replica
     def get(self, request, card_id):
         """Get card activity history"""
         card = Card.objects.get(id=card_id)
         if card.list:
             check_board_view_permission(card.list.board, request.user)
         
-        activities = card.activities.all()[:50]  # Latest 50 activities
+        activities = card.activities.select_related('user__profile', 'target_user__profile')[:50]  # Latest 50 activities
         return Response(CardActivitySerializer(activities, many=True).data)
 
 class ActivityLogger:
@@ -887,12 +955,16 @@ class ReorderItemsView(APIView):
     PATCH: nhận danh sách item_id theo thứ tự mới → update position
     """
     permission_classes = [IsAuthenticated]
+    shard_model = Checklist  # pk trong URL (boards.sharding)
 
     def patch(self, request, pk):
         checklist = get_object_or_404(Checklist, pk=pk)
         item_ids = request.data.get("item_ids", [])
         for index, item_id in enumerate(item_ids):
             ChecklistItem.objects.filter(pk=item_id, checklist=checklist).update(position=index)
+        # update() không phát signal
+        bump_board_version_for_checklist(checklist.pk)
+        Checklist.objects.filter(pk=checklist.pk).update(updated_at=timezone.now())
         return Response({"detail": "Items reordered"}, status=status.HTTP_200_OK)
 
 
@@ -901,6 +973,7 @@ class ConvertItemToCardView(APIView):
     POST: chuyển 1 checklist item thành 1 Card
     """
     permission_classes = [IsAuthenticated]
+    shard_model = ChecklistItem  # pk trong URL (boards.sharding)
 
     def post(self, request, pk):
         item = get_object_or_404(ChecklistItem, pk=pk)
@@ -940,7 +1013,7 @@ MAX_UPLOAD_BYTES = 10 * 1024 * 1024  # 10MB
 class CardAttachmentsView(APIView):
     """Quản lý attachments của card"""
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    parser_classes = [MultiPartParser, FormParser, FastJSONParser]
 
     def _ensure_can_view_card(self, card, user):
         # Card thuộc board
@@ -960,6 +1033,7 @@ class CardAttachmentsView(APIView):
             # raise PermissionDenied cũng được; ở đây trả Response thống nhất ở caller
             raise PermissionError("Forbidden")
         
+    @read_from_replica
     def get(self, request, card_id):
         """Lấy danh sách attachments của card (kèm phân trang nhẹ)"""
         card = get_object_or_404(Card.objects.select_related("list__board", "created_by"), id=card_id)
@@ -969,7 +1043,7 @@ class CardAttachmentsView(APIView):
         except PermissionError:
             return Response({'detail': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
 
-        qs = card.attachments.select_related("uploaded_by").all()
+        qs = card.attachments.select_related("uploaded_by__profile").all()
 
         # Optional: phân trang đơn giản qua ?limit= & ?offset=
         try:
@@ -1055,7 +1129,7 @@ class CardAttachmentsView(APIView):
 class AttachmentDetailView(APIView):
     """Quản lý attachment cụ thể"""
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    parser_classes = [MultiPartParser, FormParser, FastJSONParser]
 
     def get(self, request, attachment_id):
         """
@@ -1105,10 +1179,11 @@ class AttachmentDetailView(APIView):
         is_cover_in = request.data.get('is_cover', None)
         will_set_cover = _to_bool(is_cover_in)
 
-        with transaction.atomic():
+        with transaction.atomic(using=router.db_for_write(Attachment)):
             # Nếu set cover = True: unset các cover khác cùng card
             if is_cover_in is not None and will_set_cover:
-                Attachment.objects.filter(card=attachment.card, is_cover=True).exclude(id=attachment.id).update(is_cover=False)
+                (Attachment.objects.filter(card=attachment.card, is_cover=True).exclude(id=attachment.id)
+                 .update(is_cover=False, updated_at=timezone.now()))
 
             serializer = AttachmentSerializer(attachment, data=request.data, partial=True, context={'request': request})
             serializer.is_valid(raise_exception=True)
@@ -0,0 +1,502 @@
+# config/channel_layers.py
+"""
+Channel layer không cần Redis.
+
+LocalChannelLayer: trong bộ nhớ process, an toàn khi gọi từ nhiều thread / event
+loop (consumer chạy trên loop của server, relay của boards.outbox chạy trên loop
+riêng). Dùng cho dev, test và deploy một process. Khác InMemoryChannelLayer của
+channels: message không bị deepcopy — một group_send dùng chung một dict cho mọi
+kết nối, consumer không được sửa message nhận được.
+
+UnixSocketChannelLayer: nhiều worker trên cùng một máy, nối với nhau qua một
+broker (manage.py channel_broker) bằng Unix socket. Broker chỉ biết worker nào có
+kết nối trong group nào nên mỗi worker nhận đúng một bản của mỗi message rồi tự
+fan-out cho các kết nối của nó.
+
+FanoutChannelLayer: cùng cách fan-out đó trên một layer dùng chung (Redis). Với
+RedisChannelLayer thường, group_send tới board có 1000 kết nối ghi 1000 bản vào
+Redis; qua FanoutChannelLayer mỗi worker chỉ có một channel trong group.
+
+Cả hai giữ ngữ nghĩa at-most-once của channels: channel đầy (capacity) hoặc broker
+mất kết nối thì message bị bỏ; client bù lại qua resume/change feed.
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import string
+import struct
+import threading
+import time
+from collections import defaultdict, deque
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+from django.utils.module_loading import import_string
+
+from config.renderers import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+
+def _random_name(length=12):
+    return ''.join(random.choice(string.ascii_letters) for _ in range(length))
+
+
+def _wake(waiter):
+    loop, future = waiter
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if loop is running:
+        if not future.done():
+            future.set_result(None)
+    else:
+        loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+
+class _Mailbox:
+    __slots__ = ('messages', 'waiter')
+
+    def __init__(self):
+        self.messages = deque()
+        self.waiter = None
+
+
+class LocalChannelLayer(BaseChannelLayer):
+    extensions = ['groups', 'flush']
+
+    def __init__(self, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, **kwargs)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.group_expiry = group_expiry
+        self._lock = threading.Lock()
+        self._mailboxes = {}
+        self._groups = defaultdict(dict)
+        self._next_sweep = time.monotonic() + expiry
+
+    # Channel
+
+    async def new_channel(self, prefix='specific.'):
+        return f'{prefix}.local!{_random_name()}'
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        self._deliver(channel, message)
+
+    def _deliver(self, channel, message, now=None):
+        now = now or time.monotonic()
+        with self._lock:
+            mailbox = self._mailboxes.get(channel)
+            if mailbox is None:
+                mailbox = self._mailboxes[channel] = _Mailbox()
+            if len(mailbox.messages) >= self.get_capacity(channel):
+                raise ChannelFull(channel)
+            mailbox.messages.append((now + self.expiry, message))
+            waiter, mailbox.waiter = mailbox.waiter, None
+        if waiter is not None:
+            _wake(waiter)
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        loop = asyncio.get_running_loop()
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                mailbox = self._mailboxes.get(channel)
+                if mailbox is None:
+                    mailbox = self._mailboxes[channel] = _Mailbox()
+                messages = mailbox.messages
+                while messages and messages[0][0] < now:
+                    messages.popleft()
+                if messages:
+                    return messages.popleft()[1]
+                waiter = mailbox.waiter = (loop, loop.create_future())
+            try:
+                await waiter[1]
+            finally:
+                with self._lock:
+                    if mailbox.waiter is waiter:
+                        mailbox.waiter = None
+
+    # Group
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        with self._lock:
+            self._groups[group][channel] = time.monotonic()
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        with self._lock:
+            members = self._groups.get(group)
+            if members is not None:
+                members.pop(channel, None)
+                if not members:
+                    del self._groups[group]
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_group_name(group)
+        self._deliver_group(group, message)
+
+    def _deliver_group(self, group, message):
+        now = time.monotonic()
+        if now > self._next_sweep:
+            self._sweep(now)
+        with self._lock:
+            channels = list(self._groups.get(group, ()))
+        for channel in channels:
+            try:
+                self._deliver(channel, message, now)
+            except ChannelFull:
+                pass
+
+    def _sweep(self, now):
+        """Bỏ mailbox không còn ai đọc (kết nối đã đóng) và thành viên group quá group_expiry"""
+        with self._lock:
+            self._next_sweep = now + self.expiry
+            for channel, mailbox in list(self._mailboxes.items()):
+                if mailbox.waiter is None and all(expires < now for expires, _ in mailbox.messages):
+                    del self._mailboxes[channel]
+            cutoff = now - self.group_expiry
+            for group, members in list(self._groups.items()):
+                for channel in [c for c, added in members.items() if added < cutoff]:
+                    del members[channel]
+                if not members:
+                    del self._groups[group]
+
+    # Flush
+
+    async def flush(self):
+        with self._lock:
+            self._mailboxes.clear()
+            self._groups.clear()
+
+    async def close(self):
+        pass
+
+
+# Giao thức giữa worker và broker: mỗi frame = độ dài 4 byte (big endian) + JSON.
+#   worker → broker: hello {worker}, sub/unsub {group}, group_send {group, message},
+#                    send {worker, channel, message}
+#   broker → worker: group {group, message}, send {channel, message}
+
+_HEADER = struct.Struct('!I')
+
+
+def encode_frame(frame):
+    body = dumps(frame)
+    return _HEADER.pack(len(body)) + body
+
+
+def _read_exactly(stream, size):
+    data = stream.read(size)
+    if len(data) < size:
+        raise ConnectionError("broker closed the connection")
+    return data
+
+
+class UnixSocketChannelLayer(LocalChannelLayer):
+    """
+    Message cho kết nối trong cùng worker được giao trực tiếp, chỉ message cho
+    worker khác mới đi qua broker. Tên channel chứa id worker để broker định tuyến send().
+    """
+
+    def __init__(self, path='/tmp/tasknest-channels.sock', reconnect_delay=1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self.worker_id = _random_name(10)
+        self._sock = None
+        self._pid = None
+        self._send_lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._reconnecting = False
+
+    async def new_channel(self, prefix='specific.'):
+        return f'{prefix}.{self.worker_id}!{_random_name()}'
+
+    def _worker_of(self, channel):
+        name = channel.partition('!')[0]
+        return name.rsplit('.', 1)[-1] if '!' in channel else None
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        worker = self._worker_of(channel)
+        if worker is None or worker == self.worker_id:
+            self._deliver(channel, message)
+        else:
+            self._publish({'op': 'send', 'worker': worker, 'channel': channel, 'message': message})
+
+    async def group_add(self, group, channel):
+        with self._lock:
+            first = group not in self._groups
+        await super().group_add(group, channel)
+        if first:
+            self._publish({'op': 'sub', 'group': group})
+
+    async def group_discard(self, group, channel):
+        await super().group_discard(group, channel)
+        with self._lock:
+            last = group not in self._groups
+        if last:
+            self._publish({'op': 'unsub', 'group': group})
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_group_name(group)
+        self._publish({'op': 'group_send', 'group': group, 'message': message})
+        self._deliver_group(group, message)
+
+    def _publish(self, frame):
+        data = encode_frame(frame)
+        try:
+            sock = self._connection()
+            # Unix socket cục bộ: sendall gần như không chặn với frame nhỏ
+            with self._send_lock:
+                sock.sendall(data)
+        except OSError as e:
+            logger.warning("Channel broker unavailable at %s: %s", self.path, e)
+            self._disconnect()
+            self._schedule_reconnect()
+
+    def _connection(self):
+        if self._sock is not None and self._pid == os.getpid():
+            return self._sock
+        with self._connect_lock:
+            if self._sock is None or self._pid != os.getpid():
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.path)
+                with self._lock:
+                    groups = list(self._groups)
+                sock.sendall(b''.join(
+                    [encode_frame({'op': 'hello', 'worker': self.worker_id})]
+                    + [encode_frame({'op': 'sub', 'group': group}) for group in groups]
+                ))
+                self._sock, self._pid = sock, os.getpid()
+                threading.Thread(target=self._read, args=(sock,), name='channel-broker-reader', daemon=True).start()
+        return self._sock
+
+    def _disconnect(self, sock=None):
+        with self._connect_lock:
+            if self._sock is not None and (sock is None or sock is self._sock):
+                try:
+                    self._sock.close()
+                except OSError:
+                    pass
+                self._sock = None
+
+    def _read(self, sock):
+        stream = sock.makefile('rb')
+        try:
+            while True:
+                (size,) = _HEADER.unpack(_read_exactly(stream, _HEADER.size))
+                frame = loads(_read_exactly(stream, size))
+                if frame['op'] == 'group':
+                    self._deliver_group(frame['group'], frame['message'])
+                elif frame['op'] == 'send':
+                    try:
+                        self._deliver(frame['channel'], frame['message'])
+                    except ChannelFull:
+                        pass
+        except (OSError, ConnectionError, ValueError) as e:
+            logger.warning("Lost connection to channel broker: %s", e)
+        self._disconnect(sock)
+        self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        # Kết nối lại (và đăng ký lại các group) để worker tiếp tục nhận message của worker khác
+        with self._connect_lock:
+            if self._reconnecting:
+                return
+            self._reconnecting = True
+        threading.Thread(target=self._reconnect, name='channel-broker-reconnect', daemon=True).start()
+
+    def _reconnect(self):
+        try:
+            while self._sock is None:
+                time.sleep(self.reconnect_delay)
+                try:
+                    self._connection()
+                except OSError:
+                    continue
+        finally:
+            self._reconnecting = False
+
+
+class FanoutChannelLayer(LocalChannelLayer):
+    """
+    Kết nối được giữ trong process (như LocalChannelLayer); với layer upstream,
+    worker tham gia mỗi group một lần bằng một channel riêng và một task đọc
+    channel đó rồi giao cho các kết nối trong process. Channel của kết nối có
+    dạng "<channel của worker>.<id>" để send() từ worker khác định tuyến được.
+
+    `upstream` là cấu hình layer như trong CHANNEL_LAYERS; channel của worker nhận
+    mọi message của worker nên cần capacity lớn (channel_capacity cho 'fanout.*').
+    """
+
+    def __init__(self, upstream, refresh_interval=3600, **kwargs):
+        super().__init__(**kwargs)
+        self.upstream = import_string(upstream['BACKEND'])(**upstream.get('CONFIG', {}))
+        self.refresh_interval = refresh_interval
+        self.worker_channel = None
+        self._starting = None
+
+    async def new_channel(self, prefix='specific.'):
+        worker_channel = await self._worker_channel()
+        return f'{worker_channel}.{_random_name()}'
+
+    def _is_local(self, channel):
+        return self.worker_channel is not None and channel.startswith(self.worker_channel + '.')
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        if self._is_local(channel) or '!' not in channel:
+            self._deliver(channel, message)
+        else:
+            worker_channel = channel.rsplit('.', 1)[0]
+            await self.upstream.send(worker_channel, {'type': 'fanout.send', 'channel': channel, 'message': message})
+
+    async def group_add(self, group, channel):
+        with self._lock:
+            first = group not in self._groups
+        await super().group_add(group, channel)
+        if first:
+            await self.upstream.group_add(group, await self._worker_channel())
+
+    async def group_discard(self, group, channel):
+        await super().group_discard(group, channel)
+        with self._lock:
+            last = group not in self._groups
+        if last and self.worker_channel is not None:
+            await self.upstream.group_discard(group, self.worker_channel)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_group_name(group)
+        # Kết nối trong process cũng nhận qua upstream để mọi worker thấy cùng thứ tự
+        await self.upstream.group_send(group, {'type': 'fanout.group', 'group': group, 'message': message})
+
+    async def _worker_channel(self):
+        if self.worker_channel is None:
+            if self._starting is None:
+                self._starting = asyncio.ensure_future(self._start())
+            await asyncio.shield(self._starting)
+        return self.worker_channel
+
+    async def _start(self):
+        channel = await self.upstream.new_channel('fanout.')
+        self.worker_channel = channel
+        asyncio.ensure_future(self._listen(channel))
+        asyncio.ensure_future(self._refresh(channel))
+
+    async def _listen(self, channel):
+        while True:
+            try:
+                message = await self.upstream.receive(channel)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Fan-out listener failed to receive from %s", channel)
+                await asyncio.sleep(1)
+                continue
+            if message['type'] == 'fanout.group':
+                self._deliver_group(message['group'], message['message'])
+            elif message['type'] == 'fanout.send':
+                try:
+                    self._deliver(message['channel'], message['message'])
+                except ChannelFull:
+                    pass
+
+    async def _refresh(self, channel):
+        # Thành viên group ở upstream hết hạn sau group_expiry: tham gia lại định kỳ
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            with self._lock:
+                groups = list(self._groups)
+            for group in groups:
+                try:
+                    await self.upstream.group_add(group, channel)
+                except Exception as e:
+                    logger.warning("Failed to refresh fan-out group %s: %s", group, e)
+
+    async def flush(self):
+        await super().flush()
+        await self.upstream.flush()
+
+    async def close(self):
+        await self.upstream.close()
+
+
+class ChannelBroker:
+    """
+    Chuyển message giữa các worker dùng UnixSocketChannelLayer. Worker nhận chậm
+    (buffer ghi vượt max_buffer byte) bị bỏ message thay vì làm broker phình bộ nhớ.
+    """
+
+    def __init__(self, path, max_buffer=8 * 1024 * 1024):
+        self.path = path
+        self.max_buffer = max_buffer
+        self.workers = {}
+        self.groups = defaultdict(set)
+
+    async def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self._handle, self.path)
+        async with server:
+            await server.serve_forever()
+
+    def _write(self, worker, data):
+        writer = self.workers.get(worker)
+        if writer is not None and writer.transport.get_write_buffer_size() < self.max_buffer:
+            writer.write(data)
+
+    async def _handle(self, reader, writer):
+        worker = None
+        try:
+            while True:
+                (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+                frame = loads(await reader.readexactly(size))
+                op = frame['op']
+                if op == 'group_send':
+                    targets = self.groups.get(frame['group'])
+                    if targets:
+                        data = encode_frame({'op': 'group', 'group': frame['group'], 'message': frame['message']})
+                        for target in targets:
+                            if target != worker:
+                                self._write(target, data)
+                elif op == 'send':
+                    self._write(frame['worker'], encode_frame(
+                        {'op': 'send', 'channel': frame['channel'], 'message': frame['message']}
+                    ))
+                elif op == 'sub':
+                    self.groups[frame['group']].add(worker)
+                elif op == 'unsub':
+                    self._unsubscribe(frame['group'], worker)
+                elif op == 'hello':
+                    worker = frame['worker']
+                    self.workers[worker] = writer
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            if worker is not None and self.workers.get(worker) is writer:
+                del self.workers[worker]
+                for group in [g for g, members in self.groups.items() if worker in members]:
+                    self._unsubscribe(group, worker)
+            writer.close()
+
+    def _unsubscribe(self, group, worker):
+        members = self.groups.get(group)
+        if members is not None:
+            members.discard(worker)
+            if not members:
+                del self.groups[group]
@@ -0,0 +1,150 @@
+# config/db_router.py
+"""
+Đọc từ read replica (DATABASE_REPLICA_URLS).
+
+Chỉ view được đánh dấu read_from_replica (boards.decorators) mới đọc từ replica, và
+trong suốt view đó — kể cả kiểm tra quyền bên trong — mọi truy vấn đọc dùng cùng
+một alias. Ghi luôn vào primary. Client vừa ghi được pin vào primary trong
+REPLICA_PIN_SECONDS giây (cookie, config.middleware.ReplicaPinMiddleware) để đọc
+lại được chính dữ liệu mình vừa ghi.
+
+Sharding theo workspace (DATABASE_SHARD_URLS, boards.sharding): các bảng của app boards
+(trừ Workspace và IdSequence) được đọc/ghi ở shard đặt bởi use_shard() cho request
+hiện tại (config.middleware.ShardMiddleware), hoặc ở database object được đọc ra.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA_PIN_COOKIE = 'db_pin'
+
+# ContextVar được asgiref sao chép sang thread của sync_to_async nên cũng đúng khi chạy ASGI
+_read_alias = ContextVar('read_alias', default=None)
+_shard = ContextVar('shard', default=None)
+
+SHARDED_APP = 'boards'
+# Directory/bộ cấp id, luôn ở default
+UNSHARDED_MODELS = {'workspace', 'idsequence'}
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def primary_alias(alias):
+    """Replica là bản sao của default"""
+    return 'default' if alias in replica_aliases() else alias
+
+
+def pick_replica(request):
+    """Alias replica cho request, hoặc None nếu không có replica hay client đang bị pin vào primary"""
+    replicas = replica_aliases()
+    if not replicas or request.COOKIES.get(REPLICA_PIN_COOKIE):
+        return None
+    return random.choice(replicas)
+
+
+def shard_aliases():
+    """default là shard đầu tiên"""
+    return ['default', *getattr(settings, 'DATABASE_SHARDS', [])]
+
+
+def is_sharded(model):
+    # Gồm cả bảng trung gian tự sinh của ManyToMany (Card.labels...)
+    return model._meta.app_label == SHARDED_APP and model._meta.model_name not in UNSHARDED_MODELS
+
+
+def is_reference(model):
+    """User/profile/workspace: được chép sang mọi shard (boards.sharding.copy_reference_rows)"""
+    # concrete_model: gồm cả proxy (auth_app.ClaimsUser của request.user)
+    label = model._meta.concrete_model._meta.label_lower
+    return label in {settings.AUTH_USER_MODEL.lower(), 'auth_app.profile', 'boards.workspace'}
+
+
+def current_shard():
+    return _shard.get() or 'default'
+
+
+@contextmanager
+def use_shard(alias):
+    token = _shard.set(alias)
+    try:
+        yield
+    finally:
+        _shard.reset(token)
+
+
+def fan_out(query):
+    """Gọi query() ở từng shard, trả về danh sách kết quả theo thứ tự shard_aliases()"""
+    results = []
+    for alias in shard_aliases():
+        with use_shard(alias):
+            results.append(query())
+    return results
+
+
+def set_shard(alias):
+    """Đổi shard cho phần còn lại của use_shard() đang bao ngoài (ShardMiddleware)"""
+    _shard.set(alias)
+
+
+@contextmanager
+def read_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ShardRouter:
+    def _shard_for(self, model, hints):
+        if not is_sharded(model):
+            return None
+        alias = _shard.get()
+        if alias is None:
+            # Ngoài request (relay, command...): object liên quan nằm cùng shard với object đã đọc ra
+            instance = hints.get('instance')
+            db = instance._state.db if instance is not None else None
+            alias = db if db in shard_aliases() else None
+        return alias
+
+    def db_for_read(self, model, **hints):
+        alias = self._shard_for(model, hints)
+        # Shard default vẫn đọc được từ replica (ReplicaRouter)
+        return None if alias == 'default' else alias
+
+    def db_for_write(self, model, **hints):
+        return self._shard_for(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Bảng tham chiếu có bản chép ở mọi shard nên liên kết được với object của bất kỳ shard nào;
+        # hai object của bảng shard ở hai shard khác nhau thì không (để mặc định của Django từ chối)
+        dbs = {primary_alias(obj1._state.db), primary_alias(obj2._state.db)}
+        if len(dbs) > 1 and dbs <= set(shard_aliases()) and (is_reference(obj1) or is_reference(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Mỗi shard có đủ schema: user/profile/workspace được chép sang để khoá ngoại và join vẫn đúng.
+        # Theo tên alias (shard_N) để shard_1 của test cũng được migrate khi sharding chưa bật
+        return True if db.startswith('shard_') else None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica là bản sao của primary: object đọc từ default hay replica liên kết được với nhau
+        if primary_alias(obj1._state.db) == primary_alias(obj2._state.db) == 'default':
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
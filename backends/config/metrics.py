@@ -0,0 +1,211 @@
+# config/metrics.py
+"""
+Metrics dạng Prometheus, xuất ở /metrics: request HTTP theo route (số request, độ trễ, số truy
+vấn và thời gian DB, thời gian render, kích thước response), WebSocket (kết nối đang mở mỗi
+worker, kích thước frame gửi đi, độ sâu hàng đợi gửi của BoardConsumer), channel layer
+(group_send), hàng đợi outbox và tỉ lệ hit của cache response board.
+
+Dùng prometheus_client khi có cài. Chạy nhiều worker (gunicorn/uvicorn --workers) thì đặt
+PROMETHEUS_MULTIPROC_DIR trỏ tới một thư mục trống, chung cho mọi worker, trước khi khởi
+động server: mỗi worker ghi số liệu ra file và /metrics gộp lại (MultiProcessCollector).
+Không có prometheus_client thì metrics được giữ trong process (/metrics chỉ thấy worker
+đang trả lời request).
+"""
+import os
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # prometheus_client là tùy chọn
+    prometheus_client = None
+
+PREFIX = 'tasknest_'
+
+# Cận trên của bucket (giống bucket mặc định của Prometheus)
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+DEPTH_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+# ===== Metrics trong process (khi không có prometheus_client) =====
+
+class _Child:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.value = 0.0
+        self.counts = [0] * (len(buckets) + 1)  # phần tử cuối: > bucket lớn nhất
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.value += value
+
+
+class _Metric:
+    """Counter/Gauge/Histogram tối thiểu, cùng API với prometheus_client (labels(), inc(), observe()...)"""
+
+    def __init__(self, kind, name, documentation, labelnames=(), buckets=(), **kwargs):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        key = tuple(str(v) for v in values) or tuple(str(kwargs[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, _Child(self.buckets))
+        return child
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def expose(self):
+        name = self.name + '_total' if self.kind == 'counter' else self.name
+        lines = [f'# HELP {name} {self.documentation}', f'# TYPE {name} {self.kind}']
+        for key, child in sorted(self._children.items()):
+            labels = [f'{n}="{v}"' for n, v in zip(self.labelnames, key)]
+            if self.kind != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {child.value}')
+                continue
+            total = 0
+            for bound, count in zip((*self.buckets, float('inf')), child.counts):
+                total += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{float(bound)!r}"'
+                lines.append(f'{name}_bucket{_labels([*labels, le])} {total}')
+            lines.append(f'{name}_count{_labels(labels)} {total}')
+            lines.append(f'{name}_sum{_labels(labels)} {child.value}')
+        return lines
+
+
+def _labels(pairs):
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+_fallback_metrics = []
+
+
+def _metric(kind, name, documentation, labelnames=(), **kwargs):
+    if prometheus_client is not None:
+        cls = {'counter': prometheus_client.Counter, 'gauge': prometheus_client.Gauge,
+               'histogram': prometheus_client.Histogram}[kind]
+        if kind != 'gauge':
+            kwargs.pop('multiprocess_mode', None)
+        return cls(PREFIX + name, documentation, labelnames, **kwargs)
+    metric = _Metric(kind, PREFIX + name, documentation, labelnames, **kwargs)
+    _fallback_metrics.append(metric)
+    return metric
+
+
+# ===== Định nghĩa metrics =====
+
+HTTP_LABELS = ('route', 'method')
+
+http_requests = _metric('counter', 'http_requests', "HTTP requests", (*HTTP_LABELS, 'status'))
+http_request_duration = _metric('histogram', 'http_request_duration_seconds', "HTTP request latency",
+                                HTTP_LABELS, buckets=SECONDS_BUCKETS)
+# Chỉ request được lấy mẫu (PERF_SAMPLE_RATE, config.middleware.PerformanceMiddleware)
+http_db_queries = _metric('histogram', 'http_request_db_queries', "SQL queries per sampled request",
+                          HTTP_LABELS, buckets=QUERY_BUCKETS)
+http_db_duration = _metric('histogram', 'http_request_db_seconds', "Database time per sampled request",
+                           HTTP_LABELS, buckets=SECONDS_BUCKETS)
+http_render_duration = _metric('histogram', 'http_response_render_seconds',
+                               "Renderer time per sampled request (excludes serializer work in the view)",
+                               HTTP_LABELS, buckets=SECONDS_BUCKETS)
+http_response_size = _metric('histogram', 'http_response_bytes', "Response size per sampled request",
+                             HTTP_LABELS, buckets=BYTES_BUCKETS)
+
+# liveall: một series cho mỗi worker (nhãn pid) còn sống
+websocket_connections = _metric('gauge', 'websocket_connections', "Open board websocket connections",
+                                multiprocess_mode='liveall')
+websocket_frame_size = _metric('histogram', 'websocket_frame_bytes', "Size of frames sent to board websockets",
+                               buckets=BYTES_BUCKETS)
+websocket_queue_depth = _metric('histogram', 'websocket_send_queue_depth',
+                                "Events waiting in a BoardConsumer send queue when it is flushed",
+                                buckets=DEPTH_BUCKETS)
+websocket_queue_overflows = _metric('counter', 'websocket_send_queue_overflows',
+                                    "BoardConsumer send queues dropped for exceeding REALTIME_SEND_QUEUE_LIMIT")
+channel_group_sends = _metric('counter', 'channel_layer_group_sends', "Channel layer group_send calls",
+                              ('type',))
+outbox_queue_depth = _metric('gauge', 'outbox_queue_depth', "Items waiting in the realtime outbox relay",
+                             multiprocess_mode='liveall')
+board_cache_lookups = _metric('counter', 'board_cache_lookups', "Board response cache lookups",
+                              ('endpoint', 'result'))
+
+
+def record_request(route, method, status, duration, queries=None, db_seconds=None, render_seconds=None,
+                   response_bytes=None):
+    http_requests.labels(route, method, status).inc()
+    http_request_duration.labels(route, method).observe(duration)
+    if queries is not None:
+        http_db_queries.labels(route, method).observe(queries)
+        http_db_duration.labels(route, method).observe(db_seconds)
+        http_render_duration.labels(route, method).observe(render_seconds)
+    if response_bytes is not None:
+        http_response_size.labels(route, method).observe(response_bytes)
+
+
+# ===== /metrics =====
+
+def _expose():
+    if prometheus_client is None:
+        lines = [line for metric in _fallback_metrics for line in metric.expose()]
+        return '\n'.join(lines).encode() + b'\n', 'text/plain; version=0.0.4; charset=utf-8'
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def metrics_view(request):
+    """Endpoint cho Prometheus; yêu cầu header Authorization: Bearer <METRICS_TOKEN>
+
+    Chưa đặt METRICS_TOKEN thì chỉ mở khi DEBUG (metrics lộ lưu lượng từng endpoint và số liệu DB).
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponseForbidden()
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    body, content_type = _expose()
+    return HttpResponse(body, content_type=content_type)
+
+
+def mark_process_dead(pid):
+    """Gọi từ hook child_exit của gunicorn để bỏ series liveall của worker đã thoát"""
+    if prometheus_client is not None and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
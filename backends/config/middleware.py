@@ -0,0 +1,245 @@
+# config/middleware.py
+import gzip
+import random
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from boards.sharding import WorkspaceMoving, resolve_view_shard, sharding_enabled
+
+from .db_router import REPLICA_PIN_COOKIE, replica_aliases, set_shard, use_shard
+from .metrics import record_request
+from .perf import QueryTimer, route_name, server_timing
+
+try:
+    import brotli
+except ImportError:  # brotli là tùy chọn
+    brotli = None
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:  # zstd là tùy chọn
+        zstd = None
+
+_ACCEPT_ENCODING_SPLIT = re.compile(r'\s*,\s*')
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+
+def _zstd(data):
+    return zstd.compress(data, level=settings.COMPRESSION_ZSTD_LEVEL)
+
+
+def available_encodings():
+    """Các encoding server hỗ trợ, theo thứ tự ưu tiên khi client chấp nhận nhiều loại"""
+    encodings = []
+    if brotli is not None:
+        encodings.append(('br', _brotli))
+    if zstd is not None:
+        encodings.append(('zstd', _zstd))
+    encodings.append(('gzip', _gzip))
+    return encodings
+
+
+def _accepted_encodings(header):
+    """'gzip, br;q=0.5, zstd;q=0' → {'gzip': 1.0, 'br': 0.5, 'zstd': 0.0}"""
+    accepted = {}
+    for item in _ACCEPT_ENCODING_SPLIT.split(header.lower()):
+        name, _, params = item.partition(';')
+        name = name.strip()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Nén response (board snapshot, danh sách card, activity...) khi:
+    - body không streaming và >= COMPRESSION_MIN_SIZE byte,
+    - Content-Type nằm trong COMPRESSION_CONTENT_TYPES,
+    - response chưa có Content-Encoding và không phải file tải về (attachment).
+
+    Chọn encoding có q cao nhất trong Accept-Encoding của client; bằng q thì br > zstd > gzip
+    (tùy thư viện có cài). Không có header hoặc chỉ chấp nhận identity thì không nén.
+    Nên đặt gần đầu MIDDLEWARE để nén sau khi các middleware khác đã xử lý xong body.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encodings = available_encodings()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def _is_compressible(self, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return False
+        if response.status_code in (206, 304):
+            return False
+        if response.get('Content-Disposition', '').lower().startswith('attachment'):
+            return False
+        content_type = response.get('Content-Type', '').split(';', 1)[0].strip().lower()
+        return content_type in settings.COMPRESSION_CONTENT_TYPES
+
+    def _negotiate(self, header):
+        """Encoding có q cao nhất mà client chấp nhận (q=0 là từ chối); bằng q thì theo thứ tự của server"""
+        accepted = _accepted_encodings(header)
+        best_q, best = 0, (None, None)
+        for name, compress in self.encodings:
+            q = accepted.get(name, accepted.get('*', 0))
+            if q > best_q:
+                best_q, best = q, (name, compress)
+        return best
+
+    def process_response(self, request, response):
+        if not self._is_compressible(response):
+            return response
+
+        # Response này có thể khác nhau theo Accept-Encoding kể cả khi không nén
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        name, compress = self._negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if compress is None:
+            return response
+
+        compressed = compress(response.content)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = name
+        # Body đã khác byte-by-byte nên ETag mạnh (nếu có) phải thành ETag yếu
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Read-your-writes khi đọc từ replica (config.db_router): sau request ghi thành công,
+    client nhận cookie pin và đọc từ primary trong REPLICA_PIN_SECONDS giây — đủ để
+    replica bắt kịp. Không cấu hình replica thì không làm gì.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400
+                and replica_aliases()):
+            # Frontend khác site (CORS_ALLOWED_ORIGINS + credentials) chỉ gửi lại cookie khi SameSite=None,
+            # mà SameSite=None bắt buộc Secure → qua HTTP thường chỉ pin được khi frontend cùng site
+            secure = request.is_secure()
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='None' if secure else 'Lax', secure=secure,
+            )
+        return response
+
+
+class ShardMiddleware:
+    """
+    Định tuyến request tới shard chứa workspace của object trong URL (boards.sharding).
+    Workspace đang được chuyển shard thì request ghi nhận 503 (Retry-After).
+    Không cấu hình shard thì không làm gì.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # use_shard() trong process_view chỉ có hiệu lực tới hết request này
+        with use_shard(None):
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not sharding_enabled():
+            return None
+        resolved = resolve_view_shard(getattr(view_func, 'view_class', None), view_kwargs)
+        if resolved is None:
+            return None
+        alias, moving = resolved
+        if moving and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response = JsonResponse({'detail': WorkspaceMoving.default_detail}, status=503)
+            response['Retry-After'] = str(settings.SHARD_DIRECTORY_TTL)
+            return response
+        set_shard(alias)
+        return None
+
+
+class PerformanceMiddleware:
+    """
+    Ghi số request và độ trễ theo route của mọi request (config.metrics). Request được lấy mẫu
+    (PERF_SAMPLE_RATE) được đo thêm số truy vấn và thời gian DB trên mọi database
+    (connection.execute_wrapper), thời gian render response và kích thước response;
+    PERF_SERVER_TIMING bật thì trả thêm header Server-Timing.
+    Đặt đầu MIDDLEWARE để tổng thời gian gồm cả các middleware khác (nén, định tuyến shard...).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.PERF_SAMPLE_RATE
+        start = time.perf_counter()
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            response = self.get_response(request)
+            record_request(route_name(request), request.method, response.status_code, time.perf_counter() - start)
+            return response
+
+        timer = QueryTimer()
+        request._perf_render_seconds = 0.0
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        render = request._perf_render_seconds
+        record_request(
+            route_name(request), request.method, response.status_code, total,
+            queries=timer.queries, db_seconds=timer.seconds, render_seconds=render,
+            response_bytes=None if response.streaming else len(response.content),
+        )
+        if settings.PERF_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(total, timer.seconds, timer.queries, render)
+        return response
+
+    def process_template_response(self, request, response):
+        # Response của DRF được renderer chuyển thành bytes ngay sau bước này; serializer (.data)
+        # đã chạy trong view nên không nằm trong số đo render
+        if hasattr(request, '_perf_render_seconds'):
+            started = time.perf_counter()
+
+            def rendered(response):
+                request._perf_render_seconds += time.perf_counter() - started
+            response.add_post_render_callback(rendered)
+        return response
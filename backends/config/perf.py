@@ -0,0 +1,48 @@
+# config/perf.py
+"""
+Số đo hiệu năng theo request (config.middleware.PerformanceMiddleware): số truy vấn SQL,
+thời gian DB, thời gian render response, kích thước response và tổng thời gian, gộp thành
+histogram theo (route, method) ở config.metrics (/metrics).
+
+"render" chỉ gồm bước renderer (bytes JSON từ response.data). Serializer DRF (.data) chạy
+trong view nên thời gian của nó nằm trong "app" cùng với code của view.
+
+Chỉ request được lấy mẫu (PERF_SAMPLE_RATE) mới được đo; khi PERF_SERVER_TIMING bật
+(mặc định theo DEBUG) số đo được trả về trong header Server-Timing.
+"""
+import time
+
+
+def route_name(request):
+    """Nhãn của request trong metrics: tên route trong urls.py, không có tên thì dùng pattern"""
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.route
+
+
+class QueryTimer:
+    """execute_wrapper (connection.execute_wrapper) đếm số truy vấn và cộng dồn thời gian DB"""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+def server_timing(total, db, queries, render):
+    """Giá trị header Server-Timing (thời gian tính bằng ms); app = view + serializer, ngoài DB"""
+    app = max(0.0, total - db - render)
+    return ', '.join([
+        f'db;dur={db * 1000:.1f};desc="{queries} queries"',
+        f'render;dur={render * 1000:.1f};desc="renderer"',
+        f'app;dur={app * 1000:.1f};desc="view + serializer"',
+        f'total;dur={total * 1000:.1f}',
+    ])
@@ -0,0 +1,119 @@
+# config/renderers.py
+"""
+JSON renderer/parser cho DRF và BoardConsumer dùng orjson khi có cài,
+fallback về json của stdlib. Output phải giống hệt rest_framework.renderers.JSONRenderer
+(kiểm tra trong config/tests.py, đo bằng `python manage.py bench_json`).
+"""
+import json
+import math
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson là tùy chọn
+    orjson = None
+
+# datetime/date/time/Decimal/... đi qua encoder của DRF để giữ nguyên định dạng
+# (vd. datetime UTC kết thúc bằng 'Z', Decimal thành float)
+_drf_default = JSONEncoder().default
+
+
+def _default(obj):
+    ret = _drf_default(obj)
+    if isinstance(ret, float) and not math.isfinite(ret):
+        # vd. Decimal('NaN'): orjson sẽ ghi null, JSONRenderer (strict) thì raise
+        raise ValueError('Out of range float values are not JSON compliant')
+    return ret
+
+
+_SCALARS = {str, int, bool, type(None)}
+
+
+def _has_non_finite(data):
+    """Có float NaN/Infinity ở đâu đó trong data không (orjson ghi chúng thành null)"""
+    # Xét kiểu của cả container một lần (map/set chạy trong C) thay vì từng giá trị
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        values = obj.values() if isinstance(obj, dict) else obj
+        for t in set(map(type, values)) - _SCALARS:
+            if issubclass(t, float):
+                if not all(math.isfinite(v) for v in values if isinstance(v, float)):
+                    return True
+            elif issubclass(t, (dict, list, tuple)):
+                stack.extend([v for v in values if type(v) is t])
+    return False
+
+
+def _escape_line_separators(data):
+    # Giống JSONRenderer: U+2028/U+2029 hợp lệ trong JSON nhưng không hợp lệ trong JavaScript
+    return data.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def _stdlib_dumps(data):
+    ret = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    return _escape_line_separators(ret.encode())
+
+
+def dumps(data):
+    """Serialize `data` thành bytes JSON compact, UTF-8, giống JSONRenderer mặc định"""
+    if orjson is not None:
+        try:
+            ret = orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except (orjson.JSONEncodeError, TypeError):
+            # vd. int > 64 bit, key không phải str, NaN: để stdlib xử lý (hoặc raise) như trước
+            pass
+        else:
+            # orjson ghi NaN/Infinity thành null: output có null thì kiểm tra lại, có NaN thì để stdlib raise như JSONRenderer
+            if b'null' not in ret or not _has_non_finite(data):
+                return _escape_line_separators(ret)
+    return _stdlib_dumps(data)
+
+
+def loads(data):
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # Thử lại bằng stdlib để giữ nguyên cách xử lý lỗi/trường hợp biên như trước
+            pass
+    if isinstance(data, bytes):
+        data = data.decode()
+    return json.loads(data, parse_constant=_reject_constant)
+
+
+def _reject_constant(value):
+    raise ValueError(f'Out of range float values are not JSON compliant: {value!r}')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer dùng `dumps` ở trên cho trường hợp thông thường (compact, không indent)"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if indent is not None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            return loads(data)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -1,15 +1,17 @@
 # config/socket/asgi.py
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-from config.socket.routing import websocket_urlpatterns
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter
+from auth_app.websocket import JWTAuthMiddleware
+from config.socket.routing import websocket_urlpatterns
 
 application = ProtocolTypeRouter({
-    'http': get_asgi_application(),
-    'websocket': AuthMiddlewareStack(
+    'http': django_asgi_app,
+    'websocket': JWTAuthMiddleware(
         URLRouter(websocket_urlpatterns)
     ),
-})
\ No newline at end of file
+})
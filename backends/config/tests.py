@@ -0,0 +1,487 @@
+import asyncio
+import datetime
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from decimal import Decimal
+from unittest import mock
+
+from channels.exceptions import ChannelFull
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from boards.models import Board, Card, Workspace
+from config import renderers
+from config.channel_layers import ChannelBroker, FanoutChannelLayer, LocalChannelLayer, UnixSocketChannelLayer
+from config.db_router import REPLICA_PIN_COOKIE, ReplicaRouter, ShardRouter, pick_replica
+from config.metrics import metrics_view
+from config.middleware import CompressionMiddleware, ReplicaPinMiddleware
+from config.renderers import FastJSONParser, FastJSONRenderer
+
+UTC = datetime.timezone.utc
+ICT = datetime.timezone(datetime.timedelta(hours=7))
+
+# Các giá trị từng gây khác biệt giữa encoder: datetime (UTC → 'Z', có micro giây,
+# naive, múi giờ khác), UUID (token invite), Decimal, unicode, U+2028/U+2029, int lớn
+CONFORMANCE_CASES = {
+    'datetime_utc': {'created_at': datetime.datetime(2025, 1, 2, 3, 4, 5, tzinfo=UTC)},
+    'datetime_micro': {'created_at': datetime.datetime(2025, 1, 2, 3, 4, 5, 123456, tzinfo=UTC)},
+    'datetime_ict': {'due_date': datetime.datetime(2025, 6, 1, 23, 59, tzinfo=ICT)},
+    'datetime_naive': {'due_date': datetime.datetime(2025, 6, 1, 8, 0)},
+    'date_time': {'date': datetime.date(2025, 2, 28), 'time': datetime.time(9, 30, 15, 500)},
+    'timedelta': {'duration': datetime.timedelta(hours=1, seconds=3)},
+    'uuid': {'token': uuid.UUID('12345678-1234-5678-1234-567812345678')},
+    'decimal': {'amount': Decimal('12.50'), 'zero': Decimal('0'), 'neg': Decimal('-0.001')},
+    'unicode': {'name': 'Bảng công việc ✓ 日本語 😀', 'quote': 'a"b\\c\n\t'},
+    'line_separators': {'description': 'dòng 1\u2028dòng 2\u2029hết'},
+    'numbers': {'int': 2 ** 63 - 1, 'big': 2 ** 70, 'neg': -1, 'float': 0.1, 'exp': 1e-20, 'bool': True, 'none': None},
+    'nested': ReturnDict({'cards': ReturnList([{'id': 1, 'labels': [], 'members': [{'id': 2}]}], serializer=None)},
+                         serializer=None),
+    'containers': {'tuple': (1, 2), 'list': [], 'dict': {}},
+    'empty_list': [],
+    'string': 'chỉ một chuỗi',
+}
+
+# JSONRenderer (strict) raise ValueError với NaN/Infinity, kể cả khi nằm sâu trong payload
+NON_FINITE_CASES = {
+    'nan': {'score': float('nan')},
+    'inf_nested': {'cards': [{'id': 1, 'weight': (1.0, float('inf'))}], 'due_date': None},
+    'neg_inf': ReturnList([{'x': None, 'y': -float('inf')}], serializer=None),
+    'decimal_nan': {'amount': Decimal('NaN'), 'none': None},
+}
+
+
+class JSONConformanceTests(SimpleTestCase):
+    """config.renderers phải cho output giống hệt JSONRenderer/JSONParser của DRF"""
+
+    def test_render_matches_drf(self):
+        reference, fast = JSONRenderer(), FastJSONRenderer()
+        for name, data in CONFORMANCE_CASES.items():
+            with self.subTest(name):
+                expected = reference.render(data)
+                self.assertEqual(fast.render(data), expected)
+                self.assertEqual(renderers._stdlib_dumps(data), expected)
+
+    def test_parse_matches_drf(self):
+        for name, data in CONFORMANCE_CASES.items():
+            with self.subTest(name):
+                body = JSONRenderer().render(data)
+                self.assertEqual(FastJSONParser().parse(io.BytesIO(body)),
+                                 JSONParser().parse(io.BytesIO(body)))
+
+    def test_non_finite_floats_raise(self):
+        for name, data in NON_FINITE_CASES.items():
+            with self.subTest(name):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render(data)
+                with self.assertRaises(ValueError):
+                    FastJSONRenderer().render(data)
+
+    def test_non_finite_literals_rejected(self):
+        for body in (b'{"a": NaN}', b'[Infinity]', b'-Infinity'):
+            with self.subTest(body):
+                with self.assertRaises(ParseError):
+                    JSONParser().parse(io.BytesIO(body))
+                with self.assertRaises(ParseError):
+                    FastJSONParser().parse(io.BytesIO(body))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'], DATABASE_SHARDS=['shard_1', 'shard_2'])
+class AllowRelationTests(SimpleTestCase):
+    def allowed(self, obj1, db1, obj2, db2):
+        obj1._state.db, obj2._state.db = db1, db2
+        for router in (ShardRouter(), ReplicaRouter()):
+            allow = router.allow_relation(obj1, obj2)
+            if allow is not None:
+                return allow
+        # Mặc định của Django khi mọi router trả về None
+        return db1 == db2
+
+    def test_primary_and_replica(self):
+        self.assertTrue(self.allowed(Card(), 'replica_0', Board(), 'default'))
+
+    def test_sharded_objects_on_different_shards(self):
+        self.assertFalse(self.allowed(Card(), 'shard_1', Board(), 'shard_2'))
+        self.assertFalse(self.allowed(Card(), 'replica_0', Board(), 'shard_1'))
+        self.assertTrue(self.allowed(Card(), 'shard_1', Board(), 'shard_1'))
+
+    def test_reference_rows_exist_on_every_shard(self):
+        self.assertTrue(self.allowed(Board(), 'shard_1', get_user_model()(), 'default'))
+        self.assertTrue(self.allowed(Board(), 'shard_2', Workspace(), 'replica_0'))
+
+
+class MetricsAccessTests(SimpleTestCase):
+    """/metrics đóng mặc định: chưa đặt METRICS_TOKEN thì chỉ mở khi DEBUG"""
+
+    def get(self, **headers):
+        return metrics_view(RequestFactory().get('/metrics', headers=headers)).status_code
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_no_token_in_production_is_forbidden(self):
+        self.assertEqual(self.get(), 403)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=True)
+    def test_no_token_in_debug_is_open(self):
+        self.assertEqual(self.get(), 200)
+
+    @override_settings(METRICS_TOKEN='s3cret', DEBUG=False)
+    def test_token_required(self):
+        self.assertEqual(self.get(), 403)
+        self.assertEqual(self.get(Authorization='Bearer wrong'), 403)
+        self.assertEqual(self.get(Authorization='Bearer s3cret'), 200)
+
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = b'{"cards": [' + b', '.join(b'{"id": %d, "name": "Card"}' % i for i in range(50)) + b']}'
+
+    def respond(self, accept_encoding=None, response=None, encodings=None):
+        if response is None:
+            response = HttpResponse(self.body, content_type='application/json')
+            response['ETag'] = '"board-1-v1"'
+        middleware = CompressionMiddleware(lambda request: response)
+        if encodings is not None:
+            middleware.encodings = encodings
+        headers = {} if accept_encoding is None else {'Accept-Encoding': accept_encoding}
+        return middleware(RequestFactory().get('/api/boards/1/', headers=headers))
+
+    def test_gzip(self):
+        response = self.respond('gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_strong_etag_becomes_weak(self):
+        self.assertEqual(self.respond('gzip')['ETag'], 'W/"board-1-v1"')
+
+    def test_not_compressed(self):
+        for accept_encoding in (None, 'identity', 'gzip;q=0', 'gzip;q=0, *', '*;q=0'):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.respond(accept_encoding)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response.content, self.body)
+                self.assertEqual(response['ETag'], '"board-1-v1"')
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_small_response_passes_through(self):
+        response = self.respond('gzip', HttpResponse(b'{}', content_type='application/json'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'{}')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_streaming_response_passes_through(self):
+        response = self.respond('gzip', StreamingHttpResponse(iter([self.body]), content_type='application/json'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+
+    def test_highest_q_wins_then_server_order(self):
+        encodings = [('br', lambda data: b'br'), ('gzip', lambda data: b'gzip')]
+        cases = {
+            'gzip, br': 'br',
+            'br;q=0.5, gzip': 'gzip',
+            'br;q=0, gzip;q=0.1': 'gzip',
+            '*;q=0.5, gzip;q=0.8': 'gzip',
+            '*': 'br',
+        }
+        for accept_encoding, expected in cases.items():
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertEqual(self.respond(accept_encoding, encodings=encodings)['Content-Encoding'], expected)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class ReplicaPinTests(SimpleTestCase):
+    """Sau request ghi, request đọc mang cookie pin đọc từ primary"""
+
+    def post(self, secure):
+        middleware = ReplicaPinMiddleware(lambda request: HttpResponse(status=201))
+        return middleware(RequestFactory().post('/api/cards/', secure=secure))
+
+    def test_write_then_read_uses_primary(self):
+        cookie = self.post(secure=True).cookies[REPLICA_PIN_COOKIE]
+        self.assertEqual(pick_replica(RequestFactory().get('/api/cards/')), 'replica_0')
+        request = RequestFactory().get('/api/cards/', headers={'Cookie': f'{REPLICA_PIN_COOKIE}={cookie.value}'})
+        self.assertIsNone(pick_replica(request))
+
+    def test_cookie_is_sent_cross_site_over_https(self):
+        cookie = self.post(secure=True).cookies[REPLICA_PIN_COOKIE]
+        self.assertEqual((cookie['samesite'], cookie['secure']), ('None', True))
+        self.assertTrue(cookie['httponly'])
+
+    def test_plain_http_cookie_is_same_site(self):
+        cookie = self.post(secure=False).cookies[REPLICA_PIN_COOKIE]
+        self.assertEqual((cookie['samesite'], cookie['secure']), ('Lax', ''))
+
+async def _receive(layer, channel, timeout=2):
+    return await asyncio.wait_for(layer.receive(channel), timeout)
+
+
+class LocalChannelLayerTests(SimpleTestCase):
+    async def test_group_send_from_another_thread_wakes_receive(self):
+        layer = LocalChannelLayer()
+        channel = await layer.new_channel()
+        await layer.group_add('board_1', channel)
+        receiving = asyncio.ensure_future(_receive(layer, channel))
+        await asyncio.sleep(0.01)  # receive() đang chờ trên loop này
+
+        # Relay của boards.outbox gửi từ thread khác, trên event loop riêng
+        sender = threading.Thread(target=lambda: asyncio.run(layer.group_send('board_1', {'type': 'ping'})))
+        sender.start()
+        sender.join()
+        self.assertEqual(await receiving, {'type': 'ping'})
+
+    async def test_send_on_same_loop_wakes_receive(self):
+        layer = LocalChannelLayer()
+        channel = await layer.new_channel()
+        receiving = asyncio.ensure_future(_receive(layer, channel))
+        await asyncio.sleep(0.01)
+        await layer.send(channel, {'type': 'ping'})
+        self.assertEqual(await receiving, {'type': 'ping'})
+
+    async def test_expired_messages_are_dropped(self):
+        layer = LocalChannelLayer(expiry=0.05)
+        channel = await layer.new_channel()
+        await layer.send(channel, {'type': 'old'})
+        await asyncio.sleep(0.1)
+        await layer.send(channel, {'type': 'new'})
+        self.assertEqual(await _receive(layer, channel), {'type': 'new'})
+
+    async def test_sweep_drops_expired_group_members(self):
+        layer = LocalChannelLayer(expiry=0.05, group_expiry=0.05)
+        channel = await layer.new_channel()
+        await layer.group_add('board_1', channel)
+        await asyncio.sleep(0.1)
+        await layer.group_send('board_1', {'type': 'ping'})
+        with self.assertRaises(asyncio.TimeoutError):
+            await _receive(layer, channel, timeout=0.1)
+
+    async def test_capacity(self):
+        layer = LocalChannelLayer(capacity=2)
+        channel = await layer.new_channel()
+        await layer.group_add('board_1', channel)
+        await layer.send(channel, {'n': 1})
+        await layer.send(channel, {'n': 2})
+        with self.assertRaises(ChannelFull):
+            await layer.send(channel, {'n': 3})
+        # group_send bỏ message cho channel đầy thay vì raise
+        await layer.group_send('board_1', {'n': 4})
+        self.assertEqual([(await _receive(layer, channel))['n'] for _ in range(2)], [1, 2])
+        with self.assertRaises(asyncio.TimeoutError):
+            await _receive(layer, channel, timeout=0.05)
+
+
+class UnixSocketChannelLayerTests(SimpleTestCase):
+    """Hai worker nối qua ChannelBroker trên một Unix socket tạm"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.path = os.path.join(directory, 'broker.sock')
+        # Worker log cảnh báo khi broker dừng (cuối mỗi test)
+        patcher = mock.patch('config.channel_layers.logger')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.broker = self.start_broker()
+
+    def start_broker(self):
+        broker = ChannelBroker(self.path)
+        loop = asyncio.new_event_loop()
+        # Task _handle bị huỷ khi dừng broker: không log như lỗi
+        loop.set_exception_handler(lambda loop, context: None)
+        serving = loop.create_task(broker.serve())
+
+        def run():
+            try:
+                loop.run_until_complete(serving)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                # Đóng cả kết nối của worker (task _handle) trước khi đóng loop
+                handlers = asyncio.all_tasks(loop)
+                for task in handlers:
+                    task.cancel()
+                loop.run_until_complete(asyncio.gather(*handlers, return_exceptions=True))
+                loop.close()
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+
+        def stop():
+            if thread.is_alive():
+                loop.call_soon_threadsafe(serving.cancel)
+                thread.join(5)
+        broker.stop = stop
+        self.addCleanup(stop)
+        self.wait_for(lambda: os.path.exists(self.path))
+        return broker
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            time.sleep(0.01)
+
+    def make_workers(self):
+        layers = [UnixSocketChannelLayer(path=self.path, reconnect_delay=0.05) for _ in range(2)]
+
+        def stop_reconnecting():
+            for layer in layers:
+                layer.reconnect_delay = 3600
+        self.addCleanup(stop_reconnecting)
+        return layers
+
+    def join_group(self, layers, group):
+        async def join():
+            channels = []
+            for layer in layers:
+                channels.append(await layer.new_channel())
+                await layer.group_add(group, channels[-1])
+            return channels
+        channels = asyncio.run(join())
+        self.wait_for(lambda: len(self.broker.groups.get(group, ())) == len(layers))
+        return channels
+
+    def assertEachReceivesOnce(self, layers, channels, group):
+        async def scenario():
+            await layers[0].group_send(group, {'type': 'ping'})
+            for layer, channel in zip(layers, channels):
+                self.assertEqual(await _receive(layer, channel), {'type': 'ping'})
+                with self.assertRaises(asyncio.TimeoutError):
+                    await _receive(layer, channel, timeout=0.1)
+        asyncio.run(scenario())
+
+    def test_group_send_reaches_each_worker_once(self):
+        layers = self.make_workers()
+        channels = self.join_group(layers, 'board_1')
+        self.assertEachReceivesOnce(layers, channels, 'board_1')
+
+    def test_send_to_channel_of_another_worker(self):
+        layers = self.make_workers()
+        channels = self.join_group(layers, 'board_1')
+
+        async def scenario():
+            await layers[0].send(channels[1], {'type': 'direct'})
+            return await _receive(layers[1], channels[1])
+        self.assertEqual(asyncio.run(scenario()), {'type': 'direct'})
+
+    def test_reconnect_resubscribes_groups(self):
+        layers = self.make_workers()
+        channels = self.join_group(layers, 'board_1')
+        self.broker.stop()
+        self.wait_for(lambda: all(layer._sock is None for layer in layers))
+
+        self.broker = self.start_broker()
+        self.wait_for(lambda: len(self.broker.groups.get('board_1', ())) == 2)
+        self.assertEachReceivesOnce(layers, channels, 'board_1')
+
+
+class ChannelBrokerTests(SimpleTestCase):
+    def test_slow_worker_is_skipped_past_max_buffer(self):
+        broker = ChannelBroker('unused', max_buffer=10)
+        writers = {name: mock.Mock() for name in ('fast', 'slow')}
+        writers['fast'].transport.get_write_buffer_size.return_value = 0
+        writers['slow'].transport.get_write_buffer_size.return_value = 10
+        broker.workers.update(writers)
+        for name in writers:
+            broker._write(name, b'frame')
+        writers['fast'].write.assert_called_once_with(b'frame')
+        writers['slow'].write.assert_not_called()
+
+
+class FanoutChannelLayerTests(SimpleTestCase):
+    """Hai worker FanoutChannelLayer dùng chung một upstream LocalChannelLayer"""
+
+    async def start_workers(self):
+        self.background = asyncio.all_tasks()
+        self.workers = [
+            FanoutChannelLayer({'BACKEND': 'config.channel_layers.LocalChannelLayer'}, refresh_interval=0.05)
+            for _ in range(2)
+        ]
+        self.upstream = self.workers[1].upstream = self.workers[0].upstream
+
+    async def cancel_listeners(self):
+        tasks = asyncio.all_tasks() - self.background - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run_scenario(self, scenario):
+        await self.start_workers()
+        try:
+            await scenario()
+        finally:
+            await self.cancel_listeners()
+
+    async def connect(self, worker, group):
+        channel = await worker.new_channel()
+        await worker.group_add(group, channel)
+        return channel
+
+    async def assertNothingFor(self, worker, channel):
+        with self.assertRaises(asyncio.TimeoutError):
+            await _receive(worker, channel, timeout=0.05)
+
+    async def test_connection_names_contain_worker_channel(self):
+        async def scenario():
+            a, b = self.workers
+            channel = await a.new_channel()
+            self.assertEqual(channel.rsplit('.', 1)[0], a.worker_channel)
+            self.assertNotEqual(a.worker_channel, (await b.new_channel()).rsplit('.', 1)[0])
+        await self.run_scenario(scenario)
+
+    async def test_one_upstream_message_per_worker(self):
+        async def scenario():
+            a, b = self.workers
+            channels = [(a, await self.connect(a, 'board_1')), (a, await self.connect(a, 'board_1')),
+                        (b, await self.connect(b, 'board_1'))]
+            with mock.patch.object(self.upstream, '_deliver', wraps=self.upstream._deliver) as deliver:
+                await b.group_send('board_1', {'type': 'ping'})
+                for worker, channel in channels:
+                    self.assertEqual(await _receive(worker, channel), {'type': 'ping'})
+            self.assertEqual(sorted(call.args[0] for call in deliver.call_args_list),
+                             sorted([a.worker_channel, b.worker_channel]))
+            for worker, channel in channels:
+                await self.assertNothingFor(worker, channel)
+        await self.run_scenario(scenario)
+
+    async def test_direct_send_to_another_worker(self):
+        async def scenario():
+            a, b = self.workers
+            target, other = await self.connect(a, 'board_1'), await self.connect(a, 'board_1')
+            await b.send(target, {'type': 'direct'})
+            self.assertEqual(await _receive(a, target), {'type': 'direct'})
+            await self.assertNothingFor(a, other)
+        await self.run_scenario(scenario)
+
+    async def test_upstream_membership_follows_first_and_last_connection(self):
+        async def scenario():
+            a, _ = self.workers
+            with mock.patch.object(self.upstream, 'group_add', wraps=self.upstream.group_add) as add, \
+                    mock.patch.object(self.upstream, 'group_discard', wraps=self.upstream.group_discard) as discard:
+                first, second = await self.connect(a, 'board_1'), await self.connect(a, 'board_1')
+                add.assert_called_once_with('board_1', a.worker_channel)
+                await a.group_discard('board_1', first)
+                discard.assert_not_called()
+                await a.group_discard('board_1', second)
+                discard.assert_called_once_with('board_1', a.worker_channel)
+        await self.run_scenario(scenario)
+
+    async def test_refresh_rejoins_upstream_groups(self):
+        async def scenario():
+            a, _ = self.workers
+            await self.connect(a, 'board_1')
+            with mock.patch.object(self.upstream, 'group_add', wraps=self.upstream.group_add) as add:
+                await asyncio.sleep(0.12)
+            self.assertGreaterEqual(add.call_count, 1)
+            add.assert_called_with('board_1', a.worker_channel)
+        await self.run_scenario(scenario)
@@ -3,12 +3,14 @@ from django.urls import path, include
 from rest_framework_simplejwt.views import TokenRefreshView
 from django.conf import settings             
 from django.conf.urls.static import static  
+from config.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('auth_app.urls')),    # ✅ Auth
     path('api/', include('boards.urls')),  
              path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),    
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG: